@@ -0,0 +1,420 @@
+import argparse  # 命令行参数
+import json  # json
+import os  # 文件读写
+import platform
+import random  # 确定性随机合成
+import shutil  # 删除临时目录
+import subprocess
+import sys
+import tempfile  # 临时目录
+import time
+from typing import Callable, Dict, List, Tuple
+
+import contrCompDeploy  # 被测的各阶段
+from bincorpus import import_bins
+from contrbin import ContractDisasm, OPCODE_VALUES, decode_bytecode, read_bytecode_hex
+from sigindex import SelectorIndex
+
+ARG_TYPES = ['uint256', 'address', 'bool', 'bytes32', 'string', 'uint8[]', 'int128', 'bytes']  # 合成ABI的参数类型
+
+
+def assemble(items: list) -> bytes:
+    """
+    汇编合成的指令序列
+    :param items: 指令序列，元素为助记符、('PUSHn', 值)、('LABEL', 标签名)（JUMPDEST）或('REF', 标签名)（PUSH2标签地址）
+    :type items: list
+    :return: 字节码
+    :rtype: bytes
+    """
+    code = bytearray()
+    labels = {}
+    refs = []
+    for item in items:
+        if isinstance(item, str):
+            code.append(OPCODE_VALUES[item])
+        elif item[0] == 'LABEL':
+            labels[item[1]] = len(code)
+            code.append(OPCODE_VALUES['JUMPDEST'])
+        elif item[0] == 'REF':
+            code.append(OPCODE_VALUES['PUSH2'])
+            refs.append((len(code), item[1]))
+            code += b'\x00\x00'
+        else:
+            size = int(item[0][4:])
+            code.append(OPCODE_VALUES[item[0]])
+            code += item[1].to_bytes(size, 'big')
+    for pos, label in refs:
+        code[pos:pos + 2] = labels[label].to_bytes(2, 'big')
+    return bytes(code)
+
+
+def gen_abi(selector_num: int, rng: random.Random) -> List[dict]:
+    """
+    合成合约ABI
+    :param selector_num: 函数数
+    :type selector_num: int
+    :param rng: 随机数生成器
+    :type rng: random.Random
+    :return: ABI的json对象
+    :rtype: list[dict]
+    """
+    abi = [{'type': 'constructor', 'inputs': [], 'payable': False, 'stateMutability': 'nonpayable'}]
+    for i in range(selector_num):
+        inputs = [{'name': f'a{j}', 'type': rng.choice(ARG_TYPES)} for j in range(rng.randrange(4))]
+        abi.append({'type': 'function', 'name': f'func{rng.getrandbits(24):06x}_{i}', 'inputs': inputs,
+                    'outputs': [{'name': '', 'type': 'uint256'}], 'constant': False, 'payable': False,
+                    'stateMutability': 'nonpayable'})
+    return abi
+
+
+def gen_runtime_bytecode(selectors: List[str], jump_density: int, call_sites: int, rng: random.Random,
+                         filler: int = 8) -> bytes:
+    """
+    合成solc风格的runtime字节码：函数分发器、各函数体（含内部跳转和外部调用）和公共的内部函数
+    :param selectors: 函数选择器列表，如['0xa9059cbb']
+    :type selectors: list[str]
+    :param jump_density: 每个函数调用内部函数的次数
+    :type jump_density: int
+    :param call_sites: 外部调用（CALL）的总数，依次分配给各函数
+    :type call_sites: int
+    :param rng: 随机数生成器
+    :type rng: random.Random
+    :param filler: 每个代码块中填充的算术指令数
+    :type filler: int
+    :return: runtime字节码
+    :rtype: bytes
+    """
+    helper_num = max(1, jump_density)
+    items = [('PUSH1', 0x80), ('PUSH1', 0x40), 'MSTORE', ('PUSH1', 0x04), 'CALLDATASIZE', 'LT', ('REF', 'fallback'),
+             'JUMPI', ('PUSH1', 0), 'CALLDATALOAD', ('PUSH1', 0xe0), 'SHR']
+    for i, selector in enumerate(selectors):
+        items += ['DUP1', ('PUSH4', int(selector, 16)), 'EQ', ('REF', f'func_{i}'), 'JUMPI']
+    items += [('LABEL', 'fallback'), 'STOP']
+
+    def fill():
+        for _ in range(filler):
+            items.extend([('PUSH1', rng.randrange(256)), rng.choice(['ADD', 'MUL', 'SUB', 'AND', 'XOR'])])
+
+    calls = [call_sites // len(selectors) + (i < call_sites % len(selectors)) for i in range(len(selectors))] \
+        if selectors else []
+    for i in range(len(selectors)):
+        items.append(('LABEL', f'func_{i}'))
+        fill()
+        for j in range(jump_density):
+            items += [('REF', f'ret_{i}_{j}'), ('REF', f'helper_{rng.randrange(helper_num)}'), 'JUMP',
+                      ('LABEL', f'ret_{i}_{j}')]
+            fill()
+        for j in range(calls[i]):
+            items += [('PUSH4', rng.getrandbits(32)), ('PUSH1', 0), 'MSTORE', ('REF', f'call_{i}_{j}'), 'JUMP',
+                      ('LABEL', f'call_{i}_{j}'), ('PUSH1', 0), 'DUP1', ('PUSH1', 0x24), ('PUSH1', 0x1c), 'DUP3',
+                      ('PUSH20', rng.getrandbits(160)), 'GAS', 'CALL', 'POP']
+        items += [('PUSH1', 0x20), ('PUSH1', 0), 'RETURN']
+    for k in range(helper_num):
+        items.append(('LABEL', f'helper_{k}'))
+        fill()
+        items += ['SWAP1', 'JUMP']
+    return assemble(items) + bytes([0xfe])  # 与solc输出一致，以INVALID结尾
+
+
+def gen_artifact(name: str, selector_num: int, jump_density: int, call_sites: int, ast_nodes: int,
+                 seed: int, selector_index: SelectorIndex) -> dict:
+    """
+    合成Truffle风格的合约编译产物
+    :param name: 合约名
+    :type name: str
+    :param selector_num: 函数数
+    :type selector_num: int
+    :param jump_density: 每个函数调用内部函数的次数
+    :type jump_density: int
+    :param call_sites: 外部调用的总数
+    :type call_sites: int
+    :param ast_nodes: 合成AST的节点数，用于模拟编译产物中的大体积字段
+    :type ast_nodes: int
+    :param seed: 随机种子
+    :type seed: int
+    :param selector_index: 用于计算函数选择器的索引
+    :type selector_index: SelectorIndex
+    :return: 编译产物的json对象
+    :rtype: dict
+    """
+    rng = random.Random(f'{seed}:{name}')
+    abi = gen_abi(selector_num, rng)
+    sigs = [contrCompDeploy.get_func_sig(func) for func in contrCompDeploy.get_funcs(abi)]
+    runtime = gen_runtime_bytecode(selector_index.get_selectors(sigs), jump_density, call_sites, rng)
+    creation = assemble([('PUSH1', 0x80), ('PUSH1', 0x40), 'MSTORE', ('PUSH2', len(runtime)), 'DUP1',
+                         ('PUSH2', 0x1d), ('PUSH1', 0), 'CODECOPY', ('PUSH1', 0), 'RETURN', 'STOP']) + runtime
+    ast = {'nodeType': 'SourceUnit', 'nodes': [
+        {'id': i, 'nodeType': 'ExpressionStatement', 'src': f'{i * 7}:{rng.randrange(100)}:0',
+         'typeDescriptions': {'typeIdentifier': 't_uint256', 'typeString': 'uint256'}} for i in range(ast_nodes)]}
+    return {'contractName': name, 'abi': abi, 'metadata': json.dumps({'compiler': {'version': '0.5.17'}}),
+            'bytecode': '0x' + creation.hex(), 'deployedBytecode': '0x' + runtime.hex(),
+            'sourceMap': '', 'deployedSourceMap': '', 'source': '', 'sourcePath': f'contracts/{name}.sol',
+            'ast': ast, 'legacyAST': ast, 'compiler': {'name': 'solc', 'version': '0.5.17'}, 'networks': {},
+            'schemaVersion': '3.0.0', 'updatedAt': '2020-01-01T00:00:00.000Z'}
+
+
+def write_fixtures(build_dir_path: str, contract_num: int, selector_num: int, jump_density: int, call_sites: int,
+                   ast_nodes: int, seed: int):
+    """
+    生成合成的编译产物目录
+    :param build_dir_path: 编译产物目录
+    :type build_dir_path: str
+    :param contract_num: 合约数
+    :type contract_num: int
+    :param selector_num: 每个合约的函数数
+    :type selector_num: int
+    :param jump_density: 每个函数调用内部函数的次数
+    :type jump_density: int
+    :param call_sites: 每个合约外部调用的总数
+    :type call_sites: int
+    :param ast_nodes: 每个合约合成AST的节点数
+    :type ast_nodes: int
+    :param seed: 随机种子
+    :type seed: int
+    """
+    os.makedirs(build_dir_path, exist_ok=True)
+    selector_index = SelectorIndex()
+    for i in range(contract_num):
+        artifact = gen_artifact(f'Bench{i}', selector_num, jump_density, call_sites, ast_nodes, seed, selector_index)
+        with open(build_dir_path + artifact['contractName'] + '.json', 'w') as fo:
+            json.dump(artifact, fo, indent=2)
+
+
+def time_stage(func: Callable, repeat: int, items: int, setup: Callable = None) -> dict:
+    """
+    计时一个阶段，取多次运行中的最短用时
+    :param func: 被测函数
+    :type func: Callable
+    :param repeat: 运行次数
+    :type repeat: int
+    :param items: 每次运行处理的数据数，用于计算吞吐量
+    :type items: int
+    :param setup: 每次运行前调用且不计时的准备函数
+    :type setup: Callable
+    :return: 计时结果
+    :rtype: dict
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {'best_s': round(best, 6), 'mean_s': round(sum(times) / len(times), 6), 'items': items,
+            'items_per_s': round(items / best, 2) if best > 0 else None}
+
+
+def run_benchmarks(fixture_dir_path: str, repeat: int, jobs: int) -> Dict[str, dict]:
+    """
+    对各阶段计时
+    :param fixture_dir_path: 含build/contracts编译产物的目录（合成或录制的固定数据）
+    :type fixture_dir_path: str
+    :param repeat: 每个阶段的运行次数
+    :type repeat: int
+    :param jobs: BIN签名阶段的进程数
+    :type jobs: int
+    :return: 阶段名-计时结果的映射
+    :rtype: dict[str, dict]
+    """
+    build_dir_path = fixture_dir_path + 'build/contracts/'
+    artifact_names = sorted(os.listdir(build_dir_path))
+    build_infos = [contrCompDeploy.get_contract_build_info(build_dir_path, name) for name in artifact_names]
+    codes = [read_bytecode_hex(build_info['deployedBytecode']) for build_info in build_infos]
+    hexes = [build_info['deployedBytecode'] for build_info in build_infos]
+    abis = [build_info['abi'] for build_info in build_infos]
+    results = {}
+
+    # 文件读取：流式读取编译产物所需字段与整体解析对比
+    def full_load():
+        for name in artifact_names:
+            with open(build_dir_path + name) as fo:
+                json.load(fo)
+
+    results['artifact_full_json_load'] = time_stage(full_load, repeat, len(artifact_names))
+    results['artifact_stream_extract'] = time_stage(
+        lambda: [contrCompDeploy.get_contract_build_info(build_dir_path, name) for name in artifact_names],
+        repeat, len(artifact_names))
+
+    # 反汇编、控制流图和外部调用分析
+    results['disasm_decode'] = time_stage(lambda: [decode_bytecode(code) for code in codes], repeat, len(codes))
+
+    def load_disasms() -> List[ContractDisasm]:
+        cdses = []
+        for hex_str in hexes:
+            cds = ContractDisasm()
+            cds.get_runtime_data_from_hex(hex_str)
+            cdses.append(cds)
+        return cdses
+
+    results['disasm_load'] = time_stage(load_disasms, repeat, len(hexes))
+    disasms = load_disasms()
+    func_sigs = [cds.get_func_sigs() for cds in disasms]
+    results['dispatcher_scan'] = time_stage(lambda: [cds.get_func_sigs() for cds in disasms], repeat, len(disasms))
+
+    def walk_cfgs(cdses: List[ContractDisasm]) -> List[Tuple[ContractDisasm, List[Tuple[int, ...]]]]:
+        return [(cds, [cds.get_func_blocks(func[1]) for func in funcs]) for cds, funcs in zip(cdses, func_sigs)]
+
+    fresh = []  # 可达代码块在反汇编对象中缓存，每次计时前重新载入
+
+    def reload_disasms():
+        fresh[:] = load_disasms()
+
+    results['cfg_walk'] = time_stage(lambda: walk_cfgs(fresh), repeat, sum(len(funcs) for funcs in func_sigs),
+                                     setup=reload_disasms)
+    walked = walk_cfgs(disasms)
+    results['extern_call_sigs'] = time_stage(
+        lambda: [contrCompDeploy.get_extern_call_sigs_from_blocks(cds, func_blocks)
+                 for cds, funcs_blocks in walked for func_blocks in funcs_blocks],
+        repeat, sum(len(funcs) for funcs in func_sigs))
+
+    # 函数选择器哈希：冷索引（全部计算）和热索引（全部命中）
+    def hash_selectors():
+        for abi in abis:
+            contrCompDeploy.get_ABI_sig_list(abi)
+
+    sig_num = sum(len(contrCompDeploy.get_funcs(abi)) for abi in abis)
+    results['selector_hash_cold'] = time_stage(
+        hash_selectors, repeat, sig_num, setup=lambda: setattr(contrCompDeploy, 'selector_index', SelectorIndex()))
+    results['selector_hash_warm'] = time_stage(hash_selectors, repeat, sig_num)
+
+    # 端到端阶段：在临时目录中读写ABI、BIN和签名文件
+    work_dir_path = tempfile.mkdtemp(prefix='bench_') + '/'
+    saved = {name: getattr(contrCompDeploy, name) for name in
+             ('truffle_project_path', 'abi_dir_path', 'bin_dir_path', 'abi_sig_dir_path', 'bin_sig_dir_path',
+              'clone_report_file_path', 'bin_corpus_file_path', 'journal')}
+    try:
+        contrCompDeploy.truffle_project_path = fixture_dir_path
+        contrCompDeploy.abi_dir_path = work_dir_path + 'abis/'
+        contrCompDeploy.bin_dir_path = work_dir_path + 'bins/'
+        contrCompDeploy.abi_sig_dir_path = work_dir_path + 'abi_sigs/'
+        contrCompDeploy.bin_sig_dir_path = work_dir_path + 'bin_sigs/'
+        contrCompDeploy.clone_report_file_path = work_dir_path + 'clones.csv'
+        contrCompDeploy.bin_corpus_file_path = ''
+        contrCompDeploy.journal = None
+        contracts = {}
+
+        def extract():
+            contracts.update(contrCompDeploy.get_ABIs_and_BINs())
+
+        def reset_sig_dirs():
+            contrCompDeploy.remove_dir(contrCompDeploy.abi_sig_dir_path)
+            contrCompDeploy.remove_dir(contrCompDeploy.bin_sig_dir_path)
+
+        def get_BIN_sigs_from(corpus_file_path: str):  # 读取BIN文件或BIN语料
+            contrCompDeploy.bin_corpus_file_path = corpus_file_path
+            try:
+                contrCompDeploy.get_BIN_sigs(1, None, None)
+            finally:
+                contrCompDeploy.bin_corpus_file_path = ''
+
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')  # 屏蔽各阶段的进度输出
+        try:
+            results['stage_extract_ABIs_and_BINs'] = time_stage(extract, repeat, len(artifact_names))
+            results['stage_ABI_sigs'] = time_stage(lambda: contrCompDeploy.get_ABI_sigs(None, contracts), repeat,
+                                                   len(contracts), setup=reset_sig_dirs)
+            results['stage_BIN_sigs'] = time_stage(lambda: contrCompDeploy.get_BIN_sigs(1, None, contracts), repeat,
+                                                   len(contracts), setup=reset_sig_dirs)
+            if jobs > 1:
+                results[f'stage_BIN_sigs_j{jobs}'] = time_stage(
+                    lambda: contrCompDeploy.get_BIN_sigs(jobs, None, contracts), repeat, len(contracts),
+                    setup=reset_sig_dirs)
+            results['stage_BIN_sigs_files'] = time_stage(lambda: get_BIN_sigs_from(''), repeat, len(contracts),
+                                                         setup=reset_sig_dirs)
+            import_bins(contrCompDeploy.bin_dir_path, work_dir_path + 'bins.pack')
+            results['stage_BIN_sigs_corpus'] = time_stage(lambda: get_BIN_sigs_from(work_dir_path + 'bins.pack'),
+                                                          repeat, len(contracts), setup=reset_sig_dirs)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    finally:
+        for name, value in saved.items():
+            setattr(contrCompDeploy, name, value)
+        shutil.rmtree(work_dir_path, ignore_errors=True)
+    return results
+
+
+def get_commit() -> str:
+    """
+    获取当前git提交，用于比较不同提交间的结果
+    :return: 提交哈希，非git仓库时为空字符串
+    :rtype: str
+    """
+    try:
+        info = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+        return info.stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare_results(base: dict, current: dict) -> List[str]:
+    """
+    比较两次基准测试结果
+    :param base: 基准结果
+    :type base: dict
+    :param current: 当前结果
+    :type current: dict
+    :return: 各阶段的对比行，比值大于1表示变慢
+    :rtype: list[str]
+    """
+    lines = []
+    for stage, result in current['results'].items():
+        base_result = base['results'].get(stage)
+        if base_result and base_result['best_s'] > 0:
+            ratio = result['best_s'] / base_result['best_s']
+            lines.append(f'{stage}: {base_result["best_s"]:.4f}s -> {result["best_s"]:.4f}s ({ratio:.2f}x)')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each stage on a synthetic or recorded contract corpus.')
+    parser.add_argument('--contracts', type=int, default=200, help='number of synthetic contracts (default: 200)')
+    parser.add_argument('--selectors', type=int, default=12, help='functions per contract (default: 12)')
+    parser.add_argument('--jump-density', type=int, default=4,
+                        help='internal function calls per function (default: 4)')
+    parser.add_argument('--call-sites', type=int, default=6, help='external CALL sites per contract (default: 6)')
+    parser.add_argument('--ast-nodes', type=int, default=2000, help='AST nodes per artifact (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic corpus (default: 0)')
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help='use recorded artifacts in DIR/build/contracts instead of a synthetic corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the best is reported (default: 3)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='also time BIN signatures with N processes')
+    parser.add_argument('-o', '--output', metavar='FILE', help='write the JSON results to FILE instead of stdout')
+    parser.add_argument('--compare', metavar='FILE', help='compare with the JSON results of a previous run')
+    args = parser.parse_args()
+
+    params = {'repeat': args.repeat, 'jobs': args.jobs}
+    fixture_dir_path = args.fixtures
+    tmp_dir_path = None
+    if fixture_dir_path:
+        fixture_dir_path = fixture_dir_path.rstrip('/') + '/'
+        params['fixtures'] = fixture_dir_path
+    else:
+        tmp_dir_path = tempfile.mkdtemp(prefix='bench_fixtures_') + '/'
+        fixture_dir_path = tmp_dir_path
+        params.update({'contracts': args.contracts, 'selectors': args.selectors, 'jump_density': args.jump_density,
+                       'call_sites': args.call_sites, 'ast_nodes': args.ast_nodes, 'seed': args.seed})
+        write_fixtures(fixture_dir_path + 'build/contracts/', args.contracts, args.selectors, args.jump_density,
+                       args.call_sites, args.ast_nodes, args.seed)
+    try:
+        results = run_benchmarks(fixture_dir_path, args.repeat, args.jobs)
+    finally:
+        if tmp_dir_path:
+            shutil.rmtree(tmp_dir_path, ignore_errors=True)
+    report = {'commit': get_commit(), 'python': platform.python_version(), 'params': params, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as fo:
+            json.dump(report, fo, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as fo:
+            for line in compare_results(json.load(fo), report):
+                print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
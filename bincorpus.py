@@ -0,0 +1,190 @@
+import argparse  # 命令行参数
+import json  # json
+import mmap  # 内存映射
+import os  # 系统操作
+import struct  # 文件尾编码
+from typing import Dict, List
+
+from contrbin import read_bytecode_hex  # 十六进制字节码解析
+
+# 语料文件格式：文件头魔数 | 各合约的原始runtime字节码依次拼接 | 索引（合约名-[偏移, 长度]的json对象）
+#              | 文件尾：索引偏移（8字节小端）和魔数
+CORPUS_MAGIC = b'EVMBINS1'
+_TRAILER = struct.Struct('<Q8s')
+
+
+class BytecodeCorpusWriter:
+    """
+    BIN语料写入器：将各合约的原始runtime字节码追加到单个文件中，关闭时写入偏移索引。
+    写入临时文件，正常关闭后才替换语料文件，异常退出时丢弃
+    """
+
+    def __init__(self, file_path: str):
+        """
+        :param file_path: 语料文件路径
+        :type file_path: str
+        """
+        self.file_path = file_path
+        self.__tmp_path = file_path + '.tmp'
+        self.__fo = open(self.__tmp_path, 'wb')
+        self.__fo.write(CORPUS_MAGIC)
+        self.__offset = len(CORPUS_MAGIC)
+        self.__index = {}  # 合约名-[偏移, 长度]的映射
+
+    def add(self, name: str, code: bytes):
+        """
+        追加合约的字节码，同名合约以后追加的为准
+        :param name: 合约名
+        :type name: str
+        :param code: runtime字节码
+        :type code: bytes
+        """
+        self.__fo.write(code)
+        self.__index[name] = [self.__offset, len(code)]
+        self.__offset += len(code)
+
+    def __len__(self) -> int:
+        return len(self.__index)
+
+    def close(self):
+        """写入索引和文件尾，替换语料文件"""
+        self.__fo.write(json.dumps(self.__index, separators=(',', ':')).encode())
+        self.__fo.write(_TRAILER.pack(self.__offset, CORPUS_MAGIC))
+        self.__fo.close()
+        os.replace(self.__tmp_path, self.file_path)
+
+    def abort(self):
+        """丢弃未写完的语料"""
+        self.__fo.close()
+        os.remove(self.__tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BytecodeCorpus:
+    """
+    BIN语料读取器：以mmap只读映射语料文件，各合约的字节码为映射上的memoryview切片，不复制数据。
+    切片在语料关闭前有效
+    """
+
+    def __init__(self, file_path: str):
+        """
+        :param file_path: 语料文件路径
+        :type file_path: str
+        """
+        self.file_path = file_path
+        with open(file_path, 'rb') as fo:
+            self.__mm = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)  # 映射独立于文件对象
+        try:
+            index_offset, magic = _TRAILER.unpack(self.__mm[-_TRAILER.size:])
+            if self.__mm[:len(CORPUS_MAGIC)] != CORPUS_MAGIC or magic != CORPUS_MAGIC:
+                raise ValueError(f'Not a bytecode corpus: {file_path}')
+            self.__index = json.loads(self.__mm[index_offset:-_TRAILER.size])  # type: Dict[str, List[int]]
+        except (struct.error, ValueError):
+            self.__mm.close()
+            raise
+        self.__view = memoryview(self.__mm)
+
+    def names(self) -> List[str]:
+        """
+        获取语料中的合约名
+        :return: 合约名列表，按写入顺序排列
+        :rtype: list[str]
+        """
+        return list(self.__index)
+
+    def get(self, name: str) -> memoryview:
+        """
+        获取合约的字节码
+        :param name: 合约名
+        :type name: str
+        :return: 映射上的字节码切片
+        :rtype: memoryview
+        """
+        offset, length = self.__index[name]
+        return self.__view[offset:offset + length]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__index
+
+    def __len__(self) -> int:
+        return len(self.__index)
+
+    def close(self):
+        """关闭映射，仍在使用的切片须先释放"""
+        self.__view.release()
+        self.__mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def import_bins(bin_dir_path: str, corpus_file_path: str) -> int:
+    """
+    将按文件存放的BIN（十六进制字节码的.bin文件）打包为语料，无法解析的字节码（如含未链接库占位符）存为空字节码
+    :param bin_dir_path: BIN文件存放目录
+    :type bin_dir_path: str
+    :param corpus_file_path: 语料文件路径
+    :type corpus_file_path: str
+    :return: 打包的合约数
+    :rtype: int
+    """
+    with BytecodeCorpusWriter(corpus_file_path) as writer:
+        for file_name in sorted(os.listdir(bin_dir_path)):
+            if file_name.endswith('.bin') and os.path.isfile(bin_dir_path + file_name):
+                with open(bin_dir_path + file_name) as fo:
+                    writer.add(file_name[:-len('.bin')], read_bytecode_hex(fo.read()))
+        return len(writer)
+
+
+def export_bins(corpus_file_path: str, bin_dir_path: str) -> int:
+    """
+    将语料展开为按文件存放的BIN，文件内容与提取BIN时一致（不带0x的十六进制字节码）
+    :param corpus_file_path: 语料文件路径
+    :type corpus_file_path: str
+    :param bin_dir_path: BIN文件存放目录
+    :type bin_dir_path: str
+    :return: 导出的合约数
+    :rtype: int
+    """
+    os.makedirs(bin_dir_path, exist_ok=True)
+    with BytecodeCorpus(corpus_file_path) as corpus:
+        for name in corpus.names():
+            with open(os.path.join(bin_dir_path, name + '.bin'), 'w') as wfo:
+                wfo.write(corpus.get(name).hex())
+        return len(corpus)
+
+
+if __name__ == '__main__':
+    # 用法: python bincorpus.py import <bins目录> <语料文件> | export <语料文件> <bins目录> | list <语料文件>
+    parser = argparse.ArgumentParser(description='Convert between a packed bytecode corpus and per-file BINs.')
+    commands = parser.add_subparsers(dest='command')
+    import_parser = commands.add_parser('import', help='pack the .bin files of a directory into a corpus')
+    import_parser.add_argument('bin_dir')
+    import_parser.add_argument('corpus')
+    export_parser = commands.add_parser('export', help='unpack a corpus into one .bin file per contract')
+    export_parser.add_argument('corpus')
+    export_parser.add_argument('bin_dir')
+    list_parser = commands.add_parser('list', help='list the contracts and bytecode sizes of a corpus')
+    list_parser.add_argument('corpus')
+    args = parser.parse_args()
+    if args.command == 'import':
+        print(f'Packed {import_bins(os.path.join(args.bin_dir, ""), args.corpus)} BINs into {args.corpus}')
+    elif args.command == 'export':
+        print(f'Exported {export_bins(args.corpus, args.bin_dir)} BINs to {args.bin_dir}')
+    elif args.command == 'list':
+        with BytecodeCorpus(args.corpus) as bin_corpus:
+            for bin_name in bin_corpus.names():
+                print(f'{bin_name}\t{len(bin_corpus.get(bin_name))}')
+    else:
+        parser.print_help()
@@ -1,12 +1,28 @@
-import subprocess
+import argparse  # 命令行参数
 import os  # 文件读写
 import shutil  # 文件复制、移动
+import tempfile  # 临时编译工作区
+import threading
 import re  # 正则表达式
 import json  # json
-from typing import List, Set
-
-import _pysha3  # 安装pysha3后导入
-from contrbin import ContractDisasm  # 合约反汇编代码处理
+import time
+from contextlib import nullcontext  # 未启用BIN语料时的空上下文
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # 多进程/多线程并行
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from jsonstream import load_json_fields  # 流式读取编译信息
+from pipeline import Stage, StageStats, format_pipeline_stats, run_pipeline  # 流水线模式
+from ctorargs import ConstructorArgProvider, to_js_literal  # 构造函数参数
+from journal import Journal, archive_file  # 运行日志
+from metrics import ItemRecord, metrics  # 运行指标
+from procrunner import runner  # 外部命令执行
+from deployer import DeployScheduler, GroupResult, GroupSizer, get_migration_contract_name  # 并发部署调度
+from rpcdeploy import JSONRPCClient, RPCDeployer, encode_constructor_args  # JSON-RPC部署
+from contrbin import ContractDisasm, read_bytecode_hex, strip_metadata  # 合约反汇编代码处理
+from bincorpus import BytecodeCorpus, BytecodeCorpusWriter  # BIN语料
+from sigcache import SigCache, get_ABI_key, get_BIN_key, keccak_hex  # 签名结果缓存
+from sigindex import SelectorIndex  # 函数选择器索引
+from solversion import get_pragma_exprs, parse_version, select_version  # 合约版本声明解析
 
 # 文件夹路径结尾须加”/"
 truffle_project_path = '/home/hhy/trufflePro/'  # truffle项目目录
@@ -14,27 +30,159 @@ tmp_sol_dir_path = '/home/hhy/Desktop/sol/'  # 暂存合约源文件目录
 tmp_migration_dir_path = truffle_project_path + 'tmp_migrations/'  # 合约部署文件暂存目录
 abi_dir_path = truffle_project_path + 'abis/'  # abi文件存放目录
 bin_dir_path = truffle_project_path + 'bins/'  # bin文件存放目录
+bin_corpus_file_path = ''  # BIN语料文件（原始runtime字节码拼接和偏移索引），设置时提取的BIN打包于此而不逐个存放
 abi_sig_dir_path = truffle_project_path + 'abi_sigs/'  # abi签名文件存放目录
 bin_sig_dir_path = truffle_project_path + 'bin_sigs/'  # bin签名文件存放目录
 addrmap_file_path = truffle_project_path + 'addrmap.csv'  # 合约地址文件
 runtime_bin_dir_path = truffle_project_path + 'runtime_bins/'  # runtime字节码文件存放目录
+compile_manifest_file_path = truffle_project_path + 'compile_manifest.json'  # 增量编译清单文件
+pragma_cache_file_path = truffle_project_path + 'pragma_cache.json'  # 合约版本声明缓存文件
+compile_workspace_dir_path = truffle_project_path + 'compile_workspaces/'  # 临时编译工作区存放目录
+log_dir_path = truffle_project_path + 'logs/'  # 编译和部署命令的完整输出日志存放目录
+subprocess_jobs = 8  # 同时执行的外部命令（truffle、solc、evm）数上限，进程池中的各分析进程分别计数
+compile_timeout = 3600  # 单次编译命令的超时（秒），超时的命令被终止并视为编译失败，为None时不限
+deploy_timeout = 3600  # 单组合约truffle migrate的超时（秒），超时的组按部署失败处理，为None时不限
 
 contract_min_version = 4  # 合约最老大版本
 contract_max_version = 6  # 合约最新大版本
 default_contract_version = '0.4.18'  # 默认合约版本
 compile_version_list = ['0.1.7', '0.2.2', '0.3.6', '0.4.26', '0.5.17', '0.6.11']  # 大版本对应编译器合约版本
-contract_deploying_group_size = 6  # 1组待部署合约的合约数
+contract_deploying_group_size = 6  # 1组待部署合约的初始合约数，部署时根据部署结果自适应调整
+deploy_group_max_size = 64  # 1组待部署合约的最大合约数
+deploy_target_latency = 120  # 1组合约部署用时的目标（秒），超过时减小组大小，为None时不按用时调整
+constructor_args_file_path = ''  # 构造函数参数清单（json或csv），为空时不使用清单
+constructor_args_seed = 0  # 清单中没有的构造函数参数按该随机种子生成默认值
+deploy_networks = ['development']  # 部署使用的truffle-config.js网络名，各网络须使用不同的节点或账户，并发部署组数即网络数
+deploy_retries = 1  # 单个合约部署失败后的重试次数（失败的组先二分定位出错的合约）
+deploy_workspace_dir_path = truffle_project_path + 'deploy_workspaces/'  # 临时部署工作区存放目录
+deploy_backend = 'truffle'  # 部署后端：'truffle'为truffle migrate，'rpc'为直接通过JSON-RPC发送合约创建交易
+rpc_url = 'http://127.0.0.1:8545'  # rpc部署后端连接的节点JSON-RPC地址
+rpc_deploy_accounts = []  # rpc部署后端发送交易的已解锁账户，为空时使用节点的全部账户
+rpc_deploy_gas = None  # rpc部署后端每笔交易的gas上限，为None时由节点估算
+rpc_batch_size = 50  # rpc部署后端每次批量请求的交易或收据数
+compiler_backend = 'truffle'  # 编译后端：'truffle'为truffle compile，'solc'为直接调用本地solc的standard-JSON接口
+solc_bin_dir_path = truffle_project_path + 'solc/'  # 本地solc编译器存放目录，文件名为solc-<版本号>
+compile_jobs = 3  # 并发编译的工作区数
+compile_shard_size = 0  # 大版本分片编译时每个分片的合约数，为0时不分片
+disasm_backend = 'python'  # 反汇编后端：'python'为纯Python反汇编，'evm'为调用geth的evm disasm
+sig_cache_file_path = truffle_project_path + 'sig_cache.db'  # 签名结果缓存文件
+sig_cache_max_size = 256 * 1024 * 1024  # 签名结果缓存的字节数上限
+journal_file_path = truffle_project_path + 'journal.db'  # 运行日志文件，记录各合约的阶段完成情况和部署地址
+pipeline_queue_size = 64  # 流水线模式下阶段间队列的容量
+selector_index_file_path = truffle_project_path + 'selector_index.json'  # 函数选择器索引文件
+sig_dump_file_path = ''  # 本地函数签名导出文件，为空时不导入
+bin_sig_with_names = False  # BIN签名文件中是否在外部调用函数选择器后标注函数签名
+bin_dedup = True  # 是否按去除Solidity元数据后的字节码将克隆合约分组，每组仅分析一次BIN签名
+clone_report_file_path = truffle_project_path + 'clones.csv'  # 克隆合约报告文件
+metrics_file_path = ''  # 运行指标导出文件，.prom结尾时为Prometheus文本格式，否则为JSON lines，为空时不导出
+profile_dir_path = truffle_project_path + 'profiles/'  # 阶段性能剖析结果存放目录
+
+selector_index = SelectorIndex()  # 函数签名-函数选择器双向索引，main()中替换为持久化的索引
+constructor_arg_provider = ConstructorArgProvider(seed=constructor_args_seed)  # 构造函数参数提供者，main()中按参数替换
+journal = None  # 运行日志，main()中打开，为None时不记录也不跳过已完成的工作
 
 
 def main():
-    if not contracts_compile():
-        return
-    get_ABIs_and_BINs()
-    get_ABI_sigs()
-    get_BIN_sigs()
-    create_deploy_files()
-    contracts_deploy()
-    pass
+    args = parse_args()
+    global compiler_backend, compile_jobs, compile_shard_size, bin_sig_with_names, bin_dedup, bin_corpus_file_path
+    global selector_index
+    global deploy_networks, deploy_retries, deploy_backend, rpc_url, constructor_arg_provider, journal
+    if args.compiler:
+        compiler_backend = args.compiler
+    if args.compile_jobs:
+        compile_jobs = args.compile_jobs
+    if args.shard_size is not None:
+        compile_shard_size = args.shard_size
+    if args.networks:
+        deploy_networks = args.networks.split(',')
+    if args.deploy_retries is not None:
+        deploy_retries = args.deploy_retries
+    if args.deployer:
+        deploy_backend = args.deployer
+    if args.rpc_url:
+        rpc_url = args.rpc_url
+    runner.set_concurrency(args.subprocess_jobs or subprocess_jobs)
+    if args.sig_names:
+        bin_sig_with_names = True
+    if args.no_dedup:
+        bin_dedup = False
+    if args.bin_corpus:
+        bin_corpus_file_path = args.bin_corpus
+    ctor_seed = constructor_args_seed if args.ctor_seed is None else args.ctor_seed
+    constructor_arg_provider = ConstructorArgProvider(args.ctor_args or constructor_args_file_path or None, ctor_seed,
+                                                      args.interactive)
+    selector_index = SelectorIndex(selector_index_file_path)
+    if args.sig_dump or sig_dump_file_path:
+        num = selector_index.seed_from_dump(args.sig_dump or sig_dump_file_path)
+        print(f'Loaded {num} function signatures from {args.sig_dump or sig_dump_file_path}')
+    if args.profile:
+        metrics.profile_stage = args.profile
+        metrics.profile_dir_path = profile_dir_path
+        if args.profile == 'bin_sigs' and args.jobs > 1:  # 进程池中的分析无法剖析
+            print('Profiling bin_sigs in a single process.')
+            args.jobs = 1
+    if not args.resume:  # 新的运行将上次运行的日志和合约地址文件归档，不删除已有的记录
+        suffix = time.strftime('%Y%m%d-%H%M%S')
+        for file_path in (journal_file_path, addrmap_file_path):
+            archived_path = archive_file(file_path, suffix)
+            if archived_path:
+                print(f'Archived {file_path} to {archived_path}')
+    journal = Journal(journal_file_path)
+    if args.resume:
+        print(f'Resume from {journal_file_path}: {len(journal.get_done("deploy"))} contracts already deployed.')
+    sig_cache = None
+    try:
+        with metrics.stage('compile'):
+            compiled = contracts_compile(not args.rebuild)
+        if not compiled:
+            return
+        sig_cache = None if args.no_cache else SigCache(sig_cache_file_path, sig_cache_max_size)
+        contracts = None
+        if args.pipeline:
+            contracts_pipeline(args.jobs, sig_cache, deploy_backend == 'truffle')
+        else:
+            if compiler_backend != 'solc' or bin_corpus_file_path:  # solc后端编译时已直接生成ABI和BIN文件
+                with metrics.stage('extract'):
+                    contracts = get_ABIs_and_BINs()
+            with metrics.stage('abi_sigs'):
+                get_ABI_sigs(sig_cache, contracts)
+            with metrics.stage('bin_sigs'):  # 使用BIN语料时从语料映射读取字节码
+                get_BIN_sigs(args.jobs, sig_cache, None if bin_corpus_file_path else contracts)
+            if deploy_backend == 'truffle':
+                with metrics.stage('deploy_files'):
+                    create_deploy_files(contracts)
+        if sig_cache:
+            print(sig_cache.get_stats() + '\n')
+            sig_cache.close()
+            sig_cache = None
+        selector_index.save()
+        with metrics.stage('deploy'):
+            if deploy_backend == 'rpc':
+                contracts_deploy_by_rpc(contracts)
+            else:
+                contracts_deploy()
+    finally:
+        if sig_cache:  # 出错或中断时保存已缓存的结果
+            sig_cache.close()
+        journal.close()
+        report_metrics(args.metrics or metrics_file_path)
+
+
+def report_metrics(file_path: str = ''):
+    """
+    输出运行指标统计，并按需导出运行指标和保存性能剖析结果
+    :param file_path: 运行指标导出文件路径，为空时不导出
+    :type file_path: str
+    """
+    print('Metrics:')
+    for line in metrics.get_summary():
+        print(line)
+    if file_path:
+        metrics.write(file_path)
+        print(f'Metrics are written to {file_path}')
+    profile_file_path = metrics.save_profile()
+    if profile_file_path:
+        print(f'Profile of {metrics.profile_stage} is written to {profile_file_path}')
 
 
 def handle_path_same_name(src_path: str, dest_path: str):
@@ -78,89 +226,637 @@ def get_sol_version(file_path: str):
     :type file_path: str
     :returns version，versionStr:
         version：string 合约大版本
-        versionStr：string 合约具体版本字符串
+        versionStr：string 满足合约版本声明的编译器版本字符串
+    """
+    with open(file_path, errors='ignore') as fo:
+        version_str = select_compile_version(get_pragma_exprs(fo.read()))
+    if version_str is None:
+        version_str = default_contract_version
+    return version_str.split('.')[1], version_str
+
+
+def get_installed_compiler_versions() -> List[str]:
+    """
+    获取已安装的编译器版本：solc_bin_dir_path目录下的solc编译器及compile_version_list中的版本
+    :return: 编译器版本列表
+    :rtype: list[str]
+    """
+    versions = set(compile_version_list[contract_min_version - 1:contract_max_version])
+    if os.path.isdir(solc_bin_dir_path):
+        for file_name in os.listdir(solc_bin_dir_path):
+            version_match = re.match(r'^solc-v?(\d+\.\d+\.\d+)(\.exe)?$', file_name)
+            if version_match:
+                versions.add(version_match.group(1))
+    return sorted(versions, key=parse_version)
+
+
+def select_compile_version(exprs: List[str], installed_versions: List[str] = None) -> str:
+    """
+    为版本声明选择编译器版本：满足全部声明的最低大版本中的最高已安装版本
+    :param exprs: 版本声明表达式列表，为空时使用默认合约版本
+    :type exprs: list[str]
+    :param installed_versions: 已安装的编译器版本列表，默认为get_installed_compiler_versions()
+    :type installed_versions: list[str]
+    :return: 编译器版本，没有满足声明的已安装版本时返回None（不退回大版本的默认编译器）
+    :rtype: str
     """
-    with open(file_path) as fo:
-        # while True:
-        for line in fo:
-            version_line = re.search(r'^pragma\s+solidity\s+(\^|>=)(0.(\d)+.\d+)[\s;]', line)
-            if version_line:
-                return version_line.group(3), version_line.group(2)
-        return default_contract_version.split('.')[1], default_contract_version
+    if not exprs:
+        exprs = ['^' + default_contract_version]
+    if installed_versions is None:
+        installed_versions = get_installed_compiler_versions()
+    return select_version(exprs, installed_versions)
 
 
-def contracts_compile() -> bool:
+def load_pragma_cache() -> Dict[str, dict]:
+    """
+    读取版本声明缓存
+    :return: 合约内容哈希-版本声明和导入文件的映射
+    :rtype: dict[str, dict]
+    """
+    if not os.path.exists(pragma_cache_file_path):
+        return {}
+    with open(pragma_cache_file_path) as fo:
+        return json.load(fo)
+
+
+def get_sol_source_info(file_path: str, file_hash: str, pragma_cache: Dict[str, dict]) -> dict:
+    """
+    获取合约文件的版本声明和导入文件，按内容哈希缓存
+    :param file_path: 合约文件路径
+    :type file_path: str
+    :param file_hash: 合约内容哈希
+    :type file_hash: str
+    :param pragma_cache: 版本声明缓存
+    :type pragma_cache: dict[str, dict]
+    :return: 包括版本声明列表pragmas和导入文件名列表imports
+    :rtype: dict
+    """
+    if file_hash not in pragma_cache:
+        with open(file_path, errors='ignore') as fo:
+            source = fo.read()
+        pragma_cache[file_hash] = {'pragmas': get_pragma_exprs(source), 'imports': get_sol_imports_from_source(source)}
+    return pragma_cache[file_hash]
+
+
+def resolve_compile_versions(source_infos: Dict[str, dict]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    为每个合约选择编译器版本：须满足合约自身及其直接和间接导入的合约的全部版本声明，
+    不受导入了同一合约的其他合约的版本声明约束
+    :param source_infos: 合约文件名-版本声明和导入文件的映射
+    :type source_infos: dict[str, dict]
+    :return: 二元组包括：合约文件名-编译器版本的映射，和没有满足声明的已安装编译器的合约文件名-原因的映射
+    :rtype: tuple[dict[str, str], dict[str, str]]
+    """
+    installed_versions = get_installed_compiler_versions()
+    sol_imports = {sol_name: info['imports'] for sol_name, info in source_infos.items()}
+    selected = {}  # 版本声明元组-编译器版本的映射，相同的声明只选择一次
+    compile_versions = {}
+    errors = {}
+    for sol_name in source_infos:
+        closure = get_import_closure(sol_name, sol_imports)
+        exprs = tuple(expr for name in sorted(closure) for expr in source_infos[name]['pragmas'])
+        if exprs not in selected:
+            selected[exprs] = select_compile_version(list(exprs), installed_versions)
+        if selected[exprs]:
+            compile_versions[sol_name] = selected[exprs]
+        else:
+            errors[sol_name] = f'no installed compiler satisfies {"; ".join(exprs)}' + \
+                               (' (including imports)' if len(closure) > 1 else '')
+    return compile_versions, errors
+
+
+def load_compile_manifest() -> dict:
+    """
+    读取编译清单
+    :return: 合约文件名-编译信息（内容哈希、版本、编译器版本、编译产物）的映射
+    :rtype: dict
+    """
+    if not os.path.exists(compile_manifest_file_path):
+        return {}
+    with open(compile_manifest_file_path) as fo:
+        return json.load(fo)
+
+
+def save_compile_manifest(manifest: dict):
+    """
+    写入编译清单
+    :param manifest: 合约文件名-编译信息的映射
+    :type manifest: dict
+    """
+    with open(compile_manifest_file_path + '.tmp', 'w') as fo:
+        json.dump(manifest, fo, indent=1, sort_keys=True)
+    os.replace(compile_manifest_file_path + '.tmp', compile_manifest_file_path)
+
+
+def get_file_hash(file_path: str) -> str:
+    """
+    获取文件内容的哈希值
+    :param file_path: 文件路径
+    :type file_path: str
+    :return: 十六进制哈希值
+    :rtype: str
+    """
+    with open(file_path, 'rb') as fo:
+        return keccak_hex(fo.read())
+
+
+def get_build_artifacts(sol_names: Set[str]) -> Dict[str, List[str]]:
+    """
+    获取合约源文件对应的Truffle编译产物
+    :param sol_names: 合约源文件名集合
+    :type sol_names: set[str]
+    :return: 合约源文件名-编译产物文件名列表的映射
+    :rtype: dict[str, list[str]]
+    """
+    build_dir_path = truffle_project_path + 'build/contracts/'
+    artifacts = {sol_name: [] for sol_name in sol_names}
+    if not os.path.exists(build_dir_path):
+        return artifacts
+    for file_name in sorted(os.listdir(build_dir_path)):
+        try:
+            build_info = get_contract_build_info(build_dir_path, file_name, ('sourcePath',))
+        except (OSError, ValueError):
+            continue
+        sol_name = os.path.basename(build_info.get('sourcePath', ''))
+        if sol_name in artifacts:
+            artifacts[sol_name].append(file_name)
+    return artifacts
+
+
+def remove_build_artifacts(artifact_names: List[str]):
+    """
+    删除Truffle编译产物
+    :param artifact_names: 编译产物文件名列表
+    :type artifact_names: list[str]
+    """
+    for artifact_name in artifact_names:
+        artifact_path = truffle_project_path + 'build/contracts/' + artifact_name
+        if os.path.exists(artifact_path):
+            os.remove(artifact_path)
+
+
+def contracts_compile(incremental: bool = True) -> bool:
     """
     编译合约
+    :param incremental: 是否增量编译，即仅重新编译内容或版本发生变化的合约所在的大版本
+    :type incremental: bool
     :return 合约编译过程中是否有出错，出错返回False
     """
     # 创建对应大版本合约文件夹
     comp_dir_path = truffle_project_path + 'contracts'
     handle_path_same_name(comp_dir_path, comp_dir_path + '0')  # 防止编译文件夹重名
+    manifest = load_compile_manifest() if incremental else {}
     for i in range(contract_min_version, contract_max_version + 1):
-        remove_dir(comp_dir_path + f'_{i}')
+        if not incremental:
+            remove_dir(comp_dir_path + f'_{i}')
         make_dir(comp_dir_path + f'_{i}')
 
-    # 获取版本信息并将合约移入对应大版本文件夹
-    files = os.listdir(tmp_sol_dir_path)
-    for file_name in files:
+    # 获取版本信息并将新增或修改的合约移入对应大版本文件夹
+    dirty_versions = set()  # 需要重新编译的大版本
+    dirty_sol_names = set()  # 需要重新编译的合约
+    sol_names = set()
+    pragma_cache = load_pragma_cache()
+    source_infos = {}
+    file_hashes = {}
+    for file_name in os.listdir(tmp_sol_dir_path):
         file_path = tmp_sol_dir_path + file_name
         if os.path.isfile(file_path):
-            version_set = get_sol_version(file_path)
-            # print(versionSet[0])
-            shutil.copy(file_path, comp_dir_path + '_' + version_set[0])
+            file_hashes[file_name] = get_file_hash(file_path)
+            source_infos[file_name] = get_sol_source_info(file_path, file_hashes[file_name], pragma_cache)
+    compile_versions, version_errors = resolve_compile_versions(source_infos)
+    for file_name in sorted(source_infos):
+        file_path = tmp_sol_dir_path + file_name
+        compiler_version = compile_versions.get(file_name)
+        if compiler_version is None:
+            print(f'Skip {file_name}: {version_errors[file_name]}.')
+            metrics.record_item('compile', file_name, 'skipped', reason='no installed compiler')
+            continue
+        version = int(compiler_version.split('.')[1])
+        if not contract_min_version <= version <= contract_max_version:
+            print(f'Skip {file_name}: version {"; ".join(source_infos[file_name]["pragmas"])} is not supported.')
+            metrics.record_item('compile', file_name, 'skipped', reason='unsupported version')
+            continue
+        sol_names.add(file_name)
+        file_hash = file_hashes[file_name]
+        entry = manifest.get(file_name)
+        if entry and entry['hash'] == file_hash and entry['version'] == version \
+                and entry['compiler'] == compiler_version and entry['ok']:
+            continue  # 合约未变化，复用编译产物
+        if entry:  # 删除旧的合约文件和编译产物
+            old_file_path = comp_dir_path + f'_{entry["version"]}/' + file_name
+            if os.path.exists(old_file_path):
+                os.remove(old_file_path)
+            remove_build_artifacts(entry['artifacts'])
+            dirty_versions.add(entry['version'])
+        shutil.copy(file_path, comp_dir_path + f'_{version}')
+        manifest[file_name] = {'hash': file_hash, 'pragma': '; '.join(source_infos[file_name]['pragmas']),
+                               'version': version, 'compiler': compiler_version, 'artifacts': [], 'ok': False}
+        dirty_versions.add(version)
+        dirty_sol_names.add(file_name)
+    with open(pragma_cache_file_path, 'w') as fo:
+        json.dump({file_hash: pragma_cache[file_hash] for file_hash in file_hashes.values()}, fo)
+    # 删除已移除的合约
+    for file_name in list(manifest.keys()):
+        if file_name not in sol_names:
+            entry = manifest.pop(file_name)
+            old_file_path = comp_dir_path + f'_{entry["version"]}/' + file_name
+            if os.path.exists(old_file_path):
+                os.remove(old_file_path)
+            remove_build_artifacts(entry['artifacts'])
     print('Preparation before compilation is done.')
 
-    # 对每个大版本合约分别编译
+    # 对每个有变化的大版本合约分别在独立的工作区中并发编译，按需将大版本分片编译
     comp_flag = True
+    compiled_sol_names = set()
+    failed_sol_names = set()
     for i in range(contract_min_version, contract_max_version + 1):
-        contract_dir_path = comp_dir_path + f'_{i}'
-        os.rename(contract_dir_path, comp_dir_path)
-        set_compile_version(compile_version_list[i - 1])  # 设置Truffle合约编译器版本
-        if contracts_compile_by_truffle():  # 编译合约
-            print(f'Version {i} contracts compiled successfully.')
-        else:
-            comp_flag = False
-            print(f'Version {i} contracts compiled failed.')
-        os.rename(comp_dir_path, contract_dir_path)
+        if i not in dirty_versions:
+            print(f'Version {i} contracts are up to date.')
+    dirty_version_list = sorted(dirty_versions)
+    with ThreadPoolExecutor(max_workers=max(1, compile_jobs)) as executor:
+        futures = []
+        for i in dirty_version_list:
+            contract_dir_path = comp_dir_path + f'_{i}/'
+            # 大版本内的合约按具体编译器版本分批编译
+            compiler_sol_names = {}
+            for sol_name, entry in sorted(manifest.items()):
+                if entry['version'] == i:
+                    compiler_sol_names.setdefault(entry['compiler'], []).append(sol_name)
+            for compiler_version, version_sol_names in sorted(compiler_sol_names.items()):
+                if compile_shard_size > 0:
+                    shards = get_compile_shards(contract_dir_path, version_sol_names, compile_shard_size)
+                else:
+                    shards = [[version_sol_names]]
+                shards = [shard for shard in shards  # 跳过未修改的分片
+                          if any(sol_name in dirty_sol_names for group in shard for sol_name in group)]
+                for shard_no, shard in enumerate(shards):
+                    futures.append((i, executor.submit(contracts_compile_shard, compiler_version, contract_dir_path,
+                                                       shard, manifest, f'{compiler_version}_{shard_no}')))
+        for i, future in futures:
+            ok_sol_names, bad_sol_names = future.result()
+            compiled_sol_names.update(ok_sol_names)
+            failed_sol_names.update(bad_sol_names)
+        for i in dirty_version_list:
+            bad_num = len([name for name in failed_sol_names if manifest[name]['version'] == i])
+            if not bad_num:
+                print(f'Version {i} contracts compiled successfully.')
+            elif compile_shard_size > 0:
+                print(f'Version {i} contracts compiled with {bad_num} failed contracts excluded.')
+            else:
+                comp_flag = False
+                print(f'Version {i} contracts compiled failed.')
+    # 排除分片编译中失败的合约，下次运行时重新编译
+    for sol_name in sorted(failed_sol_names):
+        metrics.record_item('compile', sol_name, 'failed', reason='compilation failed')
+        if compile_shard_size > 0:
+            print(f'Exclude {sol_name}: compilation failed.')
+            os.remove(comp_dir_path + f'_{manifest[sol_name]["version"]}/' + sol_name)
+    # 记录编译成功的合约的编译产物
+    for sol_name, artifact_names in get_build_artifacts(compiled_sol_names).items():
+        metrics.record_item('compile', sol_name, 'processed')
+        manifest[sol_name]['artifacts'] = artifact_names
+        manifest[sol_name]['ok'] = True
     print('Compilation is done!\n')
-    if not comp_flag:
-        for i in range(contract_min_version, contract_max_version + 1):
-            shutil.rmtree(comp_dir_path + f'_{i}')  # 用于将contracts_X目录删除*
+    # 编译失败时保留contracts_X目录，失败的合约在清单中未标记为成功，下次运行时仅重新编译其所在的大版本
+    save_compile_manifest(manifest)
     return comp_flag
 
 
-def contracts_compile_by_truffle() -> bool:
+def contracts_compile_by_truffle(workspace_path: str, log_file_path: str = '') -> bool:
     """
-    对每个大版本版本的合约进行编译
+    在Truffle工作区中编译合约
+    :param workspace_path: Truffle工作区目录
+    :type workspace_path: str
+    :param log_file_path: 编译输出的日志文件路径，为空时不写日志
+    :type log_file_path: str
     :return 编译是否成功
     """
-    os.chdir(truffle_project_path + 'contracts')
-    if not os.listdir(os.curdir):  # 若编译文件夹为空则返回
+    if not os.listdir(workspace_path + 'contracts'):  # 若编译文件夹为空则返回
         return True
 
-    # 使用Truffle进行编译
-    compile_info = subprocess.getstatusoutput('truffle compile')
-    # print(compileInfo)
-    if compile_info[0] == 0:  # 编译成功
+    # 使用Truffle进行编译，输出流式写入日志
+    try:
+        result = runner.run(['truffle', 'compile'], cwd=workspace_path, timeout=compile_timeout,
+                            log_file_path=log_file_path)
+    except OSError as e:  # 未安装Truffle等无法执行编译命令的情况，与编译失败同样处理
+        print(f'{type(e).__name__}: {e}')
+        return False
+    if result.returncode == 0:  # 编译成功
         return True
     else:
-        print(compile_info[1])  # 编译失败输出编译信息
+        print(result.get_tail())  # 编译失败输出编译信息的末尾和日志路径
         return False
 
 
-def get_contract_build_info(dir_path: str, file_name: str) -> dict:
+def get_sol_imports_from_source(source: str) -> List[str]:
     """
-    获取Truffle编译合约后的json文件信息
+    获取合约源码导入的文件名
+    :param source: 合约源码
+    :type source: str
+    :return: 导入的文件名列表
+    :rtype: list[str]
+    """
+    return [os.path.basename(path)
+            for path in re.findall(r'^\s*import\s+(?:[^;]*?\s+from\s+)?["\']([^"\']+)["\']', source, re.M)]
+
+
+def get_sol_imports(file_path: str) -> List[str]:
+    """
+    获取合约文件导入的文件名
+    :param file_path: 合约文件路径
+    :type file_path: str
+    :return: 导入的文件名列表
+    :rtype: list[str]
+    """
+    with open(file_path, errors='ignore') as fo:
+        return get_sol_imports_from_source(fo.read())
+
+
+def get_import_groups(sol_imports: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    将存在导入关系的合约合并为依赖分组
+    :param sol_imports: 合约文件名-导入的文件名列表的映射
+    :type sol_imports: dict[str, list[str]]
+    :return: 依赖分组列表，每个分组为合约文件名列表
+    :rtype: list[list[str]]
+    """
+    # 并查集合并存在导入关系的合约
+    parent = {sol_name: sol_name for sol_name in sol_imports}
+
+    def find(sol_name: str) -> str:
+        while parent[sol_name] != sol_name:
+            parent[sol_name] = parent[parent[sol_name]]
+            sol_name = parent[sol_name]
+        return sol_name
+
+    for sol_name, import_names in sol_imports.items():
+        for import_name in import_names:
+            if import_name in parent:
+                parent[find(import_name)] = find(sol_name)
+    groups = {}
+    for sol_name in sol_imports:
+        groups.setdefault(find(sol_name), []).append(sol_name)
+    return list(groups.values())
+
+
+def get_import_closure(sol_name: str, sol_imports: Dict[str, List[str]]) -> Set[str]:
+    """
+    获取合约及其直接和间接导入的合约
+    :param sol_name: 合约文件名
+    :type sol_name: str
+    :param sol_imports: 合约文件名-导入的文件名列表的映射，不在其中的导入文件被忽略
+    :type sol_imports: dict[str, list[str]]
+    :return: 合约文件名集合，包括sol_name
+    :rtype: set[str]
+    """
+    closure = {sol_name}
+    pending = [sol_name]
+    while pending:
+        for import_name in sol_imports[pending.pop()]:
+            if import_name in sol_imports and import_name not in closure:
+                closure.add(import_name)
+                pending.append(import_name)
+    return closure
+
+
+def get_import_sources(contract_dir_path: str, sol_names: List[str]) -> Dict[str, str]:
+    """
+    获取待编译合约及其直接和间接导入的合约的源文件：导入的合约按自身的版本声明可能位于其他大版本目录，
+    不在contract_dir_path中时取自合约暂存目录
+    :param contract_dir_path: 待编译合约所在目录
+    :type contract_dir_path: str
+    :param sol_names: 待编译的合约文件名列表
+    :type sol_names: list[str]
+    :return: 合约文件名-源文件路径的映射
+    :rtype: dict[str, str]
+    """
+    sources = {}
+    pending = list(sol_names)
+    while pending:
+        sol_name = pending.pop()
+        if sol_name in sources:
+            continue
+        for dir_path in (contract_dir_path, tmp_sol_dir_path):
+            if os.path.isfile(dir_path + sol_name):
+                sources[sol_name] = dir_path + sol_name
+                pending.extend(get_sol_imports(sources[sol_name]))
+                break
+    return sources
+
+
+def get_compile_shards(contract_dir_path: str, sol_names: List[str], shard_size: int) -> List[List[List[str]]]:
+    """
+    将合约按导入依赖分组，并将分组打包成分片，保证导入的合约在同一分片内
+    :param contract_dir_path: 合约所在目录
+    :type contract_dir_path: str
+    :param sol_names: 合约文件名列表
+    :type sol_names: list[str]
+    :param shard_size: 分片的合约数上限，单个依赖分组超过上限时独占一个分片
+    :type shard_size: int
+    :return: 分片列表，每个分片为依赖分组的列表，每个分组为合约文件名列表
+    :rtype: list[list[list[str]]]
+    """
+    groups = get_import_groups({sol_name: get_sol_imports(contract_dir_path + sol_name) for sol_name in sol_names})
+
+    # 按顺序将分组装入分片
+    shards = []
+    shard = []
+    shard_len = 0
+    for group in groups:
+        if shard and shard_len + len(group) > shard_size:
+            shards.append(shard)
+            shard = []
+            shard_len = 0
+        shard.append(group)
+        shard_len += len(group)
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def contracts_compile_shard(version_str: str, contract_dir_path: str, shard: List[List[str]], manifest: dict,
+                            workspace_name: str) -> Tuple[List[str], List[str]]:
+    """
+    编译一个合约分片，失败时二分分片以定位编译失败的依赖分组
+    :param version_str: 编译器版本
+    :type version_str: str
+    :param contract_dir_path: 合约所在目录
+    :type contract_dir_path: str
+    :param shard: 依赖分组的列表，每个分组为合约文件名列表
+    :type shard: list[list[str]]
+    :param manifest: 编译清单，用于查找可复用的编译产物
+    :type manifest: dict
+    :param workspace_name: 工作区名称
+    :type workspace_name: str
+    :return: 二元组包括：编译成功的合约文件名列表和编译失败的合约文件名列表
+    :rtype: tuple[list[str], list[str]]
+    """
+    sol_names = [sol_name for group in shard for sol_name in group]
+    reused_artifacts = [artifact_name for sol_name in sol_names if manifest[sol_name]['ok']
+                        for artifact_name in manifest[sol_name]['artifacts']]
+    if compiler_backend == 'solc':
+        compiled = contracts_compile_by_solc(version_str, contract_dir_path, sol_names)
+    else:
+        compiled = contracts_compile_in_workspace(version_str, contract_dir_path, sol_names, reused_artifacts,
+                                                  workspace_name)
+    if compiled:
+        return sol_names, []
+    if len(shard) == 1 or compile_shard_size <= 0:  # 单个依赖分组无法再拆分
+        return [], sol_names
+    mid = len(shard) // 2
+    ok_left, bad_left = contracts_compile_shard(version_str, contract_dir_path, shard[:mid], manifest,
+                                                workspace_name + 'a')
+    ok_right, bad_right = contracts_compile_shard(version_str, contract_dir_path, shard[mid:], manifest,
+                                                  workspace_name + 'b')
+    return ok_left + ok_right, bad_left + bad_right
+
+
+def contracts_compile_in_workspace(version_str: str, contract_dir_path: str, sol_names: List[str],
+                                   reused_artifacts: List[str], workspace_name: str) -> bool:
+    """
+    在独立的临时Truffle工作区中编译一批合约，并将编译产物合并到项目的build/contracts目录
+    :param version_str: 编译器版本
+    :type version_str: str
+    :param contract_dir_path: 待编译合约所在目录
+    :type contract_dir_path: str
+    :param sol_names: 待编译的合约文件名列表
+    :type sol_names: list[str]
+    :param reused_artifacts: 可复用的已有编译产物文件名列表，Truffle据此跳过未修改的合约
+    :type reused_artifacts: list[str]
+    :param workspace_name: 工作区名称
+    :type workspace_name: str
+    :return 编译是否成功
+    """
+    build_dir_path = truffle_project_path + 'build/contracts/'
+    make_dir(compile_workspace_dir_path)
+    workspace_path = tempfile.mkdtemp(prefix=workspace_name + '_', dir=compile_workspace_dir_path) + '/'
+    try:
+        # 生成工作区的合约目录、编译器配置和已有编译产物
+        os.makedirs(workspace_path + 'contracts')
+        source_paths = get_import_sources(contract_dir_path, sol_names)
+        for source_path in source_paths.values():
+            shutil.copy2(source_path, workspace_path + 'contracts/')
+        set_compile_version(version_str, truffle_project_path + 'truffle-config.js',
+                            workspace_path + 'truffle-config.js')
+        os.makedirs(workspace_path + 'build/contracts')
+        for artifact_name in reused_artifacts:
+            if os.path.exists(build_dir_path + artifact_name):
+                shutil.copy2(build_dir_path + artifact_name, workspace_path + 'build/contracts/')
+        if not contracts_compile_by_truffle(workspace_path, log_dir_path + f'compile_{workspace_name}.log'):
+            return False
+        # 合并编译产物，仅为编译导入而加入的合约由其自身所在的批次按其版本编译
+        os.makedirs(build_dir_path, exist_ok=True)
+        sol_name_set = set(sol_names)
+        for artifact_name in os.listdir(workspace_path + 'build/contracts'):
+            if len(source_paths) > len(sol_name_set):
+                build_info = get_contract_build_info(workspace_path + 'build/contracts/', artifact_name,
+                                                     ('sourcePath',))
+                if os.path.basename(build_info.get('sourcePath', '')) not in sol_name_set:
+                    continue
+            shutil.copy2(workspace_path + 'build/contracts/' + artifact_name, build_dir_path)
+        return True
+    finally:
+        shutil.rmtree(workspace_path, ignore_errors=True)
+
+
+def get_solc_path(version_str: str) -> str:
+    """
+    获取本地已安装的指定版本solc编译器路径
+    :param version_str: 编译器版本
+    :type version_str: str
+    :return: 编译器路径，未安装时返回None
+    :rtype: str
+    """
+    for file_name in (f'solc-{version_str}', f'solc-v{version_str}', f'solc-{version_str}.exe'):
+        if os.path.isfile(solc_bin_dir_path + file_name):
+            return solc_bin_dir_path + file_name
+    return None
+
+
+def contracts_compile_by_solc(version_str: str, contract_dir_path: str, sol_names: List[str]) -> bool:
+    """
+    使用本地solc编译器的standard-JSON接口批量编译合约，直接生成ABI和BIN文件
+    :param version_str: 编译器版本
+    :type version_str: str
+    :param contract_dir_path: 待编译合约所在目录
+    :type contract_dir_path: str
+    :param sol_names: 待编译的合约文件名列表
+    :type sol_names: list[str]
+    :return 编译是否成功
+    """
+    solc_path = get_solc_path(version_str)
+    if solc_path is None:
+        print(f'Solc {version_str} is not found in {solc_bin_dir_path}')
+        return False
+    if not sol_names:
+        return True
+
+    # 构造standard-JSON输入，加入被导入的合约，仅请求ABI和字节码输出
+    sources = {}
+    for sol_name, source_path in get_import_sources(contract_dir_path, sol_names).items():
+        with open(source_path) as fo:
+            sources[sol_name] = {'content': fo.read()}
+    std_input = {
+        'language': 'Solidity',
+        'sources': sources,
+        'settings': {'outputSelection': {sol_name: {'*': ['abi', 'evm.bytecode.object', 'evm.deployedBytecode.object']}
+                                         for sol_name in sol_names}},
+    }
+    try:
+        result = runner.run([solc_path, '--standard-json'], input=json.dumps(std_input), timeout=compile_timeout,
+                            capture=True, merge_stderr=False)
+    except OSError as e:  # 编译器不可执行等情况，与编译失败同样处理
+        print(f'{type(e).__name__}: {e}')
+        return False
+    try:
+        output = json.loads(result.output)
+    except ValueError:
+        print(result.get_tail())  # 编译失败输出编译信息
+        return False
+    errors = [err for err in output.get('errors', []) if err.get('severity') == 'error']
+    if result.returncode != 0 or errors:
+        for err in errors:
+            print(err.get('formattedMessage', err.get('message')))  # 编译失败输出编译信息
+        return False
+
+    # 由编译输出直接生成ABI、BIN文件和供Truffle部署使用的精简编译产物
+    build_dir_path = truffle_project_path + 'build/contracts/'
+    make_dir(abi_dir_path)
+    make_dir(bin_dir_path)
+    os.makedirs(build_dir_path, exist_ok=True)
+    for sol_name in sol_names:
+        for contract_name, contract_output in output.get('contracts', {}).get(sol_name, {}).items():
+            build_info = {
+                'contractName': contract_name,
+                'abi': contract_output['abi'],
+                'bytecode': '0x' + contract_output['evm']['bytecode']['object'],
+                'deployedBytecode': '0x' + contract_output['evm']['deployedBytecode']['object'],
+                'sourcePath': contract_dir_path + sol_name,
+                'compiler': {'name': 'solc', 'version': version_str},
+            }
+            get_contract_ABI(build_info)
+            get_contract_BIN(build_info)
+            with open(build_dir_path + contract_name + '.json', 'w') as wfo:
+                json.dump(build_info, wfo)
+    return True
+
+
+BUILD_INFO_FIELDS = ('contractName', 'abi', 'bytecode', 'deployedBytecode')  # 需要从编译信息中读取的字段
+
+
+def get_contract_build_info(dir_path: str, file_name: str, fields: Iterable[str] = BUILD_INFO_FIELDS) -> dict:
+    """
+    获取Truffle编译合约后的json文件信息，流式读取所需字段并跳过AST等无关字段
     :param dir_path: json文件目录
     :type dir_path: str
     :param file_name: 合约文件名
     :type file_name: str
-    :return: 编译后的信息json对象
+    :param fields: 需要读取的字段
+    :type fields: Iterable[str]
+    :return: 编译后的信息json对象（仅包含所需字段）
     :rtype: dict
     """
-    with open(dir_path + file_name) as rfo:
-        return json.load(rfo)
+    return load_json_fields(dir_path + file_name, fields)
 
 
 def get_contract_ABI(build_info: dict):
@@ -174,12 +870,17 @@ def get_contract_ABI(build_info: dict):
         json.dump(build_info['abi'], wfo)
 
 
-def get_contract_BIN(build_info: dict):
+def get_contract_BIN(build_info: dict, corpus_writer: BytecodeCorpusWriter = None):
     """
     从编译信息中获取合约的BIN文件（runtime字节码）
     :param build_info: 合约编译信息
     :type build_info: dict
+    :param corpus_writer: BIN语料写入器，不为None时将原始字节码追加到语料中而不写BIN文件
+    :type corpus_writer: BytecodeCorpusWriter
     """
+    if corpus_writer is not None:
+        corpus_writer.add(build_info['contractName'], read_bytecode_hex(build_info['deployedBytecode']))
+        return
     file_name = build_info['contractName'] + '.bin'
     with open(bin_dir_path + file_name, 'w') as wfo:
         tmp = build_info['deployedBytecode'].lstrip('0x')
@@ -192,156 +893,299 @@ def get_contract_runtime_BIN(build_info: dict):
         wfo.write(build_info['deployedBytecode'])
 
 
-def get_ABIs_and_BINs():
-    """获取合约的ABI和BIN"""
+def iter_ABIs_and_BINs() -> Iterator[dict]:
+    """
+    逐个提取合约的ABI和BIN
+    :return: 生成器，依次产生各合约的编译信息（contractName、abi、bytecode和deployedBytecode）
+    :rtype: Iterator[dict]
+    """
     build_dir_path = truffle_project_path + 'build/contracts/'
     # 创建存放目录
     make_dir(abi_dir_path)
-    make_dir(bin_dir_path)
+    if not bin_corpus_file_path:
+        make_dir(bin_dir_path)
     # make_dir(runtime_bin_dir_path)
 
-    # 遍历合约编译后的文件提取ABI和BIN
-    files = os.listdir(build_dir_path)
-    for file_name in files:
-        file_path = build_dir_path + file_name
-        if os.path.isfile(file_path):
-            try:
-                build_info = get_contract_build_info(build_dir_path, file_name)
-                get_contract_ABI(build_info)
-                get_contract_BIN(build_info)
-                # get_contract_runtime_BIN(build_info)
-            except:
-                continue
+    # 遍历合约编译后的文件提取ABI和BIN，BIN语料在全部提取完成后才替换原语料文件
+    with os.scandir(build_dir_path) as entries, \
+            (BytecodeCorpusWriter(bin_corpus_file_path) if bin_corpus_file_path else nullcontext()) as corpus_writer:
+        for entry in entries:
+            if entry.is_file():
+                try:
+                    with metrics.item('extract', entry.name.replace('.json', '')):
+                        build_info = get_contract_build_info(build_dir_path, entry.name)
+                        get_contract_ABI(build_info)
+                        get_contract_BIN(build_info, corpus_writer)
+                        # get_contract_runtime_BIN(build_info)
+                except (OSError, AttributeError, KeyError, TypeError, ValueError) as e:  # 非编译产物或编译产物不完整
+                    print(f'Skip {entry.name}: {type(e).__name__}: {e}')
+                    continue
+                yield build_info
+    if bin_corpus_file_path:
+        print(f'BINs are packed into {bin_corpus_file_path}')
+
+
+def get_ABIs_and_BINs() -> Dict[str, dict]:
+    """
+    获取合约的ABI和BIN
+    :return: 合约名-编译信息（contractName、abi、bytecode和deployedBytecode）的映射，供后续阶段直接使用
+    :rtype: dict[str, dict]
+    """
+    contracts = {build_info['contractName']: build_info for build_info in iter_ABIs_and_BINs()}
     print("Got contracts' ABIs and BINs!\n")
+    return contracts
 
 
-def set_compile_version(version_str: str):
+def set_compile_version(version_str: str, config_file: str = None, dest_config_file: str = None):
     """
     设置truffle-config.js文件中的solc版本
     :param version_str：需要设定的版本
     :type version_str: str
+    :param config_file: 原配置文件路径，默认为Truffle项目的truffle-config.js
+    :type config_file: str
+    :param dest_config_file: 生成的配置文件路径，默认覆盖原配置文件
+    :type dest_config_file: str
     """
-    config_file = truffle_project_path + 'truffle-config.js'
-    tmp_config_file = truffle_project_path + '.truffle-config.js.bak'
+    if config_file is None:
+        config_file = truffle_project_path + 'truffle-config.js'
+    tmp_config_file = (dest_config_file or config_file) + '.bak'
     with open(config_file) as rfo, open(tmp_config_file, 'w') as wfo:
         for line in rfo:
             wfo.write(re.sub(r'(?<=\s)version: "0.(\d)+.\d+"', f'version: "{version_str}"', line))
-    os.remove(config_file)
-    os.rename(tmp_config_file, config_file)
+    os.replace(tmp_config_file, dest_config_file or config_file)
     print(f'Truffle compiled version is set to {version_str}')
 
 
-def check_contract_constructor(file_name: str) -> List[dict]:
+def check_contract_constructor(file_name: str, abi: list = None) -> List[dict]:
     """
-    检查合约的构造函数， 若需要输入参数则进行输入
+    检查合约的构造函数， 若需要参数则由构造函数参数提供者设置参数值
     :param file_name: 合约文件名
     :type file_name: str
+    :param abi: 合约ABI的json对象，为None时读取合约对应ABI文件
+    :type abi: list
     :return: inputs：构造函数输入的对象列表
     :rtype: list[dict]
     """
     # 打开合约对应ABI文件
     file_name = file_name.replace('.sol', '.abi')
-    try:
-        with open(abi_dir_path + file_name) as fo:
-            abi = json.load(fo)
-    except FileNotFoundError:
-        print(f"Can't find ABI file of {file_name}")
-        return None
+    if abi is None:
+        try:
+            with open(abi_dir_path + file_name) as fo:
+                abi = json.load(fo)
+        except FileNotFoundError:
+            print(f"Can't find ABI file of {file_name}")
+            return None
 
     inputs = []
     for elem in abi:
         if 'type' in elem and elem['type'] == 'constructor':
             if 'inputs' in elem and elem['inputs']:  # 判断合约有无构造函数且须参数输入
-                inputs = elem['inputs']
+                inputs = [dict(ipt) for ipt in elem['inputs']]  # 复制以免参数值写入ABI
             break
     if not inputs:
         return None
-    # 进行参数输入
-    print('Please input contract Constructor Parameters:')
-    for ipt in inputs:
-        ipt['value'] = input(f'Param:{ipt["name"]}, Type:{ipt["type"]}, Value: ')
-    return inputs
+    # 由清单或确定性默认值设置参数值
+    return constructor_arg_provider.fill(file_name.replace('.abi', ''), inputs)
 
 
-def create_deploy_files():
-    """创建Truffle部署合约所需的合约部署文件"""
+def create_deploy_files(contracts: Dict[str, dict] = None):
+    """
+    创建Truffle部署合约所需的合约部署文件
+    :param contracts: get_ABIs_and_BINs()返回的合约编译信息，为None时读取ABI文件
+    :type contracts: dict[str, dict]
+    """
     # 创建合约部署文件暂存目录
     remove_dir(tmp_migration_dir_path)
     make_dir(tmp_migration_dir_path)
 
     no = 0
-    mig_group_dir_path = ''
     # 遍历每个合约暂存文件夹，生成合约部署文件，并按照contract_deploying_group_size数目为一组进行分组
+    for sol_name in get_deploying_sol_names():
+        build_info = contracts.get(sol_name.replace('.sol', '')) if contracts else None
+        try:
+            create_contract_deploy_file(no, sol_name, build_info['abi'] if build_info else None)
+        except ValueError as e:  # 构造函数参数类型无法生成默认值等，跳过该合约，其余合约照常部署
+            record_deploy_file_failed(sol_name.replace('.sol', ''), f'{type(e).__name__}: {e}')
+            continue
+        no += 1
+
+    print("Create deploy files successfully!\n")
+
+
+def record_deploy_file_failed(contract_name: str, err: str):
+    """
+    记录无法生成部署文件的合约
+    :param contract_name: 合约名
+    :type contract_name: str
+    :param err: 失败原因
+    :type err: str
+    """
+    print(f'Skip deploying {contract_name}: {err}')
+    metrics.record_item('deploy_files', contract_name, 'failed', reason=err)
+    if journal:
+        journal.mark_failed('deploy_file', contract_name, err)
+
+
+def get_deploying_sol_names() -> List[str]:
+    """
+    获取各合约暂存文件夹中待部署的合约文件名
+    :return: 合约文件名列表
+    :rtype: list[str]
+    """
+    sol_names = []
     for version in range(contract_min_version, contract_max_version + 1):
         contract_dir_path = truffle_project_path + f'contracts_{version}'
-        contracts_list = os.listdir(contract_dir_path)
-        for sol_name in contracts_list:
-            if no % contract_deploying_group_size == 0:
-                mig_group_dir_path = tmp_migration_dir_path + f'group_{no // contract_deploying_group_size}/'
-                os.mkdir(mig_group_dir_path)
-
-            deploy_info = 'Contract'
-            ipt = check_contract_constructor(sol_name)
-            if ipt:  # 合约构造函数须参数添加
-                for i in range(len(ipt)):
-                    deploy_info += f",{ipt[i]['value']}"
-
-            file_content_lists = [f'var Contract = artifacts.require("{sol_name}");\n',
-                                  'module.exports = function(deployer) {\n',
-                                  f'\tdeployer.deploy({deploy_info});\n', '};']
-            with open(mig_group_dir_path + f'{no + 1}_{sol_name}.js', 'w') as fo:
-                fo.writelines(file_content_lists)
-            no += 1
+        sol_names.extend(os.listdir(contract_dir_path))
+    return sol_names
 
-    print("Create deploy files successfully!\n")
+
+def create_contract_deploy_file(no: int, sol_name: str, abi: list = None):
+    """
+    创建单个合约的部署文件，第no个合约放入第no // contract_deploying_group_size组
+    :param no: 合约部署序号
+    :type no: int
+    :param sol_name: 合约文件名
+    :type sol_name: str
+    :param abi: 合约ABI的json对象，为None时读取合约对应ABI文件
+    :type abi: list
+    """
+    deploy_info = 'Contract'
+    ipt = check_contract_constructor(sol_name, abi)  # 先设置参数，无法设置时不创建部署组目录
+    if ipt:  # 合约构造函数须参数添加
+        for i in range(len(ipt)):
+            deploy_info += ',' + to_js_literal(ipt[i]['type'], ipt[i]['value'])
+
+    mig_group_dir_path = tmp_migration_dir_path + f'group_{no // contract_deploying_group_size}/'
+    if no % contract_deploying_group_size == 0:
+        os.mkdir(mig_group_dir_path)
+
+    file_content_lists = [f'var Contract = artifacts.require("{sol_name}");\n',
+                          'module.exports = function(deployer) {\n',
+                          f'\tdeployer.deploy({deploy_info});\n', '};']
+    with open(mig_group_dir_path + f'{no + 1}_{sol_name}.js', 'w') as fo:
+        fo.writelines(file_content_lists)
 
 
 def contracts_deploy():
-    """部署合约到区块链"""
-    # 处理原”migrations“文件，防止重名
-    migration_dir_path = truffle_project_path + 'migrations/'
-    handle_path_same_name(migration_dir_path, truffle_project_path + 'migrations0/')
-
-    # 以组为单位批量部署合约
-    os.chdir(truffle_project_path)
-    addr_map = {}
+    """部署合约到区块链：合约按自适应的组大小分组，各组在独立的工作区中使用不同的网络并发部署"""
+    mig_file_paths = []
     mig_group_dir_list = os.listdir(tmp_migration_dir_path)
     mig_group_dir_list.sort(key=lambda self: int(self.lstrip('group_')))  # 对文件夹排序
     for mig_group_dir_name in mig_group_dir_list:
-        mig_group_dir_path = tmp_migration_dir_path + mig_group_dir_name
-        shutil.copytree(mig_group_dir_path, migration_dir_path)
-        print(f'Start deploying contracts in {mig_group_dir_name}...')
-        deploy_info = subprocess.getstatusoutput('truffle migrate --reset')
-
-        if deploy_info[0] == 0:  # 部署成功
-            print(f'Deploy contracts in {mig_group_dir_name} successfully!')
-            # shutil.rmtree(mig_group_dir_path)  # 用于将合约部署文件暂存目录删除*
+        mig_group_dir_path = tmp_migration_dir_path + mig_group_dir_name + '/'
+        mig_file_names = sorted(os.listdir(mig_group_dir_path), key=lambda self: int(self.split('_', 1)[0]))
+        mig_file_paths.extend(mig_group_dir_path + file_name for file_name in mig_file_names)
+    addr_map = get_deployed_addr_map()
+    for contract_name in addr_map:
+        metrics.record_item('deploy', contract_name, 'skipped', reason='done in journal')
+    mig_file_paths = [file_path for file_path in mig_file_paths  # 跳过运行日志中已部署的合约
+                      if get_migration_contract_name(file_path) not in addr_map]
+    sizer = GroupSizer(contract_deploying_group_size, deploy_group_max_size, deploy_target_latency)
+    scheduler = DeployScheduler(truffle_project_path, deploy_networks, deploy_retries, deploy_workspace_dir_path,
+                                sizer=sizer, log_dir_path=log_dir_path, timeout=deploy_timeout,
+                                on_deployed=lambda name, address: record_deployed({name: address}))  # 逐个立即记录
+    print(f'Start deploying {len(mig_file_paths)} contracts on {len(scheduler.networks)} networks...')
+
+    def report(result: GroupResult):
+        for contract_name in result.addr_map:
+            metrics.record_item('deploy', contract_name, 'processed', result.latency)
+        if result.ok:  # 部署成功
+            print(f'Deploy {len(result.file_paths)} contracts in {result.name} successfully! '
+                  f'({result.latency:.2f}s, next group size {sizer.size})')
         else:  # 部署失败输出部署信息
-            print(f'Deploy contracts in {mig_group_dir_name} failed!')
-            print(deploy_info[1])
-            # 提取部署合约的合约名和合约地址
-        re_str = r"(((Replacing)|(Deploying))\s'(.+)(?='))|> contract address:\s+(0x\w+)|(Error:)"
-        result = re.findall(re_str, deploy_info[1])
-        i = 0
+            print(f'Deploy {len(result.file_paths)} contracts in {result.name} failed! '
+                  f'({len(result.get_undeployed())} undeployed, next group size {sizer.size})')
+            print(result.output)
+        print(result.addr_map)
+
+    addr_map.update(scheduler.deploy(mig_file_paths, report))
+    for file_path in scheduler.failed:
+        print(f'Failed to deploy {os.path.basename(file_path)}.')
+        metrics.record_item('deploy', get_migration_contract_name(file_path), 'failed',
+                            reason='truffle migrate failed')
+        if journal:
+            journal.mark_failed('deploy', get_migration_contract_name(file_path), 'truffle migrate failed')
+    print('Deployment is done!')
+    print(scheduler.get_stats())
+    print(f'Deployed {len(addr_map)} contracts.')
+
+
+def contracts_deploy_by_rpc(contracts: Dict[str, dict] = None):
+    """
+    不经过Truffle，通过JSON-RPC直接发送合约创建交易部署合约，合约地址取自交易收据
+    :param contracts: get_ABIs_and_BINs()返回的合约编译信息，为None时读取编译产物
+    :type contracts: dict[str, dict]
+    """
+    build_dir_path = truffle_project_path + 'build/contracts/'
+    deploying = []
+    addr_map = get_deployed_addr_map()
+    for sol_name in get_deploying_sol_names():
+        contract_name = sol_name.replace('.sol', '')
+        if contract_name in addr_map:  # 跳过运行日志中已部署的合约
+            metrics.record_item('deploy', contract_name, 'skipped', reason='done in journal')
+            continue
         try:
-            while i < len(result):
-                if result[i + 1][6] == '':
-                    addr_map[result[i][4]] = result[i + 1][5]
-                i += 2
-        except IndexError:
-            print('Deploying has an error.')
-        print(addr_map)
-
-        shutil.rmtree(migration_dir_path)
+            if contracts and contract_name in contracts:
+                build_info = contracts[contract_name]
+            else:
+                build_info = get_contract_build_info(build_dir_path, contract_name + '.json')
+            ipt = check_contract_constructor(sol_name, build_info['abi'])
+            deploying.append((contract_name, build_info['bytecode'] + encode_constructor_args(ipt)))
+        except (OSError, KeyError, ValueError) as e:
+            print(f'Skip deploying {contract_name}: {type(e).__name__}: {e}')
+            metrics.record_item('deploy', contract_name, 'failed', reason=f'{type(e).__name__}: {e}')
+            if journal:
+                journal.mark_failed('deploy', contract_name, f'{type(e).__name__}: {e}')
+    print(f'Start deploying {len(deploying)} contracts through {rpc_url}...')
+    client = JSONRPCClient(rpc_url)
+    deployer = RPCDeployer(client, rpc_deploy_accounts or None, rpc_deploy_gas, batch_size=rpc_batch_size)
+    latencies = []
+    results = deployer.deploy(deploying)
+    record_deployed({result.name: result.address for result in results if result.address})
+    for result in results:
+        if result.address:
+            addr_map[result.name] = result.address
+            latencies.append(result.latency)
+            metrics.record_item('deploy', result.name, 'processed', result.latency)
+        else:
+            print(f'Deploy {result.name} failed: {result.error}')
+            metrics.record_item('deploy', result.name, 'failed', result.latency or 0.0, result.error)
+            if journal:
+                journal.mark_failed('deploy', result.name, result.error)
     print('Deployment is done!')
+    if latencies:
+        print(f'Deployment: {len(latencies)}/{len(deploying)} contracts succeeded, {client.requests} RPC requests, '
+              f'latency mean {sum(latencies) / len(latencies):.2f}s, max {max(latencies):.2f}s')
     print(f'Deployed {len(addr_map)} contracts.')
 
-    # 创建合约名-合约地址文件
-    if addr_map:
-        with open(addrmap_file_path, 'w') as fo:
-            for name, address in addr_map.items():
-                fo.write(f'{address},\t{name}\n')
-        print("Contracts' addresses have been saved!\n")
+
+def get_deployed_addr_map() -> Dict[str, str]:
+    """
+    获取运行日志中已部署的合约；不使用运行日志时清空合约地址文件
+    :return: 合约名-合约地址的映射
+    :rtype: dict[str, str]
+    """
+    if journal:
+        return journal.get_done('deploy')
+    if os.path.exists(addrmap_file_path):
+        os.remove(addrmap_file_path)
+    return {}
+
+
+def record_deployed(addr_map: Dict[str, str]):
+    """
+    将已部署的合约追加到合约名-合约地址文件并记入运行日志
+    :param addr_map: 合约名-合约地址的映射
+    :type addr_map: dict[str, str]
+    """
+    if not addr_map:
+        return
+    with open(addrmap_file_path, 'a') as fo:
+        for name, address in addr_map.items():
+            fo.write(f'{address},\t{name}\n')
+    if journal:
+        for name, address in addr_map.items():
+            journal.mark_done('deploy', name, address)
 
 
 def get_funcs(abi: dict) -> List[dict]:
@@ -389,132 +1233,585 @@ def get_func_sig_hash(sig: str) -> str:
     :return bytes4：函数选择器
     :rtype: str
     """
-    s = _pysha3.keccak_256()
-    s.update(sig.encode('utf8'))
-    hex_sig = s.hexdigest()
-    bytes4 = '0x' + hex_sig[:8]  # hash值前4字节
-    return bytes4
+    return selector_index.get_selector(sig)
 
 
-def get_contract_ABI_sig(dir_path: str, file_name: str):
+def get_ABI_sig_list(abi_info: list) -> List[List[str]]:
+    """
+    获取合约ABI中所有函数的选择器和签名
+    :param abi_info: 该合约abi的json对象
+    :type abi_info: list
+    :return: 签名列表，元素为函数选择器和函数签名
+    :rtype: list[list[str]]
+    """
+    sigs = [sig for sig in map(get_func_sig, get_funcs(abi_info)) if sig]  # 获取合约函数列表的函数签名
+    sig_hashes = selector_index.get_selectors(sigs)  # 批量获取函数选择器，重复和已索引的签名不再计算哈希
+    return [[sig_hash, sig] for sig_hash, sig in zip(sig_hashes, sigs)]
+
+
+def save_contract_ABI_sig(file_name: str, abi_info: list, sig_cache: SigCache = None) -> str:
+    """
+    由ABI获取函数选择器并写入文件
+    :param file_name: 合约ABI文件名
+    :type file_name: str
+    :param abi_info: 该合约abi的json对象
+    :type abi_info: list
+    :param sig_cache: 签名结果缓存，为None时不使用缓存
+    :type sig_cache: SigCache
+    :return: 跳过的原因，未跳过时为空字符串
+    :rtype: str
+    """
+    if not abi_info:
+        return 'empty ABI'
+    key = get_ABI_key(abi_info) if sig_cache or journal else None
+    contract_name = file_name.replace('.abi', '')
+    if journal and journal.is_done('abi_sig', contract_name, key):  # 该ABI的签名已写入
+        return 'done in journal'
+    if sig_cache:
+        abi_sigs = sig_cache.get_ABI_sigs(key)
+        if abi_sigs is None:
+            abi_sigs = get_ABI_sig_list(abi_info)
+            sig_cache.put_ABI_sigs(key, abi_sigs)
+        else:
+            selector_index.add_sigs(abi_sigs)
+    else:
+        abi_sigs = get_ABI_sig_list(abi_info)
+    if abi_sigs:
+        with open(abi_sig_dir_path + file_name + '.sig', 'w') as wfo:
+            for sig_hash, sig in abi_sigs:
+                wfo.write(f'{sig_hash}:{sig}\n')
+    if journal:
+        journal.mark_done('abi_sig', contract_name, key)
+    return ''
+
+
+def get_contract_ABI_sig(dir_path: str, file_name: str, sig_cache: SigCache = None) -> str:
     """
     单个文件获取函数选择器
     :param dir_path: 合约ABI文件夹路径
     :type dir_path: str
     :param file_name: 合约ABI文件名
     :type file_name: str
+    :param sig_cache: 签名结果缓存，为None时不使用缓存
+    :type sig_cache: SigCache
+    :return: 跳过的原因，未跳过时为空字符串
+    :rtype: str
     """
     with open(dir_path + file_name) as rfo:
         abi_info = json.load(rfo)
-        if abi_info:
-            func_list = get_funcs(abi_info)  # 获取合约的函数列表
-            if func_list:
-                wfo = open(abi_sig_dir_path + file_name + '.sig', 'w')
-                for func in func_list:
-                    sig = get_func_sig(func)  # 获取函数签名
-                    if sig:
-                        sig_hash = get_func_sig_hash(sig)  # hash处理函数签名获取函数选择器
-                        wfo.write(f'{sig_hash}:{sig}\n')
-                wfo.close()
+    return save_contract_ABI_sig(file_name, abi_info, sig_cache)
 
 
-def get_ABI_sigs():
+def get_ABI_sigs(sig_cache: SigCache = None, contracts: Dict[str, dict] = None):
+    """
+    获取合约的ABI签名
+    :param sig_cache: 签名结果缓存，为None时不使用缓存
+    :type sig_cache: SigCache
+    :param contracts: get_ABIs_and_BINs()返回的合约编译信息，为None时读取ABI文件
+    :type contracts: dict[str, dict]
     """
-    获取合约的ABI签名"""
     make_dir(abi_sig_dir_path)
+    if contracts is not None:
+        for contract_name, build_info in contracts.items():
+            try:
+                with metrics.item('abi_sigs', contract_name) as item:
+                    skip_reason = save_contract_ABI_sig(contract_name + '.abi', build_info['abi'], sig_cache)
+                    if skip_reason:
+                        item.skip(skip_reason)
+            except Exception as e:
+                if journal:
+                    journal.mark_failed('abi_sig', contract_name, f'{type(e).__name__}: {e}')
+                continue
+        print("Got contracts' ABI signatures!\n")
+        return
     abi_dir_list = os.listdir(abi_dir_path)
     for abi_file_name in abi_dir_list:
         try:
-            get_contract_ABI_sig(abi_dir_path, abi_file_name)
-        except:
+            with metrics.item('abi_sigs', abi_file_name.replace('.abi', '')) as item:
+                skip_reason = get_contract_ABI_sig(abi_dir_path, abi_file_name, sig_cache)
+                if skip_reason:
+                    item.skip(skip_reason)
+        except Exception as e:
+            if journal:
+                journal.mark_failed('abi_sig', abi_file_name.replace('.abi', ''), f'{type(e).__name__}: {e}')
             continue
     print("Got contracts' ABI signatures!\n")
 
 
-def get_BIN_sigs():
-    """获取合约的BIN签名"""
+def get_BIN_sigs(jobs: int = 1, sig_cache: SigCache = None, contracts: Dict[str, dict] = None):
+    """
+    获取合约的BIN签名
+    :param jobs: 并行分析的进程数，为1时在当前进程中依次分析
+    :type jobs: int
+    :param sig_cache: 签名结果缓存，为None时不使用缓存
+    :type sig_cache: SigCache
+    :param contracts: get_ABIs_and_BINs()返回的合约编译信息，为None时读取BIN语料或BIN文件
+    :type contracts: dict[str, dict]
+    """
     make_dir(bin_sig_dir_path)
-    bin_dir_list = os.listdir(bin_dir_path)
-    for bin_file_name in bin_dir_list:
-        # print(bin_file_name)
-        if os.path.isfile(bin_dir_path + bin_file_name):
-            try:
-                get_contract_BIN_sig(bin_dir_path, bin_file_name)
-            except:
-                continue
+    corpus = None
+    if contracts is not None:
+        bin_codes = {contract_name + '.bin': build_info['deployedBytecode']
+                     for contract_name, build_info in contracts.items()}
+    elif bin_corpus_file_path:  # 字节码为语料映射上的切片，单进程分析时不复制
+        corpus = BytecodeCorpus(bin_corpus_file_path)
+        bin_codes = {name + '.bin': corpus.get(name) for name in corpus.names()}
+    else:
+        bin_codes = {}
+        for file_name in os.listdir(bin_dir_path):
+            if os.path.isfile(bin_dir_path + file_name):
+                bin_codes[file_name] = None  # 分析时读取BIN文件
+    bin_file_names = sorted(bin_codes)
+    # 按去除元数据后的字节码哈希将合约分组，跳过运行日志中已完成的合约，再查询缓存，每组仅分析首个未完成的合约
+    groups = {}  # 字节码哈希-合约BIN文件名列表的映射
+    bodies = {}  # 字节码哈希-待分析字节码的映射
+    bin_keys = {}
+    for file_name in list(bin_file_names):
+        if bin_codes[file_name] is None:
+            with open(bin_dir_path + file_name) as fo:
+                bin_codes[file_name] = fo.read()
+        body = get_BIN_body(bin_codes[file_name])
+        if not len(body):  # 接口、抽象合约或含未链接库占位符的字节码无可分析的代码，不参与分组
+            bin_file_names.remove(file_name)
+            metrics.record_item('bin_sigs', file_name.replace('.bin', ''), 'skipped',
+                                reason='empty or unlinked bytecode')
+            bin_codes[file_name] = None
+            continue
+        bin_keys[file_name] = key = get_BIN_key(body)
+        groups.setdefault(key, []).append(file_name)
+        if journal and journal.is_done('bin_sig', file_name.replace('.bin', ''), key):
+            bin_file_names.remove(file_name)
+            metrics.record_item('bin_sigs', file_name.replace('.bin', ''), 'skipped', reason='done in journal')
+            continue
+        bodies.setdefault(key, body)
+        bin_codes[file_name] = None  # 释放已哈希的字节码
+    if bin_dedup:
+        save_clone_report(groups)
+    group_results = {}
+    if sig_cache:
+        for key in bodies:
+            bin_sigs_dict = sig_cache.get_BIN_sigs(key)
+            if bin_sigs_dict is not None:
+                group_results[key] = ('', bin_sigs_dict, '', 0.0, [])
+    analyzing = {}  # 字节码哈希-组内分析的合约BIN文件名的映射
+    for file_name in bin_file_names:
+        analyzing.setdefault(bin_keys[file_name], file_name)
+    tasks = [(bin_dir_path, file_name, disasm_backend, bodies.pop(key) if jobs == 1 else bytes(bodies.pop(key)))
+             for key, file_name in analyzing.items() if key not in group_results]  # 传给进程池的切片须复制
+    if jobs > 1:
+        chunk_size = max(1, len(tasks) // (jobs * 4))  # 分块提交，减少进程间通信次数
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            analyzed = list(executor.map(analyze_contract_BIN_task, tasks, chunksize=chunk_size))
+    else:
+        analyzed = [analyze_contract_BIN_task(task) for task in tasks]
+    if corpus is not None:  # 释放全部切片后关闭语料映射
+        tasks = body = None
+        bin_codes.clear()
+        bodies.clear()
+        corpus.close()
+    for result in analyzed:
+        group_results[bin_keys[result[0]]] = result
+        metrics.add_subprocesses(result[4])
+        if sig_cache and not result[2]:
+            sig_cache.put_BIN_sigs(bin_keys[result[0]], result[1])
+
+    # 将各组的分析结果分发给组内的全部合约，按文件名顺序写入BIN签名文件，并逐个报告失败的合约
+    failed_num = 0
+    for file_name in bin_file_names:
+        key = bin_keys[file_name]
+        analyzed_file_name, bin_sigs_dict, err, seconds, _ = group_results[key]
+        if analyzed_file_name != file_name:  # 克隆合约复用分析结果
+            seconds = 0.0
+        metrics.record_item('bin_sigs', file_name.replace('.bin', ''), 'failed' if err else 'processed', seconds, err)
+        if err:
+            failed_num += 1
+            print(f'Failed to get BIN signatures of {file_name}: {err}')
+            if journal:
+                journal.mark_failed('bin_sig', file_name.replace('.bin', ''), err)
+            continue
+        if bin_sigs_dict:
+            save_contract_BIN_sig(file_name, bin_sigs_dict)
+        if journal:
+            journal.mark_done('bin_sig', file_name.replace('.bin', ''), key)
+    if failed_num:
+        print(f'{failed_num}/{len(bin_file_names)} contracts failed.')
+    print(f'Analyzed {len(analyzed)} unique bytecodes for {len(bin_file_names)} contracts.')
     print("Got contracts' BIN signatures!\n")
 
 
-def save_func_disasm_codes(func_sig: str, func_codes: List[List[str]]):
+def get_BIN_body(code: Union[str, bytes]) -> bytes:
+    """
+    获取用于分组和缓存的runtime字节码：按bin_dedup去除末尾的Solidity元数据，仅元数据不同的克隆合约得到相同的字节码
+    :param code: 十六进制runtime字节码，或原始runtime字节码（如BIN语料中的切片）
+    :type code: str or bytes
+    :return: 字节码，原始字节码为memoryview时返回其切片
+    :rtype: bytes
+    """
+    if isinstance(code, str):
+        code = read_bytecode_hex(code)
+    return strip_metadata(code) if bin_dedup else code
+
+
+def save_clone_report(groups: Dict[str, List[str]]):
+    """
+    输出克隆合约报告：按组大小降序列出各组的合约数、字节码哈希和合约名
+    :param groups: 字节码哈希-合约BIN文件名列表的映射
+    :type groups: dict[str, list[str]]
+    """
+    clone_groups = sorted(((key, group) for key, group in groups.items() if len(group) > 1),
+                          key=lambda item: -len(item[1]))
+    with open(clone_report_file_path, 'w') as fo:
+        fo.write('size,bytecode_hash,contracts\n')
+        for key, group in clone_groups:
+            fo.write(f'{len(group)},{key},{" ".join(sorted(name.replace(".bin", "") for name in group))}\n')
+    clone_num = sum(len(group) for _, group in clone_groups)
+    print(f'{sum(len(group) for group in groups.values())} contracts have {len(groups)} unique bytecodes: '
+          f'{clone_num} contracts in {len(clone_groups)} clone groups '
+          f'(largest {len(clone_groups[0][1]) if clone_groups else 0}), report is written to {clone_report_file_path}')
+
+
+def save_func_disasm_codes(cds: ContractDisasm, func_sig: str, func_codes: List[range]):
     """
     存储分段后的函数反汇编代码
+    :param cds: 合约反汇编对象
+    :type cds: ContractDisasm
     :param func_sig: 函数签名
     :type func_sig: str
-    :param func_codes: 函数代码列表
-    :type func_codes: list[list[str]]
+    :param func_codes: 函数代码段列表
+    :type func_codes: list[range]
     """
     with open(bin_sig_dir_path + func_sig + '.asm', 'w') as wfo:
         for code in func_codes:
-            for c in code:
-                wfo.write(f'{c}\n')
+            for line_no in code:
+                wfo.write(f'{cds.get_code_str(line_no)}\n')
             wfo.write('\n\n')
 
 
-def has_CALL_opcode(func_codes: List[List[str]], i: int) -> bool:
+def get_extern_call_sigs_from_blocks(cds: ContractDisasm, func_blocks: Tuple[int, ...]) -> Set[str]:
     """
-    判断函数第i段代码是否含有CALL字节码
-    :param func_codes: 函数代码列表
-    :type func_codes: list[list[str]]
-    :param i: 代码段的序号
-    :type i: int
-    :return: 是否含有CALL
-    """
-    for code in func_codes[i]:
-        if code == 'CALL':
-            return True
-    return False
-
-
-def get_extern_call_sigs_from_codes(func_codes: List[List[str]]) -> Set[str]:
-    """
-    获取函数的外部调用函数选择器
-    :param func_codes: 函数代码列表
-    :type func_codes: list[list[str]]
-    :return: 外部调用函数的选择器集合
+    获取函数的外部调用函数选择器及调用类型：代码块有函数选择器（PUSH4），且下一个代码块有外部调用指令
+    （CALL、CALLCODE、DELEGATECALL或STATICCALL），由反汇编时计算的代码块操作码位集和PUSH4立即数判断
+    :param cds: 合约反汇编对象
+    :type cds: ContractDisasm
+    :param func_blocks: 函数代码块序号的元组
+    :type func_blocks: tuple[int, ...]
+    :return: 外部调用的集合，元素为函数选择器/调用类型，如0xa9059cbb/call
+    :rtype: set[str]
     """
     extern_call_sigs = set()
-    for i in range(len(func_codes)):
-        for code in func_codes[i]:
-            # 当前代码段有函数选择器， 且下一个代码段有CALL指令
-            if code.startswith('PUSH4 ') and code.split()[1] != '0xffffffff' and has_CALL_opcode(func_codes, i + 1):
-                extern_call_sigs.add(code.split()[1])
+    for block_id, next_block_id in zip(func_blocks, func_blocks[1:]):
+        call_types = cds.get_block_call_types(next_block_id)
+        if not call_types:
+            continue
+        for push4_arg in cds.get_block_push4_args(block_id):
+            if push4_arg != 0xffffffff:
+                extern_call_sigs.update(f'0x{push4_arg:08x}/{call_type}' for call_type in call_types)
     return extern_call_sigs
 
 
-def get_contract_BIN_sig(dir_path: str, file_name: str):
+def analyze_contract_BIN(dir_path: str, file_name: str, backend: str = 'python',
+                         code: bytes = None) -> Dict[str, Set[str]]:
     """
-    获取单个合约的二进制签名
+    分析单个合约的二进制签名
     :param dir_path: 合约BIN文件夹路径
     :type dir_path: str
     :param file_name: 合约BIN文件名
     :type file_name: str
+    :param backend: 反汇编后端
+    :type backend: str
+    :param code: runtime字节码，为None时读取BIN文件
+    :type code: bytes
+    :return: 函数选择器-外部调用集合（元素为函数选择器/调用类型）的映射
+    :rtype: dict[str, set[str]]
     """
-    cds = ContractDisasm()  # 构建反汇编对象
-    cds.get_runtime_data(dir_path + file_name)
+    cds = ContractDisasm(backend)  # 构建反汇编对象
+    if code is None:
+        cds.get_runtime_data(dir_path + file_name)
+    else:
+        cds.get_runtime_data_from_bytes(code)
     func_sigs = cds.get_func_sigs()
     bin_sigs_dict = {}
     for func in func_sigs:
-        func_codes = cds.get_func_codes(func[1])
-        # save_func_disasm_codes(func[0], func_codes)
-        extern_call_sig = get_extern_call_sigs_from_codes(func_codes)
+        # save_func_disasm_codes(cds, func[0], cds.get_func_codes(func[1]))
+        extern_call_sig = get_extern_call_sigs_from_blocks(cds, cds.get_func_blocks(func[1]))
         if extern_call_sig:
             bin_sigs_dict[func[0]] = extern_call_sig
+    return bin_sigs_dict
+
+
+def analyze_contract_BIN_task(task: Tuple[str, str, str, bytes]) \
+        -> Tuple[str, Dict[str, Set[str]], str, float, List[dict]]:
+    """
+    进程池中分析单个合约二进制签名的任务
+    :param task: 四元组包括：合约BIN文件夹路径、合约BIN文件名、反汇编后端和runtime字节码（可为None）
+    :type task: tuple[str, str, str, bytes]
+    :return: 五元组包括：合约BIN文件名、二进制签名映射、错误信息（成功时为空字符串）、分析用时（秒）
+             和分析中执行的外部命令记录（由主进程记入运行指标）
+    :rtype: tuple[str, dict[str, set[str]], str, float, list[dict]]
+    """
+    dir_path, file_name, backend, code = task
+    start = time.time()
+    with metrics.capture_subprocesses() as subprocesses:
+        try:
+            bin_sigs_dict, err = analyze_contract_BIN(dir_path, file_name, backend, code), ''
+        except Exception as e:
+            bin_sigs_dict, err = {}, f'{type(e).__name__}: {e}'
+    return file_name, bin_sigs_dict, err, time.time() - start, subprocesses
+
+
+def save_contract_BIN_sig(file_name: str, bin_sigs_dict: Dict[str, Set[str]], with_names: bool = None):
+    """
+    将合约BIN签名写入文件
+    :param file_name: 合约BIN文件名
+    :type file_name: str
+    :param bin_sigs_dict: 函数选择器-外部调用集合（元素为函数选择器/调用类型）的映射
+    :type bin_sigs_dict: dict[str, set[str]]
+    :param with_names: 是否标注函数签名，为None时按bin_sig_with_names
+    :type with_names: bool
+    """
+    if with_names is None:
+        with_names = bin_sig_with_names
+    with open(bin_sig_dir_path + file_name + '.sig', 'w') as fo:
+        for func_sig in bin_sigs_dict.keys():
+            # print(func_sig, ':', bin_sigs_dict[func_sig])
+            extern_call_sigs = sorted(bin_sigs_dict[func_sig])
+            if with_names:
+                extern_call_sigs = annotate_extern_call_sigs(extern_call_sigs)
+            fo.write(func_sig + ':' + ' '.join(extern_call_sigs) + '\n')
+
+
+def annotate_extern_call_sigs(extern_call_sigs: List[str]) -> List[str]:
+    """
+    由函数选择器索引标注外部调用的函数签名，如0xa9059cbb/call=transfer(address,uint256)，冲突的签名以|分隔
+    :param extern_call_sigs: 外部调用列表，元素为函数选择器/调用类型
+    :type extern_call_sigs: list[str]
+    :return: 标注后的外部调用列表，索引中没有的选择器不标注
+    :rtype: list[str]
+    """
+    return [extern_call_sig + '=' + '|'.join(selector_index.lookup(extern_call_sig[:10]))
+            if selector_index.lookup(extern_call_sig[:10]) else extern_call_sig
+            for extern_call_sig in extern_call_sigs]
+
+
+def annotate_BIN_sig_files(file_names: Iterable[str]):
+    """
+    在全部ABI签名加入函数选择器索引后标注已写入的BIN签名文件，标注结果不受各合约处理先后的影响
+    :param file_names: 合约BIN文件名
+    :type file_names: Iterable[str]
+    """
+    for file_name in file_names:
+        file_path = bin_sig_dir_path + file_name + '.sig'
+        with open(file_path) as fo:
+            lines = [line.rstrip('\n').split(':', 1) for line in fo]
+        with open(file_path, 'w') as fo:
+            for func_sig, extern_call_sigs in lines:
+                fo.write(func_sig + ':' + ' '.join(annotate_extern_call_sigs(extern_call_sigs.split())) + '\n')
+
+
+def get_contract_BIN_sig(dir_path: str, file_name: str):
+    """
+    获取单个合约的二进制签名
+    :param dir_path: 合约BIN文件夹路径
+    :type dir_path: str
+    :param file_name: 合约BIN文件名
+    :type file_name: str
+    """
+    bin_sigs_dict = analyze_contract_BIN(dir_path, file_name, disasm_backend)
     # 将合约BIN签名写入文件
     if bin_sigs_dict:
-        with open(bin_sig_dir_path + file_name + '.sig', 'w') as fo:
-            for func_sig in bin_sigs_dict.keys():
-                # print(func_sig, ':', bin_sigs_dict[func_sig])
-                fo.write(func_sig + ':' + ' '.join(bin_sigs_dict[func_sig]) + '\n')
+        save_contract_BIN_sig(file_name, bin_sigs_dict)
+
+
+def contracts_pipeline(jobs: int = 1, sig_cache: SigCache = None, deploy_files: bool = True) -> List[StageStats]:
+    """
+    以流水线方式处理合约：提取ABI和BIN -> ABI签名 -> BIN签名 -> 生成部署文件，
+    每个合约依次流经各阶段，阶段间通过有界队列连接并同时推进，不再逐阶段遍历全部合约
+    :param jobs: 并行分析BIN签名的进程数，为1时在BIN签名阶段线程中依次分析
+    :type jobs: int
+    :param sig_cache: 签名结果缓存，为None时不使用缓存
+    :type sig_cache: SigCache
+    :param deploy_files: 是否生成Truffle部署文件，rpc部署后端无需部署文件
+    :type deploy_files: bool
+    :return: 各阶段的吞吐量计数
+    :rtype: list[StageStats]
+    """
+    make_dir(abi_sig_dir_path)
+    make_dir(bin_sig_dir_path)
+    sol_names = {}
+    if deploy_files:
+        remove_dir(tmp_migration_dir_path)
+        make_dir(tmp_migration_dir_path)
+        sol_names = {sol_name.replace('.sol', ''): sol_name for sol_name in get_deploying_sol_names()}
+    deploy_no = [0]
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    clone_groups = {}  # 字节码哈希-合约BIN文件名列表的映射
+    clone_results = {}  # 字节码哈希-二进制签名映射和错误信息的映射，同组的克隆合约复用
+    clone_key_locks = {}  # 字节码哈希-分析锁的映射
+    clone_lock = threading.Lock()
+    unannotated = []  # 待标注函数签名的BIN签名文件，ABI签名阶段与BIN签名阶段同时进行，结束后统一标注
+
+    def abi_sig_stage(build_info: dict) -> dict:
+        try:
+            with metrics.item('abi_sigs', build_info['contractName']) as item:
+                skip_reason = save_contract_ABI_sig(build_info['contractName'] + '.abi', build_info['abi'], sig_cache)
+                if skip_reason:
+                    item.skip(skip_reason)
+        except Exception as e:
+            if journal:
+                journal.mark_failed('abi_sig', build_info['contractName'], f'{type(e).__name__}: {e}')
+            raise
+        return build_info
+
+    def bin_sig_stage(build_info: dict) -> dict:
+        with metrics.item('bin_sigs', build_info['contractName']) as item:
+            return save_bin_sig(build_info, item)
+
+    def save_bin_sig(build_info: dict, item: ItemRecord) -> dict:
+        file_name = build_info['contractName'] + '.bin'
+        body = get_BIN_body(build_info['deployedBytecode'])
+        if not len(body):  # 接口、抽象合约或含未链接库占位符的字节码无可分析的代码，不参与分组
+            item.skip('empty or unlinked bytecode')
+            return build_info
+        key = get_BIN_key(body)
+        with clone_lock:
+            clone_groups.setdefault(key, []).append(file_name)
+            key_lock = clone_key_locks.setdefault(key, threading.Lock())
+        if journal and journal.is_done('bin_sig', build_info['contractName'], key):
+            item.skip('done in journal')
+            return build_info
+        with key_lock:  # 同组的克隆合约等待首个合约的分析结果
+            if key not in clone_results:
+                bin_sigs_dict, err = sig_cache.get_BIN_sigs(key) if sig_cache else None, ''
+                if bin_sigs_dict is None:
+                    task = (bin_dir_path, file_name, disasm_backend, body)
+                    if executor:
+                        _, bin_sigs_dict, err, _, subprocesses = executor.submit(analyze_contract_BIN_task,
+                                                                                 task).result()
+                    else:
+                        _, bin_sigs_dict, err, _, subprocesses = analyze_contract_BIN_task(task)
+                    metrics.add_subprocesses(subprocesses)
+                    if sig_cache and not err:
+                        sig_cache.put_BIN_sigs(key, bin_sigs_dict)
+                clone_results[key] = (bin_sigs_dict, err)
+        bin_sigs_dict, err = clone_results[key]
+        if err:
+            if journal:
+                journal.mark_failed('bin_sig', build_info['contractName'], err)
+            item.fail(err)
+            raise RuntimeError(err)
+        if bin_sigs_dict:
+            save_contract_BIN_sig(file_name, bin_sigs_dict, False)
+            if bin_sig_with_names:
+                unannotated.append(file_name)
+        if journal:
+            journal.mark_done('bin_sig', build_info['contractName'], key)
+        return build_info
+
+    def deploy_file_stage(build_info: dict):
+        sol_name = sol_names.get(build_info['contractName'])
+        if sol_name is None:  # 非待部署合约（如被导入的库合约）
+            return None
+        try:
+            with metrics.item('deploy_files', build_info['contractName']):
+                create_contract_deploy_file(deploy_no[0], sol_name, build_info['abi'])
+        except ValueError as e:  # 跳过该合约，部署序号不变
+            if journal:
+                journal.mark_failed('deploy_file', build_info['contractName'], f'{type(e).__name__}: {e}')
+            raise
+        deploy_no[0] += 1
+        return build_info
+
+    def describe(build_info: dict) -> str:
+        return build_info['contractName']
+
+    # 签名分析失败记入阶段统计，合约仍生成部署文件，与逐阶段处理时一致
+    stages = [
+        Stage('abi_sigs', metrics.profiled('abi_sigs', abi_sig_stage), describe=describe, forward_failed=True),
+        Stage('bin_sigs', metrics.profiled('bin_sigs', bin_sig_stage), workers=jobs, describe=describe,
+              forward_failed=True),
+    ]
+    if deploy_files:  # 单线程以保证部署序号连续
+        stages.append(Stage('deploy_files', metrics.profiled('deploy_files', deploy_file_stage), describe=describe))
+    builds = iter_ABIs_and_BINs()
+    source = iter(metrics.profiled('extract', lambda: next(builds, None)), None)  # 按需剖析每次提取
+    try:
+        stats_list = run_pipeline('extract', source, stages, pipeline_queue_size)
+    finally:
+        if executor:
+            executor.shutdown()
+    annotate_BIN_sig_files(unannotated)
+    for line in format_pipeline_stats(stats_list):
+        print(line)
+    if bin_dedup:
+        save_clone_report(clone_groups)
+    print('Contracts pipeline is done!\n')
+    return stats_list
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    解析命令行参数
+    :return: 命令行参数
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description='Compile, analyze and deploy smart contracts.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of processes used to get BIN signatures (default: 1)')
+    parser.add_argument('--compiler', choices=['truffle', 'solc'],
+                        help=f'compiler backend (default: {compiler_backend})')
+    parser.add_argument('--compile-jobs', type=int,
+                        help=f'number of Truffle workspaces compiled concurrently (default: {compile_jobs})')
+    parser.add_argument('--shard-size', type=int,
+                        help='compile each version bucket in shards of at most N contracts grouped by imports, '
+                             f'excluding contracts that fail (default: {compile_shard_size}, no sharding)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='recompile all contracts instead of only changed ones')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='do not use the signature cache keyed by ABI/bytecode hash')
+    parser.add_argument('--networks',
+                        help='comma-separated Truffle networks, each with its own node or account, used to deploy '
+                             f'contract groups concurrently (default: {",".join(deploy_networks)})')
+    parser.add_argument('--deploy-retries', type=int,
+                        help='number of retries for a single contract that fails to deploy after failed groups are '
+                             f'bisected (default: {deploy_retries})')
+    parser.add_argument('--deployer', choices=['truffle', 'rpc'],
+                        help='deployment backend: Truffle migrations, or creation transactions sent directly over '
+                             f'JSON-RPC with addresses taken from receipts (default: {deploy_backend})')
+    parser.add_argument('--rpc-url', help=f'JSON-RPC endpoint used by the rpc deployer (default: {rpc_url})')
+    parser.add_argument('--ctor-args', metavar='FILE',
+                        help='JSON or CSV manifest of constructor arguments keyed by contract name')
+    parser.add_argument('--ctor-seed', type=int,
+                        help='seed for the type-valid default constructor arguments of contracts not in the manifest '
+                             f'(default: {constructor_args_seed})')
+    parser.add_argument('--interactive', action='store_true',
+                        help='prompt for constructor arguments missing from the manifest instead of generating them')
+    parser.add_argument('--sig-names', action='store_true',
+                        help='annotate external call selectors in BIN signature files with the text signatures '
+                             'found in the selector index')
+    parser.add_argument('--sig-dump', metavar='FILE',
+                        help='seed the selector index from a local signature dump ("selector signature" per line)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted run: skip contracts whose signatures or deployment are recorded '
+                             'as done in the journal and append new addresses to the address map; without it the '
+                             'previous journal and address map are archived with a timestamp suffix')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='analyze every contract instead of once per group of clones whose runtime bytecode is '
+                             'identical after stripping the Solidity metadata')
+    parser.add_argument('--subprocess-jobs', type=int,
+                        help='maximum number of truffle, solc and evm commands running at once, whose output is '
+                             f'streamed to log files in {log_dir_path} (default: {subprocess_jobs})')
+    parser.add_argument('--bin-corpus', metavar='FILE',
+                        help='pack extracted runtime bytecode into a single corpus file with an offset index instead '
+                             'of one hex .bin file per contract, and memory-map it for BIN analysis')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write per-stage, per-contract and subprocess timings with skip and failure reasons as '
+                             'JSON lines, or as a Prometheus textfile if FILE ends with .prom')
+    parser.add_argument('--profile', choices=['compile', 'extract', 'abi_sigs', 'bin_sigs', 'deploy_files', 'deploy'],
+                        help=f'profile a stage with cProfile and write <stage>.prof to {profile_dir_path}')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='stream each contract through extraction, ABI/BIN signatures and deploy file '
+                             'generation with bounded queues between overlapping stages')
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
@@ -1,11 +1,261 @@
-import subprocess
+import tempfile
+from array import array
+from typing import List, Tuple
+
+from procrunner import runner  # 外部命令执行
+
+_METADATA_KEYS = (b'bzzr0', b'bzzr1', b'ipfs', b'solc', b'experimental')  # Solidity元数据CBOR映射的键
+EVM_DISASM_TIMEOUT = 60  # evm disasm的超时（秒）
+
+# EVM操作码表（与geth evm disasm输出的助记符保持一致）
+OPCODE_NAMES = {
+    0x00: 'STOP', 0x01: 'ADD', 0x02: 'MUL', 0x03: 'SUB', 0x04: 'DIV', 0x05: 'SDIV', 0x06: 'MOD', 0x07: 'SMOD',
+    0x08: 'ADDMOD', 0x09: 'MULMOD', 0x0a: 'EXP', 0x0b: 'SIGNEXTEND',
+    0x10: 'LT', 0x11: 'GT', 0x12: 'SLT', 0x13: 'SGT', 0x14: 'EQ', 0x15: 'ISZERO', 0x16: 'AND', 0x17: 'OR',
+    0x18: 'XOR', 0x19: 'NOT', 0x1a: 'BYTE', 0x1b: 'SHL', 0x1c: 'SHR', 0x1d: 'SAR',
+    0x20: 'SHA3',
+    0x30: 'ADDRESS', 0x31: 'BALANCE', 0x32: 'ORIGIN', 0x33: 'CALLER', 0x34: 'CALLVALUE', 0x35: 'CALLDATALOAD',
+    0x36: 'CALLDATASIZE', 0x37: 'CALLDATACOPY', 0x38: 'CODESIZE', 0x39: 'CODECOPY', 0x3a: 'GASPRICE',
+    0x3b: 'EXTCODESIZE', 0x3c: 'EXTCODECOPY', 0x3d: 'RETURNDATASIZE', 0x3e: 'RETURNDATACOPY',
+    0x3f: 'EXTCODEHASH',
+    0x40: 'BLOCKHASH', 0x41: 'COINBASE', 0x42: 'TIMESTAMP', 0x43: 'NUMBER', 0x44: 'DIFFICULTY',
+    0x45: 'GASLIMIT', 0x46: 'CHAINID', 0x47: 'SELFBALANCE',
+    0x50: 'POP', 0x51: 'MLOAD', 0x52: 'MSTORE', 0x53: 'MSTORE8', 0x54: 'SLOAD', 0x55: 'SSTORE', 0x56: 'JUMP',
+    0x57: 'JUMPI', 0x58: 'PC', 0x59: 'MSIZE', 0x5a: 'GAS', 0x5b: 'JUMPDEST',
+    0xf0: 'CREATE', 0xf1: 'CALL', 0xf2: 'CALLCODE', 0xf3: 'RETURN', 0xf4: 'DELEGATECALL', 0xf5: 'CREATE2',
+    0xfa: 'STATICCALL', 0xff: 'SELFDESTRUCT',
+}  # 旧版geth中REVERT(0xfd)和INVALID(0xfe)未定义，反汇编输出为'Missing opcode'，后续分析依赖该输出
+OPCODE_NAMES.update({0x60 + i: f'PUSH{i + 1}' for i in range(32)})
+OPCODE_NAMES.update({0x80 + i: f'DUP{i + 1}' for i in range(16)})
+OPCODE_NAMES.update({0x90 + i: f'SWAP{i + 1}' for i in range(16)})
+OPCODE_NAMES.update({0xa0 + i: f'LOG{i}' for i in range(5)})
+OPCODE_VALUES = {name: op for op, name in OPCODE_NAMES.items()}  # 助记符-操作码的映射
+
+OP_STOP = 0x00
+OP_LT = 0x10
+OP_GT = 0x11
+OP_EQ = 0x14
+OP_JUMP = 0x56
+OP_JUMPI = 0x57
+OP_JUMPDEST = 0x5b
+OP_PUSH1 = 0x60
+OP_PUSH2 = 0x61
+OP_PUSH4 = 0x63
+OP_DUP2 = 0x81
+OP_PUSH32 = 0x7f
+OP_CALL = 0xf1
+OP_CALLCODE = 0xf2
+OP_RETURN = 0xf3
+OP_DELEGATECALL = 0xf4
+OP_STATICCALL = 0xfa
+OP_REVERT = 0xfd
+OP_INVALID = 0xfe
+OP_SELFDESTRUCT = 0xff
+FUNC_ENDING_OPS = frozenset((OP_STOP, OP_RETURN, OP_REVERT, OP_INVALID))  # 函数终止指令
+DISPATCH_ENDING_OPS = FUNC_ENDING_OPS | {OP_JUMP, OP_SELFDESTRUCT}  # 函数分发器中顺序执行终止的指令
+CALL_TYPES = {OP_CALL: 'call', OP_CALLCODE: 'callcode', OP_DELEGATECALL: 'delegatecall',
+              OP_STATICCALL: 'staticcall'}  # 外部调用指令-调用类型的映射
+CALL_OPS_MASK = sum(1 << op for op in CALL_TYPES)  # 外部调用指令在操作码位集中的掩码
+
+
+def get_opcode_name(op: int) -> str:
+    """
+    获取操作码的助记符
+    :param op: 操作码
+    :type op: int
+    :return: 助记符，未定义的操作码返回'Missing opcode 0x..'
+    :rtype: str
+    """
+    if op in OPCODE_NAMES:
+        return OPCODE_NAMES[op]
+    return f'Missing opcode {hex(op)}'
+
+
+def decode_bytecode(code: bytes) -> Tuple[array, array]:
+    """
+    解码字节码指令
+    :param code: 字节码
+    :type code: bytes
+    :return ops, pcs:
+        ops：array('B') 各条指令的操作码
+        pcs：array('I') 各条指令的地址
+    """
+    ops = array('B')
+    pcs = array('I')
+    pc = 0
+    code_len = len(code)
+    while pc < code_len:
+        op = code[pc]
+        next_pc = pc + 1
+        if OP_PUSH1 <= op <= OP_PUSH32:  # PUSH指令
+            next_pc += op - OP_PUSH1 + 1
+            if next_pc > code_len:  # 不完整的PUSH指令，evm disasm以错误结束
+                break
+        ops.append(op)
+        pcs.append(pc)
+        pc = next_pc
+    return ops, pcs
+
+
+def disasm_bytecode(code: bytes) -> List[Tuple[int, str]]:
+    """
+    反汇编字节码（纯Python实现，输出与evm disasm一致）
+    :param code: 字节码
+    :type code: bytes
+    :return: 指令列表，元素为二元组包括：指令地址和指令代码
+    :rtype: list[tuple[int, str]]
+    """
+    code_lines = []
+    ops, pcs = decode_bytecode(code)
+    for op, pc in zip(ops, pcs):
+        if OP_PUSH1 <= op <= OP_PUSH32:
+            code_lines.append((pc, f'{OPCODE_NAMES[op]} 0x{code[pc + 1:pc + op - OP_PUSH1 + 2].hex()}'))
+        else:
+            code_lines.append((pc, get_opcode_name(op)))
+    return code_lines
+
+
+def assemble_code_lines(code_lines: List[Tuple[int, str]]) -> bytes:
+    """
+    将反汇编后的指令列表还原为字节码
+    :param code_lines: 指令列表，元素为二元组包括：指令地址和指令代码
+    :type code_lines: list[tuple[int, str]]
+    :return: 字节码
+    :rtype: bytes
+    """
+    code = bytearray()
+    for _, line in code_lines:
+        if line.startswith('Missing opcode '):
+            code.append(int(line.split()[2], 16))
+        else:
+            data = line.split()
+            code.append(OPCODE_VALUES[data[0]])
+            if len(data) > 1:
+                code.extend(bytes.fromhex(data[1][2:]))
+    return bytes(code)
+
+
+def read_bytecode_hex(hex_str: str) -> bytes:
+    """
+    将十六进制字节码字符串转换为字节码
+    :param hex_str: 十六进制字节码字符串，可带'0x'前缀（如deployedBytecode）
+    :type hex_str: str
+    :return: 字节码，无法解析时返回空字节串
+    :rtype: bytes
+    """
+    hex_str = hex_str.strip()
+    if hex_str.startswith('0x'):
+        hex_str = hex_str[2:]
+    try:
+        return bytes.fromhex(hex_str)
+    except ValueError:  # 含未链接库占位符等非法字符
+        return b''
+
+
+def strip_metadata(code: bytes) -> bytes:
+    """
+    去除runtime字节码末尾的Solidity元数据：CBOR编码的swarm/IPFS哈希和编译器版本
+    （如a165627a7a72...0029、a264697066735822...0033），其长度记于字节码最后2字节
+    :param code: runtime字节码
+    :type code: bytes
+    :return: 去除元数据后的字节码，无元数据时原样返回
+    :rtype: bytes
+    """
+    if len(code) < 2:
+        return code
+    meta_len = int.from_bytes(code[-2:], 'big')
+    start = len(code) - 2 - meta_len
+    if meta_len == 0 or start < 0 or not 0xa1 <= code[start] <= 0xa5:  # 元数据为含1~5个键的CBOR映射
+        return code
+    metadata = bytes(code[start:-2])  # 仅复制元数据部分，code可为memoryview
+    if not any(key in metadata for key in _METADATA_KEYS):
+        return code
+    return code[:start]
+
+
+def evm_disasm_file(file_path: str) -> List[Tuple[int, str]]:
+    """
+    调用geth的evm disasm反汇编字节码文件
+    :param file_path: runtime字节码文件路径
+    :type file_path: str
+    :return: 指令列表，元素为二元组包括：指令地址和指令代码
+    :rtype: list[tuple[int, str]]
+    """
+    runtime_data_lines = []
+    result = runner.run(['evm', 'disasm', file_path], timeout=EVM_DISASM_TIMEOUT, on_line=runtime_data_lines.append)
+    err = result.returncode
+    if result.timed_out:
+        raise TimeoutError(result.get_tail())
+    if err and runtime_data_lines:
+        runtime_data_lines.pop()  # 去除错误行
+    #     print('ERROR:', runtime_data_lines.pop())  # 有错误提示*
+    if runtime_data_lines and not runtime_data_lines[0].startswith('000000'):
+        runtime_data_lines.pop(0)
+    code_lines = []
+    for line in runtime_data_lines:
+        data = line.split(':')
+        code_lines.append((int(data[0]), data[1].strip()))
+    return code_lines
+
+
+def compare_disasm_backends(file_path: str) -> List[Tuple[int, str, str]]:
+    """
+    比较纯Python反汇编与evm disasm的结果
+    :param file_path: runtime字节码文件路径
+    :type file_path: str
+    :return: 不一致的指令列表，元素为三元组包括：指令序号、Python反汇编结果和evm disasm结果
+    :rtype: list[tuple[int, str, str]]
+    """
+    with open(file_path) as fo:
+        py_lines = disasm_bytecode(read_bytecode_hex(fo.read()))
+    evm_lines = evm_disasm_file(file_path)
+    diffs = []
+    for i in range(max(len(py_lines), len(evm_lines))):
+        py_line = f'{py_lines[i][0]}: {py_lines[i][1]}' if i < len(py_lines) else ''
+        evm_line = f'{evm_lines[i][0]}: {evm_lines[i][1]}' if i < len(evm_lines) else ''
+        if py_line != evm_line:
+            diffs.append((i, py_line, evm_line))
+    return diffs
 
 
 class ContractDisasm:
-    def __init__(self):
-        self.__runtime_code_lines = []  # runtime部分反汇编代码
+    def __init__(self, backend: str = 'python'):
+        """
+        :param backend: 反汇编后端，'python'为纯Python反汇编，'evm'为调用geth的evm disasm
+        :type backend: str
+        """
+        if backend not in ('python', 'evm'):
+            raise ValueError(f'Unknown disassembler backend: {backend}')
+        self.__backend = backend
+        self.__code = memoryview(b'')  # runtime部分原始字节码
+        self.__ops = array('B')  # 各行代码的操作码
+        self.__pcs = array('I')  # 各行代码的地址
         self.__jump_table = {}  # 地址号int-代码行号的映射
-        self.__jump_line_no_set = set()  # 合约函数中的全部跳转行号
+        self.__jumpdests = {}  # JUMPDEST地址-代码行号的映射，即合法的跳转目标
+        self.__block_starts = array('I')  # 各代码块的起始行号
+        self.__block_ends = array('I')  # 各代码块的结束行号（含）
+        self.__block_of_line = array('I')  # 代码行号-所在代码块序号的映射
+        self.__block_succs = []  # 各代码块跳转到的代码块序号
+        self.__block_op_masks = []  # 各代码块的操作码位集：第op位为1表示代码块含该操作码
+        self.__block_push4_args = []  # 各代码块中PUSH4指令的立即数
+        self.__reachable_cache = {}  # 代码块序号-由其可达的代码块序号列表的缓存
+
+    def __set_code(self, code: bytes):
+        """
+        设置runtime字节码并解码指令
+        :param code: 字节码，可为memoryview（仅引用不复制）
+        :type code: bytes
+        """
+        self.__code = memoryview(code)
+        self.__ops, self.__pcs = decode_bytecode(code)
+        self.__jump_table = {pc: line_no for line_no, pc in enumerate(self.__pcs)}  # 添加跳转字典
+        self.__jumpdests = {}
+        ops_bytes = self.__ops.tobytes()
+        line_no = ops_bytes.find(OP_JUMPDEST)
+        while line_no != -1:  # 在操作码序列中查找，跳过PUSH立即数中的0x5b
+            self.__jumpdests[self.__pcs[line_no]] = line_no
+            line_no = ops_bytes.find(OP_JUMPDEST, line_no + 1)
+        self.__build_cfg()
 
     def get_runtime_data(self, file_path: str):
         """
@@ -13,34 +263,147 @@ class ContractDisasm:
         :param file_path: runtime字节码文件路径
         :type file_path: str
         """
-        # 反汇编
-        err, runtime_data_lines = subprocess.getstatusoutput(f'evm disasm {file_path}')
-        runtime_data_lines = runtime_data_lines.split('\n')
-        if err:
-            runtime_data_lines.pop()  # 去除错误行
-        #     print('ERROR:', runtime_data_lines.pop())  # 有错误提示*
-        if not runtime_data_lines[0].startswith('000000'):
-            runtime_data_lines.pop(0)
-        for i in range(len(runtime_data_lines)):
-            data = runtime_data_lines[i].split(':')
-            self.__runtime_code_lines.append(data[1].strip())  # 添加代码部分
-            self.__jump_table[int(data[0])] = i  # 添加跳转字典
+        if self.__backend == 'evm':
+            self.__set_code(assemble_code_lines(evm_disasm_file(file_path)))
+        else:
+            with open(file_path) as fo:
+                self.get_runtime_data_from_hex(fo.read())
+
+    def get_runtime_data_from_hex(self, hex_str: str):
+        """
+        由十六进制字节码字符串（如编译信息中的deployedBytecode）获取反汇编后数据
+        :param hex_str: 十六进制字节码字符串
+        :type hex_str: str
+        """
+        self.__set_code(read_bytecode_hex(hex_str))
+
+    def get_runtime_data_from_bytes(self, code: bytes):
+        """
+        由原始字节码获取反汇编后数据，BIN语料中的memoryview切片直接解码而不复制；
+        evm后端将字节码写入临时文件后调用evm disasm
+        :param code: runtime字节码
+        :type code: bytes
+        """
+        if self.__backend == 'evm':
+            with tempfile.NamedTemporaryFile('w', suffix='.bin') as fo:
+                fo.write(code.hex())
+                fo.flush()
+                self.__set_code(assemble_code_lines(evm_disasm_file(fo.name)))
+        else:
+            self.__set_code(code)
+
+    def get_code_len(self) -> int:
+        """
+        获取代码行数
+        :return: 代码行数
+        :rtype: int
+        """
+        return len(self.__ops)
+
+    def get_op(self, line_no: int) -> int:
+        """
+        获取代码行的操作码
+        :param line_no: 代码行号
+        :type line_no: int
+        :return: 操作码，行号越界时返回-1
+        :rtype: int
+        """
+        if 0 <= line_no < len(self.__ops):
+            return self.__ops[line_no]
+        return -1
+
+    def get_push_arg_bytes(self, line_no: int) -> memoryview:
+        """
+        获取PUSH指令的立即数（原始字节码的切片，不复制）
+        :param line_no: PUSH指令的代码行号
+        :type line_no: int
+        :return: 立即数字节
+        :rtype: memoryview
+        """
+        pc = self.__pcs[line_no]
+        return self.__code[pc + 1:pc + self.__ops[line_no] - OP_PUSH1 + 2]
+
+    def get_push_arg(self, line_no: int) -> int:
+        """
+        获取PUSH指令的立即数
+        :param line_no: PUSH指令的代码行号
+        :type line_no: int
+        :return: 立即数
+        :rtype: int
+        """
+        return int.from_bytes(self.get_push_arg_bytes(line_no), 'big')
+
+    def get_code_str(self, line_no: int) -> str:
+        """
+        获取代码行的反汇编文本（仅用于输出）
+        :param line_no: 代码行号
+        :type line_no: int
+        :return: 反汇编文本，如'PUSH2 0x01a3'
+        :rtype: str
+        """
+        op = self.__ops[line_no]
+        if OP_PUSH1 <= op <= OP_PUSH32:
+            return f'{OPCODE_NAMES[op]} 0x{self.get_push_arg_bytes(line_no).hex()}'
+        return get_opcode_name(op)
+
+    def get_jump_target_line(self, line_no: int) -> int:
+        """
+        获取PUSH指令压入的跳转地址对应的行号
+        :param line_no: PUSH1~PUSH4指令的代码行号
+        :type line_no: int
+        :return: 跳转目标JUMPDEST的行号，不是PUSH1~PUSH4指令或目标不是JUMPDEST时返回None
+        :rtype: int
+        """
+        if not OP_PUSH1 <= self.get_op(line_no) <= OP_PUSH4:
+            return None
+        return self.__jumpdests.get(self.get_push_arg(line_no))
+
+    def __get_compared_selector_line_no(self, line_no: int) -> int:
+        """
+        获取与函数选择器比较的PUSH4指令行号，比较形如PUSH4 sel EQ或PUSH4 sel DUP2 EQ（GT、LT同理）
+        :param line_no: 比较指令的代码行号
+        :type line_no: int
+        :return: PUSH4指令的行号，不是选择器比较时返回None
+        :rtype: int
+        """
+        if self.get_op(line_no - 1) == OP_PUSH4:
+            return line_no - 1
+        if self.get_op(line_no - 1) == OP_DUP2 and self.get_op(line_no - 2) == OP_PUSH4:
+            return line_no - 2
+        return None
 
     def get_func_sigs(self):
         """
-        获取合约的函数选择器列表
-        :return: func_sigs list(set): 合约签名列表，元素为二元组包括：函数选择器和函数入口地址
+        获取合约的函数选择器列表：从入口沿函数分发器的控制流查找选择器比较（PUSH4 sel EQ PUSHn tag JUMPI），
+        跟随二分查找分发（PUSH4 pivot GT/LT PUSHn tag JUMPI）和其他条件跳转（如CALLVALUE、CALLDATASIZE检查），
+        不进入函数体，每条指令至多扫描一次
+        :return: func_sigs list(list): 合约签名列表（按代码顺序），元素为二元组包括：函数选择器和函数入口地址
         """
-        func_sigs = []
-        for line_no in range(len(self.__runtime_code_lines)):
-            if self.__runtime_code_lines[line_no] == 'STOP':
-                break
-            if self.__runtime_code_lines[line_no].startswith('PUSH4 ') and \
-                    self.__runtime_code_lines[line_no + 1] == 'EQ':
-                func_sigs.append(
-                    [self.__runtime_code_lines[line_no].split()[1],
-                     int(self.__runtime_code_lines[line_no + 2].split()[1], 16)])
-        return func_sigs
+        found = []  # 元素为三元组包括：比较指令行号、函数选择器和函数入口地址
+        ops = self.__ops
+        code_len = len(ops)
+        visited = bytearray(code_len)
+        worklist = [0] if code_len else []
+        while worklist:
+            line_no = worklist.pop()
+            while line_no < code_len and not visited[line_no]:
+                visited[line_no] = 1
+                op = ops[line_no]
+                if op in DISPATCH_ENDING_OPS:
+                    break
+                if op == OP_JUMPI:
+                    target_line_no = self.get_jump_target_line(line_no - 1)
+                    cmp_op = self.get_op(line_no - 2)
+                    sel_line_no = self.__get_compared_selector_line_no(line_no - 2) \
+                        if cmp_op in (OP_EQ, OP_GT, OP_LT) else None
+                    if target_line_no is not None and sel_line_no is not None and cmp_op == OP_EQ:  # 函数入口
+                        found.append((line_no, '0x' + self.get_push_arg_bytes(sel_line_no).hex(),
+                                      self.__pcs[target_line_no]))
+                    elif target_line_no is not None:  # 二分查找的另一半或其他分支
+                        worklist.append(target_line_no)
+                line_no += 1
+        found.sort()
+        return [[func_sig, func_addr] for _, func_sig, func_addr in found]
 
     def __is_func_ending(self, line_no: int):
         """
@@ -49,12 +412,7 @@ class ContractDisasm:
         :type line_no: int
         :return: 是否终止
         """
-        if self.__runtime_code_lines[line_no] == 'Missing opcode 0xfd' \
-                or self.__runtime_code_lines[line_no] == 'Missing opcode 0xfe' \
-                or self.__runtime_code_lines[line_no] == 'RETURN' \
-                or self.__runtime_code_lines[line_no] == 'STOP':
-            return True
-        return False
+        return self.__ops[line_no] in FUNC_ENDING_OPS
 
     def __get_seg_addr_line_no(self, line_no: int):
         """
@@ -63,7 +421,7 @@ class ContractDisasm:
         :return: 行号
         :rtype: int
         """
-        addr = int(self.__runtime_code_lines[line_no].split()[1], 16)
+        addr = self.get_push_arg(line_no)
         if addr in self.__jump_table:
             return self.__jump_table[addr]
         return 0
@@ -75,49 +433,177 @@ class ContractDisasm:
         :type line_no: int
         :return: 是否是跳转地址代码
         """
-        if self.__runtime_code_lines[line_no].startswith('PUSH2 '):
-            if self.__runtime_code_lines[line_no + 1] == 'JUMPI' or self.__runtime_code_lines[line_no + 1] == 'JUMP':
+        if self.__ops[line_no] == OP_PUSH2:
+            if self.get_op(line_no + 1) in (OP_JUMPI, OP_JUMP):
                 return True
-            elif self.__runtime_code_lines[self.__get_seg_addr_line_no(line_no)] == 'JUMPDEST':
+            elif self.__ops[self.__get_seg_addr_line_no(line_no)] == OP_JUMPDEST:
                 return True
         return False
 
+    def __build_cfg(self):
+        """构建合约的控制流图：划分代码块并计算各代码块的跳转目标"""
+        ops = self.__ops
+        code_len = len(ops)
+        self.__block_starts = array('I')
+        self.__block_ends = array('I')
+        self.__block_of_line = array('I', bytes(4 * code_len))
+        self.__block_succs = []
+        self.__block_op_masks = []
+        self.__block_push4_args = []
+        self.__reachable_cache = {}
+        # 划分代码块：代码段在终止指令处结束，或在JUMPDEST之前结束
+        start_line_no = 0
+        while start_line_no < code_len:
+            end_line_no = start_line_no + 1
+            while end_line_no < code_len:
+                if self.__is_func_ending(end_line_no) or self.get_op(end_line_no + 1) == OP_JUMPDEST:
+                    break
+                end_line_no += 1
+            end_line_no = min(end_line_no, code_len - 1)
+            block_id = len(self.__block_starts)
+            self.__block_starts.append(start_line_no)
+            self.__block_ends.append(end_line_no)
+            for line_no in range(start_line_no, end_line_no + 1):
+                self.__block_of_line[line_no] = block_id
+            start_line_no = end_line_no + 1
+        # 计算各代码块中跳转地址代码的跳转目标、操作码位集和PUSH4立即数
+        ops_bytes = ops.tobytes()
+        for block_id in range(len(self.__block_starts)):
+            start_line_no = self.__block_starts[block_id]
+            end_line_no = self.__block_ends[block_id]
+            succs = []
+            for line_no in range(start_line_no + 1, end_line_no):
+                if self.__is_func_jump_addr(line_no):
+                    succ = self.__block_of_line[self.__get_seg_addr_line_no(line_no)]
+                    if succ not in succs:
+                        succs.append(succ)
+            self.__block_succs.append(tuple(succs))
+            op_mask = 0
+            for op in set(ops_bytes[start_line_no:end_line_no + 1]):
+                op_mask |= 1 << op
+            self.__block_op_masks.append(op_mask)
+            push4_args = ()
+            if op_mask >> OP_PUSH4 & 1:
+                push4_args = []
+                line_no = ops_bytes.find(OP_PUSH4, start_line_no, end_line_no + 1)
+                while line_no != -1:
+                    push4_args.append(self.get_push_arg(line_no))
+                    line_no = ops_bytes.find(OP_PUSH4, line_no + 1, end_line_no + 1)
+                push4_args = tuple(push4_args)
+            self.__block_push4_args.append(push4_args)
+
+    def get_block_num(self) -> int:
+        """
+        获取代码块数目
+        :return: 代码块数目
+        :rtype: int
+        """
+        return len(self.__block_starts)
+
+    def get_block_range(self, block_id: int) -> range:
+        """
+        获取代码块的行号范围
+        :param block_id: 代码块序号
+        :type block_id: int
+        :return: 代码块的行号范围
+        :rtype: range
+        """
+        return range(self.__block_starts[block_id], self.__block_ends[block_id] + 1)
+
+    def get_block_op_mask(self, block_id: int) -> int:
+        """
+        获取代码块的操作码位集
+        :param block_id: 代码块序号
+        :type block_id: int
+        :return: 位集，第op位为1表示代码块含操作码op
+        :rtype: int
+        """
+        return self.__block_op_masks[block_id]
+
+    def get_block_call_types(self, block_id: int) -> Tuple[str, ...]:
+        """
+        获取代码块中外部调用指令的调用类型
+        :param block_id: 代码块序号
+        :type block_id: int
+        :return: 调用类型的元组，如('call', 'staticcall')，不含外部调用时为空元组
+        :rtype: tuple[str, ...]
+        """
+        op_mask = self.__block_op_masks[block_id]
+        if not op_mask & CALL_OPS_MASK:
+            return ()
+        return tuple(call_type for op, call_type in CALL_TYPES.items() if op_mask >> op & 1)
+
+    def get_block_push4_args(self, block_id: int) -> Tuple[int, ...]:
+        """
+        获取代码块中PUSH4指令的立即数
+        :param block_id: 代码块序号
+        :type block_id: int
+        :return: 立即数的元组（按代码顺序）
+        :rtype: tuple[int, ...]
+        """
+        return self.__block_push4_args[block_id]
+
+    def get_reachable_blocks(self, start_block_id: int) -> Tuple[int, ...]:
+        """
+        获取由该代码块可达的所有代码块（深度优先顺序），结果在合约内缓存
+        :param start_block_id: 起始代码块序号
+        :type start_block_id: int
+        :return: 可达代码块序号的元组
+        :rtype: tuple[int, ...]
+        """
+        if start_block_id in self.__reachable_cache:
+            return self.__reachable_cache[start_block_id]
+        reachable = []
+        visited = set()
+        worklist = [start_block_id]
+        while worklist:
+            block_id = worklist.pop()
+            if block_id in visited:
+                continue
+            visited.add(block_id)
+            reachable.append(block_id)
+            worklist.extend(reversed(self.__block_succs[block_id]))
+        self.__reachable_cache[start_block_id] = tuple(reachable)
+        return self.__reachable_cache[start_block_id]
+
     def get_seg_codes(self, start_line_no: int):
         """
         获取由该代码段可达的所有代码段
         :param start_line_no: 代码段起始行号
         :type start_line_no: int
-        :return: 该代码段可达的所有代码段的列表
-        """
-        end_line_no = start_line_no + 1  # 代码段结束行号
-        func_code_list = []  # 代码段列表
-        jump_line_no_set = set()  # 改代码段包含的跳转行号的集合
-        while end_line_no < len(self.__runtime_code_lines):  # 未到结尾
-            # 判断该代码段是否到结尾，到结尾则退出循环
-            if self.__is_func_ending(end_line_no) or self.__runtime_code_lines[end_line_no + 1] == 'JUMPDEST':
-                break
-            # 判断代码是否是跳转代码，且其跳转到的行号未出现过
-            if self.__is_func_jump_addr(end_line_no) and end_line_no not in self.__jump_line_no_set:
-                jump_line_no = self.__get_seg_addr_line_no(end_line_no)  # 获取跳转的行号
-                jump_line_no_set.add(jump_line_no)  # 添加该代码段跳转行号集合
-                self.__jump_line_no_set.add(jump_line_no)  # 添加到全部代码段跳转行号集合
-            end_line_no += 1
-        # 添加当前代码段列表
-        func_code_list.append(self.__runtime_code_lines[start_line_no:end_line_no + 1])
-        # print(start_line_no)
-        # print(func_code_list)
-        # 遍历该代码段包含的所有跳转行号， 获取其下代码段
-        for jump_line_no in jump_line_no_set:
-            func_code_list.extend(self.get_seg_codes(jump_line_no))
-        return func_code_list
+        :return: 该代码段可达的所有代码段的列表，元素为代码段的行号范围
+        """
+        return [self.get_block_range(block_id)
+                for block_id in self.get_reachable_blocks(self.__block_of_line[start_line_no])]
+
+    def get_func_blocks(self, func_addr: int) -> Tuple[int, ...]:
+        """
+        获取函数包含的所有代码块
+        :param func_addr: 函数入口地址
+        :type func_addr: int
+        :return: 代码块序号的元组（深度优先顺序）
+        :rtype: tuple[int, ...]
+        """
+        return self.get_reachable_blocks(self.__block_of_line[self.__jump_table[func_addr]])
 
     def get_func_codes(self, func_addr: int):
         """
         获取函数包含的所有代码段列表
         :param func_addr: 函数入口地址
         :type func_addr: int
-        :return: func_codes 函数代码段列表
+        :return: func_codes 函数代码段列表，元素为代码段的行号范围
         """
-        self.__jump_line_no_set.clear()
         func_start_line_no = self.__jump_table[func_addr]  # 函数起始行号：函数入口地址对应的行号
         return self.get_seg_codes(func_start_line_no)  # 解析函数里所有代码段
+
+
+if __name__ == '__main__':
+    # 用法: python contrbin.py <bin文件>... 检查纯Python反汇编与evm disasm结果是否一致
+    import sys
+
+    parity_ok = True
+    for bin_file_path in sys.argv[1:]:
+        for diff in compare_disasm_backends(bin_file_path):
+            parity_ok = False
+            print(f'{bin_file_path} #{diff[0]}: python={diff[1]!r} evm={diff[2]!r}')
+    sys.exit(0 if parity_ok else 1)
@@ -0,0 +1,143 @@
+import csv  # csv清单
+import json  # json
+import random  # 确定性随机默认值
+import re  # 正则表达式
+from typing import Dict, List
+
+_ARRAY_RE = re.compile(r'^(.*)\[(\d*)\]$')  # 数组类型，如uint256[]、address[3]
+
+
+def parse_manifest_value(text: str):
+    """
+    解析清单或命令行输入的参数值：可解析为json的按json解析，否则为字符串
+    :param text: 参数值文本
+    :type text: str
+    :return: 参数值
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def load_constructor_args(file_path: str) -> Dict[str, object]:
+    """
+    读取构造函数参数清单
+    json清单为合约名到参数值列表（按参数顺序）或参数名-参数值映射的对象；
+    csv清单每行为合约名和按参数顺序排列的参数值，数组等值写为json
+    :param file_path: 清单文件路径，以.csv结尾时按csv读取，否则按json读取
+    :type file_path: str
+    :return: 合约名-参数值列表或参数名-参数值映射的映射
+    :rtype: dict[str, object]
+    """
+    if file_path.endswith('.csv'):
+        manifest = {}
+        with open(file_path, newline='') as fo:
+            for row in csv.reader(fo):
+                if row and row[0].strip() and not row[0].startswith('#'):
+                    manifest[row[0].strip()] = [parse_manifest_value(value.strip()) for value in row[1:]]
+    else:
+        with open(file_path) as fo:
+            manifest = json.load(fo)
+    return {name.replace('.sol', ''): values for name, values in manifest.items()}
+
+
+def get_default_value(typ: str, rng: random.Random, components: List[dict] = None):
+    """
+    生成符合ABI类型的默认参数值
+    :param typ: ABI类型
+    :type typ: str
+    :param rng: 随机数生成器
+    :type rng: random.Random
+    :param components: tuple类型的成员列表
+    :type components: list[dict]
+    :return: 参数值：整数为int，地址和字节为0x开头的十六进制字符串，数组和tuple为list
+    """
+    match = _ARRAY_RE.match(typ)
+    if match:
+        size = int(match.group(2)) if match.group(2) else 2
+        return [get_default_value(match.group(1), rng, components) for _ in range(size)]
+    if typ == 'tuple':
+        return [get_default_value(comp['type'], rng, comp.get('components')) for comp in components or []]
+    if typ == 'address':
+        return '0x' + bytes(rng.randrange(1, 256) for _ in range(20)).hex()
+    if typ == 'bool':
+        return True
+    if typ.startswith('uint'):
+        return rng.randrange(1, min(1 << int(typ[4:] or 256), 1001))
+    if typ.startswith('int'):
+        return rng.randrange(1, min(1 << (int(typ[3:] or 256) - 1), 1001))
+    if typ == 'string':
+        return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(8))
+    if typ == 'bytes':
+        return '0x' + bytes(rng.randrange(256) for _ in range(32)).hex()
+    if typ.startswith('bytes'):
+        return '0x' + bytes(rng.randrange(256) for _ in range(int(typ[5:]))).hex()
+    raise ValueError(f'Unsupported ABI type: {typ}')
+
+
+def to_js_literal(typ: str, value) -> str:
+    """
+    将参数值转换为Truffle部署文件中的JavaScript字面量，整数写为字符串以免丢失精度
+    :param typ: ABI类型
+    :type typ: str
+    :param value: 参数值
+    :return: JavaScript字面量
+    :rtype: str
+    """
+    match = _ARRAY_RE.match(typ)
+    if match and isinstance(value, list):
+        return '[' + ','.join(to_js_literal(match.group(1), elem) for elem in value) + ']'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return json.dumps(str(value))
+    return json.dumps(value)
+
+
+class ConstructorArgProvider:
+    """
+    构造函数参数提供者：优先使用清单中的参数值，清单中没有的参数按确定性种子生成符合类型的默认值，
+    或在交互模式下由用户输入
+    """
+
+    def __init__(self, manifest_path: str = None, seed: int = 0, interactive: bool = False):
+        """
+        :param manifest_path: 构造函数参数清单（json或csv）路径，为None时不使用清单
+        :type manifest_path: str
+        :param seed: 生成默认值的随机种子，相同种子对同一合约生成相同的参数值
+        :type seed: int
+        :param interactive: 清单中没有的参数是否由用户输入
+        :type interactive: bool
+        """
+        self.manifest = load_constructor_args(manifest_path) if manifest_path else {}
+        self.seed = seed
+        self.interactive = interactive
+        self.generated = 0  # 生成默认值的参数数
+
+    def fill(self, contract_name: str, inputs: List[dict]) -> List[dict]:
+        """
+        为构造函数输入设置参数值
+        :param contract_name: 合约名
+        :type contract_name: str
+        :param inputs: 构造函数输入的对象列表，为各元素设置value
+        :type inputs: list[dict]
+        :return: inputs
+        :rtype: list[dict]
+        """
+        values = self.manifest.get(contract_name)
+        if self.interactive and values is None:
+            print(f'Please input {contract_name} Constructor Parameters:')
+        for i, ipt in enumerate(inputs):
+            if isinstance(values, list) and i < len(values):
+                ipt['value'] = values[i]
+            elif isinstance(values, dict) and ipt.get('name') in values:
+                ipt['value'] = values[ipt['name']]
+            elif self.interactive:
+                ipt['value'] = parse_manifest_value(input(f'Param:{ipt["name"]}, Type:{ipt["type"]}, Value: '))
+            else:
+                # 每个参数使用独立的随机数生成器，合约或参数的增减不影响其他参数的值
+                rng = random.Random(f'{self.seed}:{contract_name}:{i}:{ipt["type"]}')
+                ipt['value'] = get_default_value(ipt['type'], rng, ipt.get('components'))
+                self.generated += 1
+        return inputs
@@ -0,0 +1,427 @@
+import os
+import queue  # 空闲部署网络队列
+import re  # 正则表达式
+import shutil  # 文件复制
+import tempfile  # 临时部署工作区
+import threading
+import time
+from collections import deque  # 待部署组队列
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # 多线程并行
+from typing import Callable, Dict, List, Tuple
+
+from procrunner import runner  # 外部命令执行
+
+# 命令执行函数：参数为命令、工作目录，以及关键字参数log_file_path（日志文件路径）、on_line（逐行处理输出的函数）
+# 和timeout（超时秒数），返回退出码和输出的末尾
+Runner = Callable[..., Tuple[int, str]]
+
+_DEPLOYING_RE = re.compile(r"(Replacing|Deploying)\s'(.+)(?=')")  # 开始部署合约
+_ADDRESS_RE = re.compile(r'> contract address:\s+(0x\w+)')  # 合约地址
+_GAS_USED_RE = re.compile(r'> gas used:\s+(\d+)')  # 部署交易的gas用量
+_BLOCK_GAS_LIMIT_RE = re.compile(r'Block gas limit:\s+(\d+)')  # 区块gas上限
+
+
+def run_command(cmd: List[str], cwd: str, log_file_path: str = '', on_line: Callable[[str], None] = None,
+                timeout: float = None) -> Tuple[int, str]:
+    """
+    执行命令，输出流式写入日志文件并逐行处理
+    :param cmd: 命令及参数
+    :type cmd: list[str]
+    :param cwd: 工作目录
+    :type cwd: str
+    :param log_file_path: 日志文件路径，为空时不写日志
+    :type log_file_path: str
+    :param on_line: 逐行处理输出（含标准错误）的函数
+    :type on_line: Callable[[str], None]
+    :param timeout: 超时（秒），为None时不限
+    :type timeout: float
+    :return: 二元组包括：退出码和输出（含标准错误）的末尾
+    :rtype: tuple[int, str]
+    """
+    result = runner.run(cmd, cwd=cwd, timeout=timeout, log_file_path=log_file_path, on_line=on_line)
+    return result.returncode, result.get_tail()
+
+
+class DeployOutputParser:
+    """
+    逐行解析truffle migrate的输出：部署的合约名和合约地址、各部署交易的gas用量和区块gas上限，
+    每部署完成一个合约即回调，无需等待整组部署结束
+    """
+
+    def __init__(self, on_deployed: Callable[[str, str], None] = None):
+        """
+        :param on_deployed: 合约部署完成时调用的函数，参数为合约名和合约地址
+        :type on_deployed: Callable[[str, str], None]
+        """
+        self.on_deployed = on_deployed
+        self.addr_map = {}  # 合约名-合约地址的映射
+        self.gas_used = []  # 各部署交易的gas用量
+        self.block_gas_limit = 0  # 区块gas上限（未输出时为0）
+        self.__deploying = None  # 正在部署的合约名
+
+    def feed(self, line: str):
+        """
+        解析一行输出
+        :param line: truffle migrate的一行输出
+        :type line: str
+        """
+        match = _DEPLOYING_RE.search(line)
+        if match:
+            self.__deploying = match.group(2)
+            return
+        match = _ADDRESS_RE.search(line)
+        if match:
+            if self.__deploying is not None:
+                self.addr_map[self.__deploying] = match.group(1)
+                if self.on_deployed:
+                    self.on_deployed(self.__deploying, match.group(1))
+            self.__deploying = None
+            return
+        if 'Error:' in line:  # 正在部署的合约部署失败
+            self.__deploying = None
+            return
+        match = _GAS_USED_RE.search(line)
+        if match:
+            self.gas_used.append(int(match.group(1)))
+            return
+        match = _BLOCK_GAS_LIMIT_RE.search(line)
+        if match:
+            self.block_gas_limit = int(match.group(1))
+
+
+def get_migration_contract_name(file_path: str) -> str:
+    """
+    获取部署文件对应的合约名
+    :param file_path: 部署文件路径，文件名为“序号_合约名.sol.js”
+    :type file_path: str
+    :return: 合约名
+    :rtype: str
+    """
+    return os.path.basename(file_path).split('_', 1)[-1].replace('.sol.js', '')
+
+
+def get_file_stamp(file_path: str) -> Tuple[int, int]:
+    """
+    获取文件的修改时间和大小，用于判断文件是否被修改
+    :param file_path: 文件路径
+    :type file_path: str
+    :rtype: tuple[int, int]
+    """
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class GroupResult:
+    """一组合约的一次部署尝试的结果"""
+
+    def __init__(self, name: str, file_paths: List[str], depth: int = 0):
+        """
+        :param name: 部署组名称
+        :type name: str
+        :param file_paths: 该组合约的部署文件路径列表
+        :type file_paths: list[str]
+        :param depth: 该组由失败的组二分得到的深度，初始组为0
+        :type depth: int
+        """
+        self.name = name
+        self.file_paths = file_paths
+        self.depth = depth
+        self.attempt = 1  # 该组合约（二分后为同一组合约）的第几次尝试
+        self.ok = False  # 是否部署成功
+        self.addr_map = {}  # 合约名-合约地址的映射（含失败时已部署的合约）
+        self.network = ''  # 使用的网络
+        self.latency = 0.0  # 用时（秒）
+        self.gas_used = []  # 各部署交易的gas用量
+        self.block_gas_limit = 0  # 区块gas上限
+        self.output = ''  # 部署输出的末尾
+        self.log_file_path = ''  # 完整部署输出的日志文件路径
+
+    def get_undeployed(self) -> List[str]:
+        """
+        获取未部署成功的合约的部署文件路径
+        :rtype: list[str]
+        """
+        return [file_path for file_path in self.file_paths
+                if get_migration_contract_name(file_path) not in self.addr_map]
+
+
+class GroupSizer:
+    """
+    部署组大小的自适应调整（加性增、乘性减）：
+    部署成功且用时不超过目标时组大小加1，部署失败或用时超过目标时组大小减半，
+    并限制一组合约的gas总量不超过区块gas上限
+    """
+
+    def __init__(self, initial_size: int, max_size: int = 64, target_latency: float = None):
+        """
+        :param initial_size: 初始组大小
+        :type initial_size: int
+        :param max_size: 最大组大小
+        :type max_size: int
+        :param target_latency: 一组合约部署用时的目标（秒），为None时不按用时调整
+        :type target_latency: float
+        """
+        self.max_size = max(1, max_size)
+        self.size = min(max(1, initial_size), self.max_size)
+        self.target_latency = target_latency
+        self.successes = 0  # 部署成功的组数
+        self.failures = 0  # 部署失败的组数
+        self.__gas_total = 0
+        self.__gas_num = 0
+        self.block_gas_limit = 0  # 观察到的区块gas上限
+
+    def get_gas_cap(self) -> int:
+        """
+        获取由区块gas上限和平均部署gas用量确定的组大小上限
+        :return: 组大小上限，缺少gas信息时为最大组大小
+        :rtype: int
+        """
+        if not self.block_gas_limit or not self.__gas_num:
+            return self.max_size
+        return max(1, self.block_gas_limit * self.__gas_num // self.__gas_total)
+
+    def update(self, result: GroupResult):
+        """
+        根据一组合约的部署结果调整组大小
+        :param result: 部署结果
+        :type result: GroupResult
+        """
+        self.__gas_total += sum(result.gas_used)
+        self.__gas_num += len(result.gas_used)
+        self.block_gas_limit = result.block_gas_limit or self.block_gas_limit
+        if result.ok:
+            self.successes += 1
+        else:
+            self.failures += 1
+        slow = self.target_latency is not None and result.latency > self.target_latency
+        if result.ok and not slow:
+            if len(result.file_paths) >= self.size:  # 仅满组的成功说明当前组大小可行
+                self.size += 1
+        else:
+            self.size = max(1, self.size // 2)
+        self.size = min(self.size, self.max_size, self.get_gas_cap())
+
+    def get_success_rate(self) -> float:
+        """
+        获取部署组的成功率
+        :rtype: float
+        """
+        total = self.successes + self.failures
+        return self.successes / total if total else 0.0
+
+
+class DeployScheduler:
+    """
+    部署调度器：在各自独立的临时Truffle工作区中并发部署多组合约，
+    同一时刻每个网络（对应不同的节点或账户）只部署一组合约，以免交易nonce冲突；
+    组大小随部署结果自适应调整，失败的组二分后重新部署以隔离出错的合约
+    """
+
+    def __init__(self, project_path: str, networks: List[str], retries: int = 1, workspace_dir_path: str = None,
+                 runner: Runner = run_command, sizer: GroupSizer = None, log_dir_path: str = None,
+                 timeout: float = None, on_deployed: Callable[[str, str], None] = None):
+        """
+        :param project_path: Truffle项目目录，须含truffle-config.js和build/contracts
+        :type project_path: str
+        :param networks: truffle-config.js中配置的网络名列表，各网络应使用不同的节点或账户，并发部署组数即网络数
+        :type networks: list[str]
+        :param retries: 单个合约部署失败后的重试次数
+        :type retries: int
+        :param workspace_dir_path: 临时部署工作区存放目录，默认为项目下的deploy_workspaces/
+        :type workspace_dir_path: str
+        :param runner: 命令执行函数，可替换为测试用的模拟实现
+        :type runner: Callable[..., tuple[int, str]]
+        :param sizer: 部署组大小调整器，默认初始组大小为6
+        :type sizer: GroupSizer
+        :param log_dir_path: 部署输出日志存放目录，默认为项目下的logs/
+        :type log_dir_path: str
+        :param timeout: 一组合约truffle migrate的超时（秒），超时的组按部署失败处理，为None时不限
+        :type timeout: float
+        :param on_deployed: 合约部署完成时立即调用的函数（不等待整组结束），参数为合约名和合约地址；
+            在单独的线程中依次调用，不阻塞读取命令输出的事件循环线程
+        :type on_deployed: Callable[[str, str], None]
+        """
+        self.project_path = project_path
+        self.networks = list(networks) or ['development']
+        self.retries = max(0, retries)
+        self.workspace_dir_path = workspace_dir_path or project_path + 'deploy_workspaces/'
+        self.runner = runner
+        self.sizer = sizer or GroupSizer(6)
+        self.log_dir_path = log_dir_path or project_path + 'logs/'
+        self.timeout = timeout
+        self.on_deployed = on_deployed
+        self.__deployed_lock = threading.Lock()
+        self.__report_executor = None  # deploy()期间调用on_deployed的单线程执行器
+        self.__reports = []  # 已提交的on_deployed调用
+        self.__free_networks = queue.Queue()
+        for network in self.networks:
+            self.__free_networks.put(network)
+        self.results = []  # 各次部署尝试的结果
+        self.failed = []  # 最终部署失败的合约的部署文件路径
+        self.wall_time = 0.0  # 部署总用时（秒）
+
+    def prepare_workspace(self, name: str, file_paths: List[str]) -> str:
+        """
+        生成部署一组合约的临时Truffle工作区：配置文件、该组的部署文件和所需的编译产物
+        :param name: 部署组名称
+        :type name: str
+        :param file_paths: 该组合约的部署文件路径列表
+        :type file_paths: list[str]
+        :return: 工作区目录
+        :rtype: str
+        """
+        os.makedirs(self.workspace_dir_path, exist_ok=True)
+        # 工作区位于项目目录下，truffle-config.js引用的node模块仍可被找到
+        workspace_path = tempfile.mkdtemp(prefix=name + '_', dir=self.workspace_dir_path) + '/'
+        shutil.copy2(self.project_path + 'truffle-config.js', workspace_path)
+        os.makedirs(workspace_path + 'contracts')  # 空的合约目录，部署时无需重新编译
+        os.makedirs(workspace_path + 'build/contracts')
+        os.makedirs(workspace_path + 'migrations')
+        build_dir_path = self.project_path + 'build/contracts/'
+        for file_path in file_paths:
+            shutil.copy2(file_path, workspace_path + 'migrations/')
+            artifact_name = get_migration_contract_name(file_path) + '.json'
+            if os.path.exists(build_dir_path + artifact_name):
+                shutil.copy2(build_dir_path + artifact_name, workspace_path + 'build/contracts/')
+        return workspace_path
+
+    def save_artifacts(self, workspace_path: str, file_paths: List[str]):
+        """
+        将工作区中部署时更新的编译产物（networks中记录的部署地址）写回项目的build/contracts，
+        与在项目目录中直接执行truffle migrate时一致；各组的合约互不相同，并发写回不会冲突
+        :param workspace_path: 工作区目录
+        :type workspace_path: str
+        :param file_paths: 该组合约的部署文件路径列表
+        :type file_paths: list[str]
+        """
+        build_dir_path = self.project_path + 'build/contracts/'
+        for file_path in file_paths:
+            artifact_name = get_migration_contract_name(file_path) + '.json'
+            artifact_path = workspace_path + 'build/contracts/' + artifact_name
+            if not os.path.exists(artifact_path) or os.path.exists(build_dir_path + artifact_name) and \
+                    get_file_stamp(artifact_path) == get_file_stamp(build_dir_path + artifact_name):
+                continue  # 未部署的合约的编译产物未被修改（复制到工作区时保留了修改时间）
+            shutil.copy2(artifact_path, build_dir_path + artifact_name + '.tmp')
+            os.replace(build_dir_path + artifact_name + '.tmp', build_dir_path + artifact_name)
+
+    def deploy_group(self, group: GroupResult) -> GroupResult:
+        """
+        部署一组合约，占用一个空闲网络
+        :param group: 待部署的组，部署结果记录于其中
+        :type group: GroupResult
+        :return: 部署结果
+        :rtype: GroupResult
+        """
+        group.network = self.__free_networks.get()
+        start = time.time()
+        workspace_path = None
+        parser = DeployOutputParser(self.__report_deployed)
+        group.log_file_path = self.log_dir_path + f'migrate_{group.name}_{group.attempt}.log'
+        try:
+            workspace_path = self.prepare_workspace(group.name, group.file_paths)
+            code, group.output = self.runner(['truffle', 'migrate', '--reset', '--network', group.network],
+                                             workspace_path, log_file_path=group.log_file_path, on_line=parser.feed,
+                                             timeout=self.timeout)
+            self.save_artifacts(workspace_path, group.file_paths)
+        except OSError as e:
+            code, group.output = -1, f'{type(e).__name__}: {e}'
+        finally:
+            self.__free_networks.put(group.network)
+            if workspace_path:
+                shutil.rmtree(workspace_path, ignore_errors=True)
+        group.latency = time.time() - start
+        group.addr_map = parser.addr_map
+        group.gas_used, group.block_gas_limit = parser.gas_used, parser.block_gas_limit
+        group.ok = code == 0
+        return group
+
+    def __report_deployed(self, contract_name: str, address: str):
+        """解析到部署完成的合约时在事件循环线程中调用，on_deployed（写文件、提交数据库等）交给单独的线程执行"""
+        if not self.on_deployed:
+            return
+        with self.__deployed_lock:
+            if self.__report_executor is not None:
+                self.__reports.append(self.__report_executor.submit(self.on_deployed, contract_name, address))
+            else:  # 在deploy()之外单独部署一组时直接调用
+                self.on_deployed(contract_name, address)
+
+    def deploy(self, file_paths: List[str], callback: Callable[[GroupResult], None] = None) -> Dict[str, str]:
+        """
+        并发部署合约：按当前组大小依次取出合约组成部署组，失败的组中未部署的合约二分后重新部署，
+        单个合约失败后重试retries次
+        :param file_paths: 按部署顺序排列的部署文件路径列表
+        :type file_paths: list[str]
+        :param callback: 每次部署尝试完成时调用的函数，参数为部署结果
+        :type callback: Callable[[GroupResult], None]
+        :return: 合约名-合约地址的映射
+        :rtype: dict[str, str]
+        """
+        start = time.time()
+        remaining = deque(file_paths)
+        retry_groups = deque()  # 二分或重试的组优先部署
+        addr_map = {}
+        group_no = 0
+        self.__report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='deploy-report')
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.networks)) as executor:
+                running = set()
+                while remaining or retry_groups or running:
+                    while len(running) < len(self.networks) and (remaining or retry_groups):
+                        if retry_groups:
+                            group = retry_groups.popleft()
+                        else:
+                            group_size = min(self.sizer.size, len(remaining))
+                            group = GroupResult(f'group_{group_no}', [remaining.popleft() for _ in range(group_size)])
+                            group_no += 1
+                        running.add(executor.submit(self.deploy_group, group))
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        group = future.result()
+                        self.results.append(group)
+                        self.sizer.update(group)
+                        addr_map.update(group.addr_map)
+                        if callback:
+                            callback(group)
+                        undeployed = group.get_undeployed()
+                        if group.ok or not undeployed:
+                            continue
+                        if len(undeployed) > 1:  # 二分未部署的合约以隔离出错的合约
+                            half = len(undeployed) // 2
+                            for i, part in enumerate((undeployed[:half], undeployed[half:])):
+                                retry_groups.append(GroupResult(f'{group.name}.{i}', part, group.depth + 1))
+                        elif group.attempt <= self.retries:
+                            retry = GroupResult(group.name, undeployed, group.depth)
+                            retry.attempt = group.attempt + 1
+                            retry_groups.append(retry)
+                        else:
+                            self.failed.extend(undeployed)
+        finally:
+            with self.__deployed_lock:
+                report_executor, self.__report_executor = self.__report_executor, None
+                reports, self.__reports = self.__reports, []
+            report_executor.shutdown()  # 等待已提交的on_deployed调用完成
+        for report in reports:
+            report.result()  # on_deployed出错时抛出
+        self.wall_time = time.time() - start
+        return addr_map
+
+    def get_stats(self) -> str:
+        """
+        获取部署吞吐量统计信息
+        :return: 统计信息
+        :rtype: str
+        """
+        if not self.results:
+            return 'Deployment: no groups deployed'
+        deployed = sum(len(result.addr_map) for result in self.results)
+        latencies = sorted(result.latency for result in self.results)
+        attempts = len(latencies)
+        groups = len([result for result in self.results if result.depth == 0 and result.attempt == 1])
+        rate = deployed / self.wall_time if self.wall_time > 0 else 0.0
+        return f'Deployment: {deployed} contracts in {self.wall_time:.2f}s ({rate:.2f} contracts/s) ' \
+               f'on {len(self.networks)} networks, {len(self.failed)} failed\n' \
+               f'Groups: {groups} initial, {attempts - groups} retries, ' \
+               f'max bisection depth {max(result.depth for result in self.results)}, ' \
+               f'success rate {self.sizer.get_success_rate() * 100:.1f}%, final group size {self.sizer.size}\n' \
+               f'Latency: mean {sum(latencies) / attempts:.2f}s, ' \
+               f'p95 {latencies[min(attempts - 1, int(attempts * 0.95))]:.2f}s, max {latencies[-1]:.2f}s'
@@ -0,0 +1,128 @@
+import os
+import sqlite3  # 日志数据库
+import threading
+import time
+from typing import Dict, List, Tuple
+
+STATUS_DONE = 'done'  # 已完成
+STATUS_FAILED = 'failed'  # 失败
+
+
+class Journal:
+    """
+    运行日志（SQLite）：逐个记录合约在各阶段的完成情况、部署地址和失败原因，每条记录立即提交，
+    进程中断后以--resume重新运行时可跳过已完成的工作
+    """
+
+    def __init__(self, db_path: str):
+        """
+        :param db_path: 日志数据库文件路径
+        :type db_path: str
+        """
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False)  # 流水线和部署回调由多个线程访问
+        self.__conn.execute('PRAGMA journal_mode=WAL')  # 逐条提交时减少磁盘同步开销
+        self.__conn.execute('CREATE TABLE IF NOT EXISTS journal ('
+                            'stage TEXT NOT NULL, name TEXT NOT NULL, status TEXT NOT NULL, '
+                            'value TEXT NOT NULL, updated REAL NOT NULL, PRIMARY KEY (stage, name))')
+        self.__conn.commit()
+        self.__lock = threading.Lock()
+
+    def __record(self, stage: str, name: str, status: str, value: str):
+        with self.__lock:
+            self.__conn.execute('INSERT OR REPLACE INTO journal VALUES (?, ?, ?, ?, ?)',
+                                (stage, name, status, value, time.time()))
+            self.__conn.commit()
+
+    def mark_done(self, stage: str, name: str, value: str = ''):
+        """
+        记录合约完成了某阶段
+        :param stage: 阶段名称，如'abi_sig'、'bin_sig'、'deploy'
+        :type stage: str
+        :param name: 合约名
+        :type name: str
+        :param value: 阶段结果，如输入内容的哈希值或部署地址
+        :type value: str
+        """
+        self.__record(stage, name, STATUS_DONE, value)
+
+    def mark_failed(self, stage: str, name: str, err: str):
+        """
+        记录合约在某阶段失败
+        :param stage: 阶段名称
+        :type stage: str
+        :param name: 合约名
+        :type name: str
+        :param err: 失败原因
+        :type err: str
+        """
+        self.__record(stage, name, STATUS_FAILED, err)
+
+    def is_done(self, stage: str, name: str, value: str = None) -> bool:
+        """
+        判断合约是否已完成某阶段
+        :param stage: 阶段名称
+        :type stage: str
+        :param name: 合约名
+        :type name: str
+        :param value: 须一致的阶段结果（如输入内容的哈希值），为None时不比较
+        :type value: str
+        :rtype: bool
+        """
+        with self.__lock:
+            row = self.__conn.execute('SELECT value FROM journal WHERE stage = ? AND name = ? AND status = ?',
+                                      (stage, name, STATUS_DONE)).fetchone()
+        return row is not None and (value is None or row[0] == value)
+
+    def get_done(self, stage: str) -> Dict[str, str]:
+        """
+        获取已完成某阶段的合约
+        :param stage: 阶段名称
+        :type stage: str
+        :return: 合约名-阶段结果的映射
+        :rtype: dict[str, str]
+        """
+        with self.__lock:
+            rows = self.__conn.execute('SELECT name, value FROM journal WHERE stage = ? AND status = ? '
+                                       'ORDER BY updated', (stage, STATUS_DONE)).fetchall()
+        return dict(rows)
+
+    def get_failed(self, stage: str) -> List[Tuple[str, str]]:
+        """
+        获取在某阶段失败的合约
+        :param stage: 阶段名称
+        :type stage: str
+        :return: 元素为合约名和失败原因
+        :rtype: list[tuple[str, str]]
+        """
+        with self.__lock:
+            return self.__conn.execute('SELECT name, value FROM journal WHERE stage = ? AND status = ? '
+                                       'ORDER BY updated', (stage, STATUS_FAILED)).fetchall()
+
+    def reset(self):
+        """清空日志，开始新的运行"""
+        with self.__lock:
+            self.__conn.execute('DELETE FROM journal')
+            self.__conn.commit()
+
+    def close(self):
+        """关闭数据库"""
+        self.__conn.close()
+
+
+def archive_file(file_path: str, suffix: str) -> str:
+    """
+    将上次运行留下的文件（连同SQLite的-wal、-shm文件）重命名归档，新的运行不覆盖旧的记录
+    :param file_path: 文件路径
+    :type file_path: str
+    :param suffix: 归档文件名后缀，如运行开始的时间
+    :type suffix: str
+    :return: 归档后的文件路径，文件不存在时为空字符串
+    :rtype: str
+    """
+    if not os.path.exists(file_path):
+        return ''
+    for extra in ('-wal', '-shm'):  # 上次运行中断时可能残留未合并的WAL文件
+        if os.path.exists(file_path + extra):
+            os.replace(file_path + extra, f'{file_path}.{suffix}{extra}')
+    os.replace(file_path, f'{file_path}.{suffix}')
+    return f'{file_path}.{suffix}'
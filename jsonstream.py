@@ -0,0 +1,158 @@
+import json  # json
+import re  # 正则表达式
+from typing import Iterable
+
+_TOKEN_RE = re.compile(r'["\\{}\[\]]')  # 字符串边界、转义字符和容器边界
+_SCALAR_RE = re.compile(r'[^,}\]\s]*')  # 数字、true、false、null
+_WS_RE = re.compile(r'\s*')
+
+
+class JSONFieldReader:
+    """流式读取json文件顶层对象中的指定字段，跳过其余字段（如AST）而不解析、不整体载入内存"""
+
+    def __init__(self, fo, chunk_size: int = 1 << 16):
+        """
+        :param fo: 以文本模式打开的json文件对象
+        :param chunk_size: 每次读取的字符数
+        :type chunk_size: int
+        """
+        self.__fo = fo
+        self.__chunk_size = chunk_size
+        self.__buf = ''
+        self.__pos = 0
+        self.__eof = False
+        self.__decoder = json.JSONDecoder()
+
+    def __fill(self) -> bool:
+        """
+        读入下一块数据，丢弃已处理的部分
+        :return: 是否读入了数据
+        """
+        if self.__eof:
+            return False
+        chunk = self.__fo.read(self.__chunk_size)
+        if not chunk:
+            self.__eof = True
+            return False
+        self.__buf = self.__buf[self.__pos:] + chunk
+        self.__pos = 0
+        return True
+
+    def __peek(self) -> str:
+        """
+        跳过空白并返回下一个字符
+        :return: 下一个字符，到达文件结尾时返回空字符串
+        """
+        while True:
+            self.__pos = _WS_RE.match(self.__buf, self.__pos).end()
+            if self.__pos < len(self.__buf):
+                return self.__buf[self.__pos]
+            if not self.__fill():
+                return ''
+
+    def __expect(self, char: str):
+        if self.__peek() != char:
+            raise ValueError(f'Expecting {char!r} at offset {self.__pos}')
+        self.__pos += 1
+
+    def __find_value_end(self) -> int:
+        """
+        查找下一个json值的结束位置（不移动当前位置），数据不足时读入后续数据块，
+        扫描位置在读入后保留，已扫描的部分不重复扫描
+        :return: 值的结束位置
+        :rtype: int
+        """
+        char = self.__peek()
+        scan = self.__pos
+        if char not in ('"', '{', '['):  # 数字、true、false、null
+            while True:
+                scan = _SCALAR_RE.match(self.__buf, scan).end()
+                if scan < len(self.__buf):
+                    return scan
+                shift = self.__pos
+                if not self.__fill():
+                    return scan
+                scan -= shift
+        depth = 0
+        in_string = False
+        while True:
+            match = _TOKEN_RE.search(self.__buf, scan)
+            if match is None or match.group() == '\\' and match.end() == len(self.__buf):  # 转义字符被数据块截断
+                scan = len(self.__buf) if match is None else match.start()
+                shift = self.__pos
+                if not self.__fill():
+                    raise ValueError('Unterminated string' if in_string else 'Unterminated container')
+                scan -= shift
+                continue
+            token = match.group()
+            scan = match.end()
+            if token == '\\':
+                if in_string:
+                    scan += 1  # 跳过被转义的字符
+            elif token == '"':
+                in_string = not in_string
+                if not in_string and depth == 0:
+                    return scan
+            elif not in_string:
+                depth += 1 if token in ('{', '[') else -1
+                if depth == 0:
+                    return scan
+
+    def __decode(self):
+        """解析下一个完整的json值"""
+        if self.__peek() in ('"', '{', '['):
+            try:  # 值通常已完整位于缓冲区中
+                value, self.__pos = self.__decoder.raw_decode(self.__buf, self.__pos)
+                return value
+            except json.JSONDecodeError:
+                pass
+        # 值被数据块截断（数字等标量截断时仍可解析，须先确定其完整范围），读入到值结束后一次解析
+        self.__find_value_end()
+        value, self.__pos = self.__decoder.raw_decode(self.__buf, self.__pos)
+        return value
+
+    def __skip_value(self):
+        """跳过下一个json值"""
+        self.__pos = self.__find_value_end()
+
+    def read_fields(self, fields: Iterable[str]) -> dict:
+        """
+        读取顶层对象的指定字段，全部字段读取后即停止
+        :param fields: 字段名
+        :type fields: Iterable[str]
+        :return: 字段名-字段值的映射，不存在的字段不在其中
+        :rtype: dict
+        """
+        fields = set(fields)
+        result = {}
+        self.__expect('{')
+        if self.__peek() == '}':
+            return result
+        while len(result) < len(fields):
+            key = self.__decode()
+            self.__expect(':')
+            if key in fields:
+                result[key] = self.__decode()
+            else:
+                self.__skip_value()
+            char = self.__peek()
+            self.__pos += 1
+            if char == '}':
+                break
+            if char != ',':
+                raise ValueError(f'Expecting \',\' at offset {self.__pos - 1}')
+        return result
+
+
+def load_json_fields(file_path: str, fields: Iterable[str]) -> dict:
+    """
+    流式读取json文件顶层对象中的指定字段
+    :param file_path: json文件路径
+    :type file_path: str
+    :param fields: 字段名
+    :type fields: Iterable[str]
+    :return: 字段名-字段值的映射，不存在的字段不在其中
+    :rtype: dict
+    """
+    with open(file_path) as fo:
+        return JSONFieldReader(fo).read_fields(fields)
@@ -0,0 +1,348 @@
+import cProfile  # 阶段性能剖析
+import json  # json
+import os
+import threading
+import time
+from collections import Counter  # 跳过和失败原因计数
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+from pipeline import StageStats  # 阶段计数
+
+STATUS_PROCESSED = 'processed'  # 处理成功
+STATUS_SKIPPED = 'skipped'  # 跳过
+STATUS_FAILED = 'failed'  # 失败
+
+
+class ItemRecord:
+    """单个合约在某阶段的处理记录，由Metrics.item()产生，处理过程中可标记为跳过或失败"""
+
+    def __init__(self, stage: str, name: str):
+        """
+        :param stage: 阶段名称
+        :type stage: str
+        :param name: 合约名
+        :type name: str
+        """
+        self.stage = stage
+        self.name = name
+        self.status = STATUS_PROCESSED
+        self.reason = ''  # 跳过或失败的原因
+        self.seconds = 0.0  # 处理用时（秒）
+
+    def skip(self, reason: str):
+        """
+        标记为跳过
+        :param reason: 跳过原因
+        :type reason: str
+        """
+        self.status = STATUS_SKIPPED
+        self.reason = reason
+
+    def fail(self, reason: str):
+        """
+        标记为失败
+        :param reason: 失败原因
+        :type reason: str
+        """
+        self.status = STATUS_FAILED
+        self.reason = reason
+
+    def to_dict(self) -> dict:
+        return {'type': 'item', 'stage': self.stage, 'name': self.name, 'status': self.status,
+                'seconds': round(self.seconds, 6), 'reason': self.reason}
+
+
+class Metrics:
+    """
+    运行指标：记录各阶段和各合约的处理用时、跳过和失败的数目及原因、每次外部命令（truffle、solc、evm）的用时，
+    可导出为JSON lines或Prometheus文本文件，并可对指定阶段进行cProfile性能剖析
+    """
+
+    def __init__(self, profile_stage: str = None, profile_dir_path: str = ''):
+        """
+        :param profile_stage: 进行性能剖析的阶段名称，为None时不剖析
+        :type profile_stage: str
+        :param profile_dir_path: 性能剖析结果（<阶段名称>.prof）的存放目录
+        :type profile_dir_path: str
+        """
+        self.profile_stage = profile_stage
+        self.profile_dir_path = profile_dir_path
+        self.stages = {}  # type: Dict[str, StageStats]
+        self.items = []  # type: List[ItemRecord]
+        self.subprocesses = []  # 外部命令记录列表，元素为包括cmd、seconds和returncode的字典
+        self.__lock = threading.Lock()
+        self.__local = threading.local()  # 当前线程截获的外部命令记录
+        self.__profiler = None
+        self.__profile_lock = threading.Lock()
+
+    def get_stage(self, stage: str) -> StageStats:
+        """
+        获取阶段计数，不存在时创建
+        :param stage: 阶段名称
+        :type stage: str
+        :rtype: StageStats
+        """
+        with self.__lock:
+            if stage not in self.stages:
+                self.stages[stage] = StageStats(stage)
+            return self.stages[stage]
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[StageStats]:
+        """
+        计时一个阶段，该阶段为剖析阶段时在当前线程中进行性能剖析
+        :param stage: 阶段名称
+        :type stage: str
+        :return: 阶段计数
+        :rtype: Iterator[StageStats]
+        """
+        stats = self.get_stage(stage)
+        if stats.start_time is None:
+            stats.start_time = time.time()
+        try:
+            if stage == self.profile_stage:
+                with self.profiling():
+                    yield stats
+            else:
+                yield stats
+        finally:
+            stats.end_time = time.time()
+
+    @contextmanager
+    def item(self, stage: str, name: str) -> Iterator[ItemRecord]:
+        """
+        计时单个合约在某阶段的处理，处理中抛出异常时记为失败并继续抛出
+        :param stage: 阶段名称
+        :type stage: str
+        :param name: 合约名
+        :type name: str
+        :return: 处理记录，可标记为跳过或失败
+        :rtype: Iterator[ItemRecord]
+        """
+        record = ItemRecord(stage, name)
+        start = time.time()
+        try:
+            yield record
+        except Exception as e:
+            if record.status != STATUS_FAILED:  # 保留处理中标记的失败原因
+                record.fail(f'{type(e).__name__}: {e}')
+            raise
+        finally:
+            record.seconds = time.time() - start
+            self.add_item(record, start)
+
+    def record_item(self, stage: str, name: str, status: str, seconds: float = 0.0, reason: str = ''):
+        """
+        记录单个合约在某阶段的处理结果
+        :param stage: 阶段名称
+        :type stage: str
+        :param name: 合约名
+        :type name: str
+        :param status: 处理结果：'processed'、'skipped'或'failed'
+        :type status: str
+        :param seconds: 处理用时（秒）
+        :type seconds: float
+        :param reason: 跳过或失败的原因
+        :type reason: str
+        """
+        record = ItemRecord(stage, name)
+        record.status = status
+        record.reason = reason
+        record.seconds = seconds
+        self.add_item(record, time.time() - seconds)
+
+    def add_item(self, record: ItemRecord, start: float):
+        """
+        加入处理记录并计入阶段计数，未通过stage()计时的阶段以首个和末个合约的处理时间为起止时间
+        :param record: 处理记录
+        :type record: ItemRecord
+        :param start: 处理开始时间
+        :type start: float
+        """
+        stats = self.get_stage(record.stage)
+        stats.record(record.seconds, record.status, record.name,
+                     record.reason if record.status == STATUS_FAILED else '')
+        with self.__lock:
+            self.items.append(record)
+            if stats.start_time is None or start < stats.start_time:
+                stats.start_time = start
+            stats.end_time = max(stats.end_time or 0.0, start + record.seconds)
+
+    def record_subprocess(self, cmd: List[str], seconds: float, returncode: int):
+        """
+        记录一次外部命令，当前线程正在截获时记入截获列表
+        :param cmd: 命令及参数
+        :type cmd: list[str]
+        :param seconds: 命令用时（秒）
+        :type seconds: float
+        :param returncode: 退出码
+        :type returncode: int
+        """
+        record = {'type': 'subprocess', 'cmd': ' '.join(cmd[:2]), 'args': ' '.join(cmd[2:]),
+                  'seconds': round(seconds, 6), 'returncode': returncode}
+        captured = getattr(self.__local, 'captured', None)
+        if captured is not None:
+            captured.append(record)
+            return
+        with self.__lock:
+            self.subprocesses.append(record)
+
+    def add_subprocesses(self, records: List[dict]):
+        """
+        加入截获的外部命令记录，如进程池中分析任务返回的记录
+        :param records: 外部命令记录列表
+        :type records: list[dict]
+        """
+        with self.__lock:
+            self.subprocesses.extend(records)
+
+    @contextmanager
+    def capture_subprocesses(self) -> Iterator[List[dict]]:
+        """
+        截获当前线程中的外部命令记录，供进程池中的任务随结果返回给主进程
+        :return: 截获的外部命令记录列表
+        :rtype: Iterator[list[dict]]
+        """
+        captured = []
+        self.__local.captured = captured
+        try:
+            yield captured
+        finally:
+            self.__local.captured = None
+
+    @contextmanager
+    def profiling(self):
+        """在当前线程中对剖析阶段进行性能剖析，多次进入时累计到同一剖析结果"""
+        with self.__profile_lock:
+            if self.__profiler is None:
+                self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+            try:
+                yield
+            finally:
+                self.__profiler.disable()
+
+    def profiled(self, stage: str, func: Callable) -> Callable:
+        """
+        包装流水线阶段的处理函数，该阶段为剖析阶段时对每次调用进行性能剖析（剖析器同时只能在一个线程中启用，
+        剖析阶段的多个线程依次处理）
+        :param stage: 阶段名称
+        :type stage: str
+        :param func: 处理函数
+        :type func: Callable
+        :return: 包装后的处理函数
+        :rtype: Callable
+        """
+        if stage != self.profile_stage:
+            return func
+
+        def wrapper(*args, **kwargs):
+            with self.profiling():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def save_profile(self) -> str:
+        """
+        保存性能剖析结果，可用python -m pstats查看
+        :return: 剖析结果文件路径，未进行剖析时为None
+        :rtype: str
+        """
+        if self.__profiler is None:
+            return None
+        os.makedirs(self.profile_dir_path or '.', exist_ok=True)
+        file_path = os.path.join(self.profile_dir_path, self.profile_stage + '.prof')
+        self.__profiler.dump_stats(file_path)
+        return file_path
+
+    def get_summary(self) -> List[str]:
+        """
+        获取各阶段、跳过和失败原因及外部命令的统计信息
+        :return: 统计信息行
+        :rtype: list[str]
+        """
+        lines = [str(stats) for stats in self.stages.values()]
+        reasons = Counter((record.stage, record.status, record.reason) for record in self.items
+                          if record.status != STATUS_PROCESSED)
+        for (stage, status, reason), num in reasons.most_common(10):
+            lines.append(f'    {stage} {status} x{num}: {reason or "unknown"}')
+        for cmd, (num, seconds, failed) in self.get_subprocess_totals().items():
+            lines.append(f'{cmd}: {num} calls, {seconds:.2f}s, {failed} failed')
+        return lines
+
+    def get_subprocess_totals(self) -> Dict[str, List]:
+        """
+        按命令汇总外部命令
+        :return: 命令-[调用次数, 总用时, 失败次数]的映射
+        :rtype: dict[str, list]
+        """
+        totals = {}
+        for record in self.subprocesses:
+            total = totals.setdefault(record['cmd'], [0, 0.0, 0])
+            total[0] += 1
+            total[1] += record['seconds']
+            total[2] += record['returncode'] != 0
+        return totals
+
+    def write_jsonl(self, file_path: str):
+        """
+        以JSON lines格式导出：每行为一个阶段、合约处理或外部命令记录，以type区分
+        :param file_path: 导出文件路径
+        :type file_path: str
+        """
+        with open(file_path, 'w') as fo:
+            for stats in self.stages.values():
+                fo.write(json.dumps({'type': 'stage', 'stage': stats.name, 'processed': stats.processed,
+                                     'skipped': stats.skipped, 'failed': stats.failed,
+                                     'wall_seconds': round(stats.get_wall_time(), 6),
+                                     'busy_seconds': round(stats.busy_time, 6)}) + '\n')
+            for record in self.items:
+                fo.write(json.dumps(record.to_dict()) + '\n')
+            for record in self.subprocesses:
+                fo.write(json.dumps(record) + '\n')
+
+    def write_prometheus(self, file_path: str):
+        """
+        以Prometheus文本格式导出（供node_exporter的textfile收集器读取），先写临时文件再替换以免读到不完整的文件
+        :param file_path: 导出文件路径
+        :type file_path: str
+        """
+        lines = ['# TYPE contracts_stage_wall_seconds gauge',
+                 '# TYPE contracts_stage_busy_seconds gauge',
+                 '# TYPE contracts_stage_items gauge']
+        for stats in self.stages.values():
+            stage = _escape_label(stats.name)
+            lines.append(f'contracts_stage_wall_seconds{{stage="{stage}"}} {stats.get_wall_time():.6f}')
+            lines.append(f'contracts_stage_busy_seconds{{stage="{stage}"}} {stats.busy_time:.6f}')
+            for status in (STATUS_PROCESSED, STATUS_SKIPPED, STATUS_FAILED):
+                lines.append(f'contracts_stage_items{{stage="{stage}",status="{status}"}} {getattr(stats, status)}')
+        lines += ['# TYPE contracts_subprocess_calls gauge',
+                  '# TYPE contracts_subprocess_seconds gauge',
+                  '# TYPE contracts_subprocess_failures gauge']
+        for cmd, (num, seconds, failed) in self.get_subprocess_totals().items():
+            cmd = _escape_label(cmd)
+            lines.append(f'contracts_subprocess_calls{{cmd="{cmd}"}} {num}')
+            lines.append(f'contracts_subprocess_seconds{{cmd="{cmd}"}} {seconds:.6f}')
+            lines.append(f'contracts_subprocess_failures{{cmd="{cmd}"}} {failed}')
+        tmp_file_path = file_path + '.tmp'
+        with open(tmp_file_path, 'w') as fo:
+            fo.write('\n'.join(lines) + '\n')
+        os.replace(tmp_file_path, file_path)
+
+    def write(self, file_path: str):
+        """
+        导出运行指标，.prom结尾时为Prometheus文本格式，否则为JSON lines
+        :param file_path: 导出文件路径
+        :type file_path: str
+        """
+        if file_path.endswith('.prom'):
+            self.write_prometheus(file_path)
+        else:
+            self.write_jsonl(file_path)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()  # 全局运行指标，contrCompDeploy.main()中按命令行参数设置剖析阶段
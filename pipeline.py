@@ -0,0 +1,191 @@
+import queue  # 阶段间的有界队列
+import threading
+import time
+from typing import Callable, Iterable, List, Tuple
+
+_END = object()  # 数据流结束标志
+
+
+class StageStats:
+    """流水线阶段的吞吐量计数"""
+
+    def __init__(self, name: str):
+        """
+        :param name: 阶段名称
+        :type name: str
+        """
+        self.name = name
+        self.processed = 0  # 处理成功的数目
+        self.skipped = 0  # 被跳过（处理函数返回None）的数目
+        self.failed = 0  # 处理失败的数目
+        self.errors = []  # 失败原因列表，元素为二元组包括：数据描述和错误信息
+        self.busy_time = 0.0  # 处理数据所用的总时间（秒）
+        self.start_time = None  # 开始时间
+        self.end_time = None  # 结束时间
+        self.__lock = threading.Lock()
+
+    def record(self, busy_time: float, result: str, item_desc: str = '', err: str = ''):
+        """
+        记录一个数据的处理结果
+        :param busy_time: 处理用时（秒）
+        :type busy_time: float
+        :param result: 处理结果：'processed'、'skipped'或'failed'
+        :type result: str
+        :param item_desc: 数据描述，用于失败原因
+        :type item_desc: str
+        :param err: 错误信息
+        :type err: str
+        """
+        with self.__lock:
+            self.busy_time += busy_time
+            setattr(self, result, getattr(self, result) + 1)
+            if err:
+                self.errors.append((item_desc, err))
+
+    def get_wall_time(self) -> float:
+        """
+        获取阶段从开始到结束的时间（秒）
+        :rtype: float
+        """
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time.time()) - self.start_time
+
+    def get_throughput(self) -> float:
+        """
+        获取阶段吞吐量（个/秒）
+        :rtype: float
+        """
+        wall_time = self.get_wall_time()
+        return self.processed / wall_time if wall_time > 0 else 0.0
+
+    def __str__(self):
+        return f'{self.name}: {self.processed} processed, {self.skipped} skipped, {self.failed} failed, ' \
+               f'{self.get_wall_time():.2f}s wall, {self.busy_time:.2f}s busy, {self.get_throughput():.1f}/s'
+
+
+class Stage:
+    """
+    流水线阶段：对每个输入数据调用处理函数，返回值传给下一阶段，返回None则丢弃该数据；
+    处理出错时记为失败并丢弃该数据，或按forward_failed将原数据传给下一阶段
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, describe: Callable = str,
+                 forward_failed: bool = False):
+        """
+        :param name: 阶段名称
+        :type name: str
+        :param func: 处理函数，参数为上一阶段的输出
+        :type func: Callable
+        :param workers: 并发处理的线程数
+        :type workers: int
+        :param describe: 生成数据描述的函数，用于记录失败原因
+        :type describe: Callable
+        :param forward_failed: 处理出错时是否仍将输入数据传给下一阶段（下一阶段不依赖本阶段的结果时）
+        :type forward_failed: bool
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.describe = describe
+        self.forward_failed = forward_failed
+        self.stats = StageStats(name)
+
+
+def run_pipeline(source_name: str, source: Iterable, stages: List[Stage],
+                 queue_size: int = 64) -> List[StageStats]:
+    """
+    以流水线方式运行各阶段：每个阶段在独立线程中运行，阶段间通过有界队列传递数据，各阶段并行推进
+    :param source_name: 数据源阶段名称
+    :type source_name: str
+    :param source: 数据源（如生成器），在独立线程中迭代
+    :type source: Iterable
+    :param stages: 依次连接的阶段列表
+    :type stages: list[Stage]
+    :param queue_size: 阶段间队列的容量，限制流水线中暂存的数据量
+    :type queue_size: int
+    :return: 数据源及各阶段的吞吐量计数
+    :rtype: list[StageStats]
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    source_stats = StageStats(source_name)
+    threads = []
+
+    def produce():
+        source_stats.start_time = time.time()
+        iterator = iter(source)
+        while True:
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            except Exception as e:
+                source_stats.record(time.time() - start, 'failed', source_name, f'{type(e).__name__}: {e}')
+                break
+            source_stats.record(time.time() - start, 'processed')
+            if stages:
+                queues[0].put(item)
+        source_stats.end_time = time.time()
+        if stages:
+            queues[0].put(_END)
+
+    def consume(stage_no: int, remaining: List[int], lock: threading.Lock):
+        stage = stages[stage_no]
+        in_queue = queues[stage_no]
+        out_queue = queues[stage_no + 1] if stage_no + 1 < len(stages) else None
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                in_queue.put(_END)  # 通知同阶段的其他线程
+                break
+            start = time.time()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                stage.stats.record(time.time() - start, 'failed', stage.describe(item), f'{type(e).__name__}: {e}')
+                if stage.forward_failed and out_queue is not None:
+                    out_queue.put(item)
+                continue
+            if result is None:
+                stage.stats.record(time.time() - start, 'skipped')
+                continue
+            stage.stats.record(time.time() - start, 'processed')
+            if out_queue is not None:
+                out_queue.put(result)
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:  # 该阶段最后一个线程结束时通知下一阶段
+                stage.stats.end_time = time.time()
+                if out_queue is not None:
+                    out_queue.put(_END)
+
+    threads.append(threading.Thread(target=produce, name=source_name, daemon=True))
+    for stage_no, stage in enumerate(stages):
+        stage.stats.start_time = time.time()
+        remaining = [stage.workers]
+        lock = threading.Lock()
+        for worker_no in range(stage.workers):
+            threads.append(threading.Thread(target=consume, args=(stage_no, remaining, lock),
+                                            name=f'{stage.name}-{worker_no}', daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [source_stats] + [stage.stats for stage in stages]
+
+
+def format_pipeline_stats(stats_list: List[StageStats]) -> Tuple[str, ...]:
+    """
+    格式化流水线各阶段的吞吐量计数
+    :param stats_list: 各阶段的吞吐量计数
+    :type stats_list: list[StageStats]
+    :return: 各阶段的统计信息行
+    :rtype: tuple[str, ...]
+    """
+    lines = []
+    for stats in stats_list:
+        lines.append(str(stats))
+        for item_desc, err in stats.errors:
+            lines.append(f'    {item_desc}: {err}')
+    return tuple(lines)
@@ -0,0 +1,247 @@
+import asyncio  # 异步子进程
+import atexit  # 退出时终止未结束的命令
+import os
+import signal
+import threading
+import time
+from collections import deque  # 输出末尾若干行
+from typing import Callable, List
+
+from metrics import metrics  # 外部命令计时
+
+READ_CHUNK_SIZE = 64 * 1024  # 每次读取子进程输出的字节数
+MAX_PARTIAL_LINE = 64 * 1024  # 无逐行回调时未结束的行最多保留的字节数，避免单行的大量输出驻留内存
+MAX_TAIL_LINE = 1000  # 输出末尾各行最多保留的字符数
+
+
+class ProcessResult:
+    """一次外部命令的执行结果，输出仅保留末尾若干行，完整输出写入日志文件"""
+
+    def __init__(self, cmd: List[str], returncode: int, seconds: float, tail: List[str], log_file_path: str = '',
+                 timed_out: bool = False, output: str = ''):
+        """
+        :param cmd: 命令及参数
+        :type cmd: list[str]
+        :param returncode: 退出码，超时被终止时为负数
+        :type returncode: int
+        :param seconds: 用时（秒）
+        :type seconds: float
+        :param tail: 输出（含标准错误）的末尾若干行
+        :type tail: list[str]
+        :param log_file_path: 完整输出的日志文件路径，为空时未写日志
+        :type log_file_path: str
+        :param timed_out: 是否超时
+        :type timed_out: bool
+        :param output: 截获的标准输出，未要求截获时为空字符串
+        :type output: str
+        """
+        self.cmd = cmd
+        self.returncode = returncode
+        self.seconds = seconds
+        self.tail = tail
+        self.log_file_path = log_file_path
+        self.timed_out = timed_out
+        self.output = output
+
+    def get_tail(self) -> str:
+        """
+        获取输出的末尾若干行，超时或写了日志时注明
+        :rtype: str
+        """
+        lines = list(self.tail)
+        if self.timed_out:
+            lines.append(f'Timed out after {self.seconds:.1f}s: {" ".join(self.cmd)}')
+        if self.log_file_path:
+            lines.append(f'Full output is written to {self.log_file_path}')
+        return '\n'.join(lines)
+
+
+class _OutputSink:
+    """子进程输出的去向：日志文件、逐行回调、末尾若干行和截获的输出"""
+
+    def __init__(self, log_fo, on_line: Callable[[str], None], tail: deque, capture: bool):
+        self.log_fo = log_fo
+        self.on_line = on_line
+        self.tail = tail
+        self.chunks = [] if capture else None
+
+    async def pump(self, stream: asyncio.StreamReader):
+        """
+        按块读取输出直到结束，按行回调
+        :param stream: 子进程的输出流
+        :type stream: asyncio.StreamReader
+        """
+        partial = b''
+        while True:
+            chunk = await stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            if self.log_fo:
+                self.log_fo.write(chunk)
+            if self.chunks is not None:
+                self.chunks.append(chunk)
+            *lines, partial = (partial + chunk).split(b'\n')
+            for line in lines:
+                self.__emit(line)
+            if self.on_line is None and len(partial) > MAX_PARTIAL_LINE:
+                partial = partial[-MAX_PARTIAL_LINE:]
+        if partial:
+            self.__emit(partial)
+
+    def __emit(self, line: bytes):
+        text = line.decode(errors='replace').rstrip('\r')
+        self.tail.append(text[:MAX_TAIL_LINE])
+        if self.on_line:
+            self.on_line(text)
+
+
+class ProcessRunner:
+    """
+    外部命令执行器：asyncio事件循环在后台线程中运行，以信号量限制同时执行的命令数，每条命令可设超时，
+    输出（含标准错误）按块流式写入日志文件并逐行回调，不在内存中保留完整输出。
+    run()可在任意线程中调用并阻塞至命令结束；进程池的子进程中首次调用时重新启动事件循环
+    """
+
+    def __init__(self, max_concurrency: int = 8, tail_lines: int = 50):
+        """
+        :param max_concurrency: 同时执行的命令数上限
+        :type max_concurrency: int
+        :param tail_lines: 结果中保留的输出末尾行数
+        :type tail_lines: int
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.tail_lines = tail_lines
+        self.__loop = None
+        self.__semaphore = None
+        self.__pid = None
+        self.__lock = threading.Lock()
+        self.__running = set()  # 正在执行的命令的进程组号
+        atexit.register(self.kill_all)
+
+    def set_concurrency(self, max_concurrency: int):
+        """
+        设置同时执行的命令数上限，在下次启动事件循环前或没有命令执行时调用
+        :param max_concurrency: 同时执行的命令数上限
+        :type max_concurrency: int
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        if self.__loop is not None:
+            self.__semaphore = self.__call(self.__new_semaphore())
+
+    async def __new_semaphore(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def __call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.__loop).result()
+
+    def __get_loop(self) -> asyncio.AbstractEventLoop:
+        with self.__lock:
+            if self.__pid != os.getpid():  # 首次调用，或fork出的子进程中不存在父进程的事件循环线程
+                self.__loop = asyncio.new_event_loop()
+                threading.Thread(target=self.__loop.run_forever, name='process-runner', daemon=True).start()
+                self.__semaphore = self.__call(self.__new_semaphore())
+                self.__pid = os.getpid()
+            return self.__loop
+
+    async def run_async(self, cmd: List[str], cwd: str = None, input: str = None, timeout: float = None,
+                        log_file_path: str = '', on_line: Callable[[str], None] = None, capture: bool = False,
+                        merge_stderr: bool = True) -> ProcessResult:
+        """
+        在事件循环中执行外部命令
+        :param cmd: 命令及参数
+        :type cmd: list[str]
+        :param cwd: 工作目录
+        :type cwd: str
+        :param input: 写入标准输入的内容
+        :type input: str
+        :param timeout: 超时（秒），超时后终止命令，为None时不限
+        :type timeout: float
+        :param log_file_path: 写入完整输出的日志文件路径，为空时不写日志
+        :type log_file_path: str
+        :param on_line: 逐行处理输出的函数，在事件循环线程中调用，应尽快返回
+        :type on_line: Callable[[str], None]
+        :param capture: 是否截获标准输出并随结果返回（如需解析的json输出）
+        :type capture: bool
+        :param merge_stderr: 是否将标准错误合并到标准输出，否则标准错误仅写入日志和末尾行
+        :type merge_stderr: bool
+        :return: 执行结果
+        :rtype: ProcessResult
+        """
+        async with self.__semaphore:
+            start = time.time()
+            if log_file_path:
+                os.makedirs(os.path.dirname(log_file_path) or '.', exist_ok=True)
+            log_fo = open(log_file_path, 'wb') if log_file_path else None
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, cwd=cwd, stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.PIPE,
+                    start_new_session=True)  # 独立的进程组，超时时连同其子进程（如truffle启动的node）一起终止
+                self.__running.add(proc.pid)
+                tail = deque(maxlen=self.tail_lines)
+                sink = _OutputSink(log_fo, on_line, tail, capture)
+                jobs = [sink.pump(proc.stdout)]
+                if not merge_stderr:
+                    jobs.append(_OutputSink(log_fo, None, tail, False).pump(proc.stderr))
+                if input is not None:
+                    jobs.append(self.__write_input(proc, input))
+                timed_out = False
+                try:
+                    await asyncio.wait_for(asyncio.gather(*jobs, proc.wait()), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                finally:
+                    if proc.returncode is None:  # 超时或逐行处理输出出错
+                        self.__kill_group(proc.pid)
+                        await proc.wait()
+                    self.__running.discard(proc.pid)
+            finally:
+                if log_fo:
+                    log_fo.close()
+            output = b''.join(sink.chunks).decode(errors='replace') if capture else ''
+            return ProcessResult(cmd, proc.returncode, time.time() - start, list(tail), log_file_path, timed_out,
+                                 output)
+
+    @staticmethod
+    def __kill_group(pgid: int):
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except ProcessLookupError:  # 已结束
+            pass
+
+    def kill_all(self):
+        """终止正在执行的全部命令，进程退出（包括被中断）时自动调用"""
+        for pgid in list(self.__running):
+            self.__kill_group(pgid)
+
+    @staticmethod
+    async def __write_input(proc: asyncio.subprocess.Process, input: str):
+        try:
+            proc.stdin.write(input.encode())
+            await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):  # 命令未读完输入即退出
+            pass
+        finally:
+            proc.stdin.close()
+
+    def run(self, cmd: List[str], cwd: str = None, input: str = None, timeout: float = None, log_file_path: str = '',
+            on_line: Callable[[str], None] = None, capture: bool = False, merge_stderr: bool = True) -> ProcessResult:
+        """
+        执行外部命令并阻塞至结束，用时记入全局运行指标，参数同run_async()
+        :return: 执行结果
+        :rtype: ProcessResult
+        """
+        loop = self.__get_loop()
+        start = time.time()
+        returncode = -1
+        try:
+            result = asyncio.run_coroutine_threadsafe(
+                self.run_async(cmd, cwd, input, timeout, log_file_path, on_line, capture, merge_stderr), loop).result()
+            returncode = result.returncode
+            return result
+        finally:  # 在调用线程中记录，以便进程池中的任务截获
+            metrics.record_subprocess(cmd, time.time() - start, returncode)
+
+
+runner = ProcessRunner()  # 全局外部命令执行器，main()中按配置设置并发数
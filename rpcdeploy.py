@@ -0,0 +1,405 @@
+import json  # json
+import time
+import urllib.request  # JSON-RPC请求
+from typing import List, Tuple
+
+from ctorargs import _ARRAY_RE  # 数组类型
+
+
+class RPCError(Exception):
+    """JSON-RPC调用返回的错误"""
+    pass
+
+
+class JSONRPCClient:
+    """以太坊节点的JSON-RPC客户端，支持批量请求"""
+
+    def __init__(self, url: str, timeout: float = 30):
+        """
+        :param url: 节点JSON-RPC地址，如'http://127.0.0.1:8545'
+        :type url: str
+        :param timeout: 单次HTTP请求超时时间（秒）
+        :type timeout: float
+        """
+        self.url = url
+        self.timeout = timeout
+        self.__id = 0
+        self.requests = 0  # HTTP请求次数
+        self.calls = 0  # JSON-RPC调用次数
+
+    def __post(self, payload):
+        req = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf8'),
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            self.requests += 1
+            return json.loads(resp.read().decode('utf8'))
+
+    def call(self, method: str, params: list):
+        """
+        调用单个JSON-RPC方法
+        :param method: 方法名，如'eth_accounts'
+        :type method: str
+        :param params: 参数列表
+        :type params: list
+        :return: 调用结果
+        :raises RPCError: 节点返回错误
+        """
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, RPCError):
+            raise result
+        return result
+
+    def batch(self, calls: List[Tuple[str, list]]) -> list:
+        """
+        以一次HTTP请求批量调用JSON-RPC方法
+        :param calls: 元素为方法名和参数列表
+        :type calls: list[tuple[str, list]]
+        :return: 与calls依次对应的调用结果，出错的调用对应RPCError对象
+        :rtype: list
+        """
+        if not calls:
+            return []
+        payload = []
+        for method, params in calls:
+            self.__id += 1
+            payload.append({'jsonrpc': '2.0', 'id': self.__id, 'method': method, 'params': params})
+        self.calls += len(calls)
+        responses = self.__post(payload)
+        if isinstance(responses, dict):  # 不支持批量请求的节点返回单个错误
+            responses = [responses]
+        results = {resp.get('id'): resp for resp in responses}
+        ret = []
+        for req in payload:
+            resp = results.get(req['id'])
+            if resp is None:
+                ret.append(RPCError(f'No response to {req["method"]}'))
+            elif resp.get('error'):
+                ret.append(RPCError(resp['error'].get('message', str(resp['error']))))
+            else:
+                ret.append(resp.get('result'))
+        return ret
+
+
+def is_dynamic_type(typ: str) -> bool:
+    """
+    判断ABI类型是否为动态类型
+    :param typ: ABI类型
+    :type typ: str
+    :rtype: bool
+    """
+    match = _ARRAY_RE.match(typ)
+    if match:
+        return match.group(2) == '' or is_dynamic_type(match.group(1))
+    return typ in ('string', 'bytes')
+
+
+def coerce_value(typ: str, value):
+    """
+    将输入的参数值（如命令行输入的字符串）转换为可编码的值
+    :param typ: ABI类型
+    :type typ: str
+    :param value: 参数值
+    :return: 转换后的值
+    """
+    match = _ARRAY_RE.match(typ)
+    if match:
+        if isinstance(value, str):
+            value = json.loads(value)
+        return [coerce_value(match.group(1), elem) for elem in value]
+    if isinstance(value, str):
+        value = value.strip()
+        if typ == 'string':
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+                value = value[1:-1]  # 去除JavaScript字符串字面量的引号
+            return value
+        value = value.strip('"\'')
+        if typ == 'bool':
+            return value.lower() in ('true', '1')
+        if typ.startswith('uint') or typ.startswith('int'):
+            return int(value, 0)
+        if typ == 'address' or typ.startswith('bytes'):
+            return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return value
+
+
+def encode_single(typ: str, value) -> bytes:
+    """
+    ABI编码单个值（动态类型不含偏移量）
+    :param typ: ABI类型
+    :type typ: str
+    :param value: 经coerce_value转换后的值
+    :return: 编码结果
+    :rtype: bytes
+    """
+    match = _ARRAY_RE.match(typ)
+    if match:
+        elem_type, size = match.groups()
+        if size == '':
+            return len(value).to_bytes(32, 'big') + encode_abi([elem_type] * len(value), value)
+        if len(value) != int(size):
+            raise ValueError(f'{typ} expects {size} elements, got {len(value)}')
+        return encode_abi([elem_type] * len(value), value)
+    if typ in ('string', 'bytes'):
+        data = value.encode('utf8') if isinstance(value, str) else bytes(value)
+        return len(data).to_bytes(32, 'big') + data + b'\x00' * (-len(data) % 32)
+    if typ == 'bool':
+        return int(bool(value)).to_bytes(32, 'big')
+    if typ == 'address':
+        if isinstance(value, int):
+            value = value.to_bytes(20, 'big')
+        if len(value) != 20:
+            raise ValueError(f'Invalid address: 0x{bytes(value).hex()}')
+        return b'\x00' * 12 + bytes(value)
+    if typ.startswith('uint'):
+        bits = int(typ[4:] or 256)
+        if not 0 <= value < 1 << bits:
+            raise ValueError(f'{value} is out of range of {typ}')
+        return value.to_bytes(32, 'big')
+    if typ.startswith('int'):
+        bits = int(typ[3:] or 256)
+        if not -(1 << (bits - 1)) <= value < 1 << (bits - 1):
+            raise ValueError(f'{value} is out of range of {typ}')
+        return value.to_bytes(32, 'big', signed=True)
+    if typ.startswith('bytes'):
+        size = int(typ[5:])
+        if len(value) > size:
+            raise ValueError(f'{typ} expects at most {size} bytes, got {len(value)}')
+        return bytes(value) + b'\x00' * (32 - len(value))
+    raise ValueError(f'Unsupported ABI type: {typ}')
+
+
+def encode_abi(types: List[str], values: list) -> bytes:
+    """
+    按ABI规范编码参数列表：静态类型直接放在头部，动态类型在头部放偏移量并将内容放在尾部
+    :param types: ABI类型列表
+    :type types: list[str]
+    :param values: 经coerce_value转换后的值列表
+    :type values: list
+    :return: 编码结果
+    :rtype: bytes
+    """
+    if len(types) != len(values):
+        raise ValueError(f'Expecting {len(types)} values, got {len(values)}')
+    datas = [encode_single(typ, value) for typ, value in zip(types, values)]
+    heads = []
+    tails = []
+    # 静态定长数组等静态类型在头部直接展开，动态类型在头部占32字节
+    offset = sum(32 if is_dynamic_type(typ) else len(data) for typ, data in zip(types, datas))
+    for typ, data in zip(types, datas):
+        if is_dynamic_type(typ):
+            heads.append(offset.to_bytes(32, 'big'))
+            tails.append(data)
+            offset += len(data)
+        else:
+            heads.append(data)
+    return b''.join(heads) + b''.join(tails)
+
+
+def encode_constructor_args(inputs: List[dict]) -> str:
+    """
+    编码构造函数参数
+    :param inputs: 构造函数输入的对象列表，元素须含type和value
+    :type inputs: list[dict]
+    :return: 十六进制编码结果（不含0x）
+    :rtype: str
+    """
+    if not inputs:
+        return ''
+    for ipt in inputs:
+        if ipt['type'].startswith('tuple'):
+            raise ValueError(f'Unsupported ABI type: {ipt["type"]}')
+    types = [ipt['type'] for ipt in inputs]
+    values = [coerce_value(ipt['type'], ipt['value']) for ipt in inputs]
+    return encode_abi(types, values).hex()
+
+
+class RPCDeployResult:
+    """单个合约的JSON-RPC部署结果"""
+
+    def __init__(self, name: str, account: str):
+        """
+        :param name: 合约名
+        :type name: str
+        :param account: 发送部署交易的账户
+        :type account: str
+        """
+        self.name = name
+        self.account = account
+        self.tx_hash = None  # 部署交易哈希
+        self.address = None  # 由交易收据获得的合约地址
+        self.error = ''  # 失败原因
+        self.sent_time = None  # 交易发送时间
+        self.latency = None  # 从发送交易到获得收据的用时（秒）
+
+
+class RPCDeployer:
+    """
+    不经过Truffle，直接通过JSON-RPC发送合约创建交易：
+    各账户的交易分配连续的nonce，批量发送而不等待上一笔交易确认，收据也批量查询，合约地址取自收据。
+    交易发送失败时其nonce由该账户之后的交易再分配，最终仍空出的nonce以空交易填补
+    """
+
+    def __init__(self, client: JSONRPCClient, accounts: List[str] = None, gas: int = None, gas_price: int = None,
+                 batch_size: int = 50, poll_interval: float = 0.2, receipt_timeout: float = 300):
+        """
+        :param client: JSON-RPC客户端
+        :type client: JSONRPCClient
+        :param accounts: 发送交易的已解锁账户，为None时使用节点的全部账户（eth_accounts）
+        :type accounts: list[str]
+        :param gas: 每笔交易的gas上限，为None时由节点估算
+        :type gas: int
+        :param gas_price: gas价格，为None时由节点决定
+        :type gas_price: int
+        :param batch_size: 每次批量请求的交易或收据数
+        :type batch_size: int
+        :param poll_interval: 查询收据的间隔（秒）
+        :type poll_interval: float
+        :param receipt_timeout: 等待收据的超时时间（秒）
+        :type receipt_timeout: float
+        """
+        self.client = client
+        self.accounts = accounts
+        self.gas = gas
+        self.gas_price = gas_price
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+
+    def __poll_receipts(self, pending: List[RPCDeployResult]) -> List[RPCDeployResult]:
+        """
+        批量查询一次待确认交易的收据
+        :return: 仍未确认的部署结果
+        """
+        still_pending = []
+        for i in range(0, len(pending), self.batch_size):
+            chunk = pending[i:i + self.batch_size]
+            receipts = self.client.batch([('eth_getTransactionReceipt', [result.tx_hash]) for result in chunk])
+            still_pending.extend(self.__handle_receipts(chunk, receipts))
+        return still_pending
+
+    @staticmethod
+    def __handle_receipts(polled: List[RPCDeployResult], receipts: list) -> List[RPCDeployResult]:
+        """
+        由收据设置部署结果
+        :param polled: 查询了收据的部署结果
+        :type polled: list[RPCDeployResult]
+        :param receipts: 与polled依次对应的收据查询结果
+        :type receipts: list
+        :return: 仍未确认的部署结果
+        """
+        still_pending = []
+        for result, receipt in zip(polled, receipts):
+            if isinstance(receipt, RPCError):
+                result.error = str(receipt)
+            elif receipt is None:
+                still_pending.append(result)
+                continue
+            elif receipt.get('status') in ('0x0', 0):
+                result.error = 'Transaction reverted'
+            elif not receipt.get('contractAddress'):
+                result.error = 'No contract address in receipt'
+            else:
+                result.address = receipt['contractAddress']
+            result.latency = time.time() - result.sent_time
+        return still_pending
+
+    def __new_tx(self, account: str, fields: dict) -> dict:
+        """构造由account发送的交易，按配置附加gas上限和gas价格"""
+        tx = {'from': account}
+        tx.update(fields)
+        if self.gas:
+            tx['gas'] = hex(self.gas)
+        if self.gas_price is not None:
+            tx['gasPrice'] = hex(self.gas_price)
+        return tx
+
+    @staticmethod
+    def __take_nonce(account: str, nonces: dict, free_nonces: dict) -> int:
+        """优先再分配发送失败空出的nonce，否则分配账户的下一个nonce"""
+        if free_nonces[account]:
+            nonce = min(free_nonces[account])
+            free_nonces[account].remove(nonce)
+            return nonce
+        nonces[account] += 1
+        return nonces[account] - 1
+
+    @staticmethod
+    def __release_nonce(account: str, nonce: int, nonces: dict, free_nonces: dict):
+        """交易发送失败时收回其nonce，已分配的最大nonce之后不留空位"""
+        free_nonces[account].add(nonce)
+        while nonces[account] - 1 in free_nonces[account]:
+            nonces[account] -= 1
+            free_nonces[account].remove(nonces[account])
+
+    def __fill_nonce_gaps(self, free_nonces: dict):
+        """
+        以向自身转账0的交易填补未能再分配的nonce空位，否则其后已发送的交易不会被打包，直到等待收据超时
+        :param free_nonces: 各账户空出的nonce
+        :type free_nonces: dict[str, set[int]]
+        """
+        fillers = [self.__new_tx(account, {'to': account, 'value': '0x0', 'nonce': hex(nonce)})
+                   for account, account_nonces in free_nonces.items() for nonce in sorted(account_nonces)]
+        for i in range(0, len(fillers), self.batch_size):
+            chunk = fillers[i:i + self.batch_size]
+            for tx, tx_hash in zip(chunk, self.client.batch([('eth_sendTransaction', [tx]) for tx in chunk])):
+                if isinstance(tx_hash, RPCError):
+                    print(f'Failed to fill nonce {int(tx["nonce"], 16)} of {tx["from"]}: {tx_hash}')
+
+    def deploy(self, contracts: List[Tuple[str, str]]) -> List[RPCDeployResult]:
+        """
+        部署多个合约
+        :param contracts: 元素为合约名和十六进制部署数据（创建字节码与编码后的构造函数参数）
+        :type contracts: list[tuple[str, str]]
+        :return: 与contracts依次对应的部署结果
+        :rtype: list[RPCDeployResult]
+        """
+        accounts = self.accounts or self.client.call('eth_accounts', [])
+        if not accounts:
+            raise RPCError('No account available for deployment')
+        # 各账户预先获取nonce，发送时按顺序分配给该账户的交易
+        nonces = self.client.batch([('eth_getTransactionCount', [account, 'pending']) for account in accounts])
+        for account, nonce in zip(accounts, nonces):
+            if isinstance(nonce, RPCError):
+                raise nonce
+        nonces = {account: int(nonce, 16) for account, nonce in zip(accounts, nonces)}
+        free_nonces = {account: set() for account in accounts}  # 因发送失败而空出、尚未再分配的nonce
+
+        results = []
+        txs = []
+        for no, (name, data) in enumerate(contracts):
+            result = RPCDeployResult(name, accounts[no % len(accounts)])
+            results.append(result)
+            if '__' in data:  # 未链接的库地址占位符
+                result.error = 'Unlinked library placeholder in bytecode'
+                continue
+            data = data if data.startswith('0x') else '0x' + data
+            txs.append((result, self.__new_tx(result.account, {'data': data})))
+
+        # 分批发送交易，之前已发送交易的收据查询随同下一批交易在同一批量请求中发送，不另外往返
+        pending = []
+        for i in range(0, len(txs), self.batch_size):
+            chunk = txs[i:i + self.batch_size]
+            for result, tx in chunk:
+                tx['nonce'] = hex(self.__take_nonce(result.account, nonces, free_nonces))
+            polled = pending[:self.batch_size]
+            sent_time = time.time()
+            responses = self.client.batch([('eth_sendTransaction', [tx]) for _, tx in chunk] +
+                                          [('eth_getTransactionReceipt', [result.tx_hash]) for result in polled])
+            tx_hashes = responses[:len(chunk)]
+            pending = self.__handle_receipts(polled, responses[len(chunk):]) + pending[len(polled):]
+            for (result, tx), tx_hash in zip(chunk, tx_hashes):
+                if isinstance(tx_hash, RPCError):
+                    result.error = str(tx_hash)
+                    self.__release_nonce(result.account, int(tx['nonce'], 16), nonces, free_nonces)
+                else:
+                    result.tx_hash = tx_hash
+                    result.sent_time = sent_time
+                    pending.append(result)
+        self.__fill_nonce_gaps(free_nonces)
+        deadline = time.time() + self.receipt_timeout
+        while pending and time.time() < deadline:
+            time.sleep(self.poll_interval)
+            pending = self.__poll_receipts(pending)
+        for result in pending:
+            result.error = 'Timed out waiting for receipt'
+        return results
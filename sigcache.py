@@ -0,0 +1,191 @@
+import json  # json
+import sqlite3  # 缓存数据库
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import _pysha3  # 安装pysha3后导入
+
+ANALYZER_VERSION = 3  # 签名提取逻辑版本，提取结果发生变化时须递增以使旧缓存失效
+
+
+def keccak_hex(data: bytes) -> str:
+    """
+    计算数据的keccak256哈希值
+    :param data: 数据
+    :type data: bytes
+    :return: 十六进制哈希值
+    :rtype: str
+    """
+    s = _pysha3.keccak_256()
+    s.update(data)
+    return s.hexdigest()
+
+
+def get_ABI_key(abi: list) -> str:
+    """
+    获取ABI的缓存键：规范化ABI JSON的keccak256哈希值
+    :param abi: 合约ABI的json对象
+    :type abi: list
+    :return: 缓存键
+    :rtype: str
+    """
+    canonical = json.dumps(abi, sort_keys=True, separators=(',', ':'))
+    return keccak_hex(canonical.encode('utf8'))
+
+
+def get_BIN_key(code: bytes) -> str:
+    """
+    获取字节码的缓存键：runtime字节码的keccak256哈希值
+    :param code: runtime字节码
+    :type code: bytes
+    :return: 缓存键
+    :rtype: str
+    """
+    return keccak_hex(code)
+
+
+class SigCache:
+    """以ABI/字节码哈希为键的签名结果持久化缓存（SQLite）"""
+
+    def __init__(self, db_path: str, max_size: int = 256 * 1024 * 1024, commit_interval: int = 500):
+        """
+        :param db_path: 缓存数据库文件路径
+        :type db_path: str
+        :param max_size: 缓存值的总字节数上限，超出时按最近最少使用淘汰
+        :type max_size: int
+        :param commit_interval: 每写入多少次提交一次，使中途退出时已分析的结果不丢失
+        :type commit_interval: int
+        """
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False)  # 流水线模式下由多个线程访问
+        self.__lock = threading.RLock()
+        self.__conn.execute('CREATE TABLE IF NOT EXISTS sig_cache ('
+                            'kind TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL, '
+                            'value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, '
+                            'PRIMARY KEY (kind, key, version))')
+        self.__conn.execute('CREATE INDEX IF NOT EXISTS sig_cache_last_used ON sig_cache (last_used)')
+        self.__conn.commit()
+        self.__max_size = max_size
+        self.__commit_interval = max(1, commit_interval)
+        self.__uncommitted = 0  # 未提交的写入次数
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self.evictions = 0  # 淘汰条目数
+
+    def __get(self, kind: str, key: str):
+        with self.__lock:
+            row = self.__conn.execute('SELECT value FROM sig_cache WHERE kind = ? AND key = ? AND version = ?',
+                                      (kind, key, ANALYZER_VERSION)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__conn.execute('UPDATE sig_cache SET last_used = ? WHERE kind = ? AND key = ? AND version = ?',
+                                (time.time(), kind, key, ANALYZER_VERSION))
+            self.__wrote()
+        return json.loads(row[0])
+
+    def __put(self, kind: str, key: str, value):
+        value = json.dumps(value)
+        with self.__lock:
+            self.__conn.execute('INSERT OR REPLACE INTO sig_cache VALUES (?, ?, ?, ?, ?, ?)',
+                                (kind, key, ANALYZER_VERSION, value, len(value), time.time()))
+            self.__wrote()
+
+    def __wrote(self):
+        self.__uncommitted += 1
+        if self.__uncommitted >= self.__commit_interval:
+            self.commit()
+
+    def commit(self):
+        """提交未提交的写入"""
+        with self.__lock:
+            self.__conn.commit()
+            self.__uncommitted = 0
+
+    def get_ABI_sigs(self, key: str) -> Optional[List[List[str]]]:
+        """
+        获取缓存的ABI签名
+        :param key: ABI缓存键
+        :type key: str
+        :return: 签名列表，元素为函数选择器和函数签名；未命中返回None
+        :rtype: list[list[str]]
+        """
+        return self.__get('abi', key)
+
+    def put_ABI_sigs(self, key: str, abi_sigs: List[List[str]]):
+        """
+        缓存ABI签名
+        :param key: ABI缓存键
+        :type key: str
+        :param abi_sigs: 签名列表，元素为函数选择器和函数签名
+        :type abi_sigs: list[list[str]]
+        """
+        self.__put('abi', key, abi_sigs)
+
+    def get_BIN_sigs(self, key: str) -> Optional[Dict[str, Set[str]]]:
+        """
+        获取缓存的BIN签名
+        :param key: 字节码缓存键
+        :type key: str
+        :return: 函数选择器-外部调用集合（元素为函数选择器/调用类型）的映射；未命中返回None
+        :rtype: dict[str, set[str]]
+        """
+        value = self.__get('bin', key)
+        if value is None:
+            return None
+        return {func_sig: set(extern_call_sigs) for func_sig, extern_call_sigs in value}
+
+    def put_BIN_sigs(self, key: str, bin_sigs_dict: Dict[str, Set[str]]):
+        """
+        缓存BIN签名
+        :param key: 字节码缓存键
+        :type key: str
+        :param bin_sigs_dict: 函数选择器-外部调用集合（元素为函数选择器/调用类型）的映射
+        :type bin_sigs_dict: dict[str, set[str]]
+        """
+        self.__put('bin', key, [[func_sig, sorted(extern_call_sigs)]
+                                for func_sig, extern_call_sigs in bin_sigs_dict.items()])
+
+    def get_size(self) -> int:
+        """
+        获取缓存值的总字节数
+        :return: 总字节数
+        :rtype: int
+        """
+        with self.__lock:
+            return self.__conn.execute('SELECT COALESCE(SUM(size), 0) FROM sig_cache').fetchone()[0]
+
+    def evict(self):
+        """按最近最少使用淘汰缓存，直至总字节数不超过上限；同时清除旧版本的缓存"""
+        with self.__lock:
+            cur = self.__conn.execute('DELETE FROM sig_cache WHERE version != ?', (ANALYZER_VERSION,))
+            self.evictions += cur.rowcount
+            excess = self.get_size() - self.__max_size
+            if excess > 0:
+                rows = self.__conn.execute('SELECT kind, key, version, size FROM sig_cache ORDER BY last_used')
+                stale = []
+                for kind, key, version, size in rows:
+                    if excess <= 0:
+                        break
+                    stale.append((kind, key, version))
+                    excess -= size
+                self.__conn.executemany('DELETE FROM sig_cache WHERE kind = ? AND key = ? AND version = ?', stale)
+                self.evictions += len(stale)
+            self.commit()
+
+    def get_stats(self) -> str:
+        """
+        获取缓存统计信息
+        :return: 统计信息
+        :rtype: str
+        """
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return f'Signature cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), ' \
+               f'{self.evictions} evicted, {self.get_size()} bytes'
+
+    def close(self):
+        """淘汰超出上限的缓存并关闭数据库"""
+        self.evict()
+        self.__conn.close()
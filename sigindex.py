@@ -0,0 +1,134 @@
+import json  # json
+import os
+import re  # 正则表达式
+from typing import Iterable, List
+
+import _pysha3  # 安装pysha3后导入
+
+_KECCAK_256 = _pysha3.keccak_256()  # 空的keccak256对象，复制后使用以省去重复初始化
+_DUMP_LINE_RE = re.compile(r'^(?:0x)?([0-9a-fA-F]{8})[\s:,=]+(\S.*?)\s*$')  # 签名导出文件的“选择器 签名”行
+
+
+def hash_selector(sig: str) -> str:
+    """
+    计算函数签名的函数选择器
+    :param sig: 函数签名，如'transfer(address,uint256)'
+    :type sig: str
+    :return: 函数选择器，如'0xa9059cbb'
+    :rtype: str
+    """
+    s = _KECCAK_256.copy()
+    s.update(sig.encode('utf8'))
+    return '0x' + s.hexdigest()[:8]  # hash值前4字节
+
+
+class SelectorIndex:
+    """函数签名与4字节函数选择器的双向索引：签名哈希结果被记忆，可由选择器反查签名"""
+
+    def __init__(self, file_path: str = None):
+        """
+        :param file_path: 索引持久化文件路径，为None时不持久化
+        :type file_path: str
+        """
+        self.__file_path = file_path
+        self.__selectors = {}  # 函数签名-函数选择器的映射
+        self.__sigs = {}  # 函数选择器-函数签名列表的映射
+        self.__dirty = False
+        if file_path and os.path.isfile(file_path):
+            with open(file_path) as fo:
+                for selector, sigs in json.load(fo).items():
+                    for sig in sigs:
+                        self.__add(selector, sig)
+            self.__dirty = False
+
+    def __add(self, selector: str, sig: str):
+        if sig in self.__selectors:
+            return
+        self.__selectors[sig] = selector
+        self.__sigs.setdefault(selector, []).append(sig)
+        self.__dirty = True
+
+    def get_selector(self, sig: str) -> str:
+        """
+        获取函数签名的函数选择器，并加入索引
+        :param sig: 函数签名，如'transfer(address,uint256)'
+        :type sig: str
+        :return: 函数选择器，如'0xa9059cbb'
+        :rtype: str
+        """
+        selector = self.__selectors.get(sig)
+        if selector is None:
+            selector = hash_selector(sig)
+            self.__add(selector, sig)
+        return selector
+
+    def get_selectors(self, sigs: Iterable[str]) -> List[str]:
+        """
+        批量获取函数签名的函数选择器：先去除重复和已索引的签名，其余签名各计算一次哈希后加入索引
+        :param sigs: 函数签名
+        :type sigs: Iterable[str]
+        :return: 与sigs依次对应的函数选择器列表
+        :rtype: list[str]
+        """
+        sigs = list(sigs)
+        for sig in dict.fromkeys(sig for sig in sigs if sig not in self.__selectors):  # 保持首次出现的顺序
+            self.__add(hash_selector(sig), sig)
+        return [self.__selectors[sig] for sig in sigs]
+
+    def add_sigs(self, abi_sigs: Iterable[List[str]]):
+        """
+        加入已计算的函数选择器和函数签名
+        :param abi_sigs: 元素为函数选择器和函数签名
+        :type abi_sigs: Iterable[list[str]]
+        """
+        for selector, sig in abi_sigs:
+            self.__add(selector, sig)
+
+    def seed_from_dump(self, file_path: str) -> int:
+        """
+        从本地签名导出文件加入函数签名，每行为“选择器 签名”（分隔符可为空白、:、,或=）或仅为签名
+        :param file_path: 签名导出文件路径
+        :type file_path: str
+        :return: 新加入的签名数
+        :rtype: int
+        """
+        num = len(self.__selectors)
+        with open(file_path, encoding='utf8', errors='replace') as fo:
+            for line in fo:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                match = _DUMP_LINE_RE.match(line)
+                if match:
+                    self.__add('0x' + match.group(1).lower(), match.group(2))
+                elif '(' in line and line.endswith(')'):
+                    self.get_selector(line)
+        return len(self.__selectors) - num
+
+    def lookup(self, selector: str) -> List[str]:
+        """
+        由函数选择器反查函数签名
+        :param selector: 函数选择器，如'0xa9059cbb'
+        :type selector: str
+        :return: 函数签名列表（选择器冲突时有多个），未索引时为空列表
+        :rtype: list[str]
+        """
+        return self.__sigs.get(selector, [])
+
+    def get_size(self) -> int:
+        """
+        获取索引的签名数
+        :rtype: int
+        """
+        return len(self.__selectors)
+
+    def save(self):
+        """将索引写入持久化文件，索引无变化时不写入"""
+        if not self.__file_path or not self.__dirty:
+            return
+        tmp_file_path = self.__file_path + '.tmp'
+        with open(tmp_file_path, 'w') as wfo:
+            json.dump(self.__sigs, wfo, sort_keys=True)
+        os.replace(tmp_file_path, self.__file_path)
+        self.__dirty = False
+
@@ -0,0 +1,109 @@
+import re  # 正则表达式
+from typing import List, Optional, Tuple
+
+Version = Tuple[int, int, int]
+Comparator = Tuple[str, Version]
+
+
+def parse_version(version_str: str) -> Version:
+    """
+    解析版本号字符串，缺省部分补0
+    :param version_str: 版本号字符串，如'0.4.24'、'0.5'
+    :type version_str: str
+    :return: 版本号三元组
+    :rtype: tuple[int, int, int]
+    """
+    parts = [int(part) for part in re.findall(r'\d+', version_str)[:3]]
+    return tuple(parts + [0] * (3 - len(parts)))
+
+
+def get_pragma_exprs(source: str) -> List[str]:
+    """
+    获取合约源码中的所有solidity版本声明
+    :param source: 合约源码
+    :type source: str
+    :return: 版本表达式列表，如['^0.4.24', '>=0.5.0 <0.7.0']
+    :rtype: list[str]
+    """
+    source = re.sub(r'/\*.*?\*/|//[^\n]*', '', source, flags=re.S)  # 去除注释
+    return [expr.strip() for expr in re.findall(r'\bpragma\s+solidity\s+([^;]+);', source)]
+
+
+def parse_range(expr: str) -> List[List[Comparator]]:
+    """
+    解析版本范围表达式
+    :param expr: 版本表达式，支持^、~、=、>、>=、<、<=、部分版本号、x通配符、连字符范围和||
+    :type expr: str
+    :return: 析取范式：各候选范围为比较条件的列表，满足任一候选范围即满足表达式
+    :rtype: list[list[tuple[str, tuple[int, int, int]]]]
+    """
+    alternatives = []
+    for alt in expr.split('||'):
+        comparators = []
+        hyphen = re.match(r'^\s*(\S+)\s+-\s+(\S+)\s*$', alt)
+        if hyphen:
+            comparators.append(('>=', parse_version(hyphen.group(1))))
+            comparators.append(('<=', parse_version(hyphen.group(2))))
+            alternatives.append(comparators)
+            continue
+        for op, ver in re.findall(r'(\^|~|>=|<=|>|<|=)?\s*v?(\d+(?:\.(?:\d+|[xX*]))*)', alt):
+            parts = [part for part in ver.split('.') if part not in ('x', 'X', '*')]
+            version = parse_version('.'.join(parts))
+            major, minor, patch = version
+            if op == '^':
+                comparators.append(('>=', version))
+                if major > 0:
+                    comparators.append(('<', (major + 1, 0, 0)))
+                elif minor > 0 or len(parts) < 3:
+                    comparators.append(('<', (0, minor + 1, 0)))
+                else:
+                    comparators.append(('<', (0, 0, patch + 1)))
+            elif op == '~' or (op in ('', '=') and len(parts) < 3):  # 部分版本号匹配该前缀下的所有版本
+                comparators.append(('>=', version))
+                if len(parts) <= 1:
+                    comparators.append(('<', (major + 1, 0, 0)))
+                else:
+                    comparators.append(('<', (major, minor + 1, 0)))
+            else:
+                comparators.append((op or '=', version))
+        alternatives.append(comparators)
+    return alternatives
+
+
+def satisfies(version: Version, expr: str) -> bool:
+    """
+    判断版本是否满足版本表达式
+    :param version: 版本号三元组
+    :type version: tuple[int, int, int]
+    :param expr: 版本表达式
+    :type expr: str
+    :return: 是否满足
+    """
+    checks = {
+        '=': lambda v, c: v == c, '>': lambda v, c: v > c, '>=': lambda v, c: v >= c,
+        '<': lambda v, c: v < c, '<=': lambda v, c: v <= c,
+    }
+    for comparators in parse_range(expr):
+        if all(checks[op](version, bound) for op, bound in comparators):
+            return True
+    return False
+
+
+def select_version(exprs: List[str], installed_versions: List[str]) -> Optional[str]:
+    """
+    选择同时满足全部版本表达式的已安装编译器版本：在满足条件的最低大版本（如0.4、0.5）中选择最高版本，
+    使开放范围（如'>=0.4.22'）仍按其下限所在的大版本编译，而非使用最新的编译器
+    :param exprs: 版本表达式列表
+    :type exprs: list[str]
+    :param installed_versions: 已安装的编译器版本列表
+    :type installed_versions: list[str]
+    :return: 编译器版本，无满足条件的版本时返回None
+    :rtype: str
+    """
+    matched = [version_str for version_str in installed_versions
+               if all(satisfies(parse_version(version_str), expr) for expr in exprs)]
+    if not matched:
+        return None
+    lowest_series = min(parse_version(version_str)[:2] for version_str in matched)
+    return max((version_str for version_str in matched if parse_version(version_str)[:2] == lowest_series),
+               key=parse_version)
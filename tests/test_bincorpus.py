@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from bincorpus import BytecodeCorpus, BytecodeCorpusWriter, export_bins, import_bins
+
+BINS = {
+    'A': '6080604052600080fd00',
+    'B': '',  # 接口合约
+    'Clone': '6080604052600080fd00',
+    'UsesLib': '6080' + '__$' + '1' * 34 + '$__' + '00',  # 无法解析，存为空字节码
+}
+
+
+def write_bins(dir_path, bins):
+    os.makedirs(dir_path)
+    for name, code in bins.items():
+        with open(os.path.join(dir_path, name + '.bin'), 'w') as fo:
+            fo.write(code)
+
+
+def test_import_export_round_trip(tmp_path):
+    bin_dir_path = str(tmp_path / 'bins') + '/'
+    corpus_file_path = str(tmp_path / 'bins.corpus')
+    write_bins(bin_dir_path, BINS)
+    open(bin_dir_path + 'notes.txt', 'w').close()
+    assert import_bins(bin_dir_path, corpus_file_path) == 4
+    assert not os.path.exists(corpus_file_path + '.tmp')
+    with BytecodeCorpus(corpus_file_path) as corpus:
+        assert corpus.names() == ['A', 'B', 'Clone', 'UsesLib']
+        assert 'A' in corpus and 'notes' not in corpus
+        assert isinstance(corpus.get('A'), memoryview) and bytes(corpus.get('A')).hex() == BINS['A']
+        assert all(len(corpus.get(name)) == 0 for name in ('B', 'UsesLib'))
+
+    out_dir_path = str(tmp_path / 'out')
+    assert export_bins(corpus_file_path, out_dir_path) == 4
+    exported = {}
+    for file_name in os.listdir(out_dir_path):
+        with open(os.path.join(out_dir_path, file_name)) as fo:
+            exported[file_name[:-len('.bin')]] = fo.read()
+    assert exported == dict(BINS, UsesLib='')
+    assert import_bins(out_dir_path + '/', corpus_file_path) == 4  # 导出的BIN可再次打包
+    with BytecodeCorpus(corpus_file_path) as corpus:
+        assert {name: bytes(corpus.get(name)).hex() for name in corpus.names()} == exported
+
+
+def test_later_add_wins_and_failed_write_is_discarded(tmp_path):
+    corpus_file_path = str(tmp_path / 'bins.corpus')
+    with BytecodeCorpusWriter(corpus_file_path) as writer:
+        writer.add('A', b'\x01\x02')
+        writer.add('A', b'\x03')
+    with BytecodeCorpus(corpus_file_path) as corpus:
+        assert len(corpus) == 1 and bytes(corpus.get('A')) == b'\x03'
+    with pytest.raises(RuntimeError):
+        with BytecodeCorpusWriter(corpus_file_path) as writer:
+            writer.add('B', b'\x04')
+            raise RuntimeError('interrupted')
+    assert os.listdir(str(tmp_path)) == ['bins.corpus']  # 原语料不变，临时文件已删除
+    with BytecodeCorpus(corpus_file_path) as corpus:
+        assert corpus.names() == ['A']
+
+
+def test_rejects_non_corpus_file(tmp_path):
+    file_path = str(tmp_path / 'A.bin')
+    with open(file_path, 'w') as fo:
+        fo.write(BINS['A'] * 4)
+    with pytest.raises(ValueError):
+        BytecodeCorpus(file_path)
@@ -0,0 +1,317 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip('_pysha3')
+
+import contrCompDeploy  # noqa: E402
+from journal import Journal  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from procrunner import ProcessResult  # noqa: E402
+from rpcdeploy import RPCDeployResult  # noqa: E402
+from sigindex import SelectorIndex, hash_selector  # noqa: E402
+
+RUNTIME = '0x6080604052600080fd00'  # 无函数分派的runtime字节码
+UNLINKED = '0x6080604052' + '__$' + '1' * 34 + '$__' + '600080fd00'  # 含未链接库占位符
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """将全部工作目录指向临时Truffle项目，并替换运行指标和运行日志"""
+    project_path = str(tmp_path) + '/'
+    os.makedirs(project_path + 'build/contracts')
+    root = contrCompDeploy.truffle_project_path
+    for name in ('truffle_project_path', 'tmp_migration_dir_path', 'abi_dir_path', 'bin_dir_path', 'abi_sig_dir_path',
+                 'bin_sig_dir_path', 'clone_report_file_path', 'addrmap_file_path', 'log_dir_path',
+                 'compile_manifest_file_path', 'pragma_cache_file_path'):
+        value = getattr(contrCompDeploy, name)
+        monkeypatch.setattr(contrCompDeploy, name, project_path + value[len(root):])
+    monkeypatch.setattr(contrCompDeploy, 'metrics', Metrics())
+    journal = Journal(project_path + 'journal.db')
+    monkeypatch.setattr(contrCompDeploy, 'journal', journal)
+    yield project_path
+    journal.close()
+
+
+def write_artifacts(project_path, bytecodes):
+    for name, deployed_bytecode in bytecodes.items():
+        with open(project_path + f'build/contracts/{name}.json', 'w') as fo:
+            json.dump({'contractName': name, 'abi': [], 'bytecode': deployed_bytecode,
+                       'deployedBytecode': deployed_bytecode}, fo)
+
+
+def get_items(stage, status):
+    return sorted(item.name for item in contrCompDeploy.metrics.items if item.stage == stage and item.status == status)
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_empty_and_unlinked_bytecodes_are_not_grouped(project, pipeline):
+    write_artifacts(project, {'A': RUNTIME, 'B': RUNTIME, 'IToken': '0x', 'UsesLib': UNLINKED})
+    if pipeline:
+        contrCompDeploy.contracts_pipeline(deploy_files=False)
+    else:
+        contrCompDeploy.get_BIN_sigs(contracts=contrCompDeploy.get_ABIs_and_BINs())
+
+    with open(contrCompDeploy.clone_report_file_path) as fo:
+        assert fo.read().splitlines()[1:] == [f'2,{contrCompDeploy.get_BIN_key(bytes.fromhex(RUNTIME[2:]))},A B']
+    assert get_items('bin_sigs', 'skipped') == ['IToken', 'UsesLib']
+    assert all(item.reason == 'empty or unlinked bytecode'
+               for item in contrCompDeploy.metrics.items if item.stage == 'bin_sigs' and item.status == 'skipped')
+    assert sorted(contrCompDeploy.journal.get_done('bin_sig')) == ['A', 'B']
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_resume_skips_bin_sigs_done_in_journal(project, monkeypatch, pipeline):
+    def run():
+        monkeypatch.setattr(contrCompDeploy, 'metrics', Metrics())
+        if pipeline:
+            contrCompDeploy.contracts_pipeline(deploy_files=False)
+        else:
+            contrCompDeploy.get_BIN_sigs(contracts=contrCompDeploy.get_ABIs_and_BINs())
+
+    write_artifacts(project, {'A': RUNTIME, 'B': RUNTIME})
+    run()
+    assert get_items('bin_sigs', 'processed') == ['A', 'B']
+    write_artifacts(project, {'B': RUNTIME[:-2] + 'fe00'})  # 重新编译后字节码改变
+    run()
+    assert get_items('bin_sigs', 'skipped') == ['A']
+    assert get_items('bin_sigs', 'processed') == ['B']
+
+
+def test_resume_skips_contracts_deployed_in_journal(project, monkeypatch):
+    os.makedirs(project + 'contracts_5')
+    for version in (4, 6):
+        os.makedirs(project + f'contracts_{version}')
+    for name in ('A', 'B', 'C'):
+        open(project + f'contracts_5/{name}.sol', 'w').close()
+    write_artifacts(project, {'A': RUNTIME, 'B': RUNTIME, 'C': RUNTIME})
+    contrCompDeploy.journal.mark_done('deploy', 'A', '0x' + 'aa' * 20)  # 上次运行中断前已部署
+    contrCompDeploy.journal.mark_failed('deploy', 'B', 'execution reverted')
+    deploying = []
+
+    class FakeDeployer:
+        def __init__(self, client, *args, **kwargs):
+            pass
+
+        def deploy(self, contracts):
+            deploying.extend(name for name, _ in contracts)
+            results = [RPCDeployResult(name, '0x' + '11' * 20) for name, _ in contracts]
+            for no, result in enumerate(results):
+                result.address, result.latency = f'0x{no + 1:040x}', 0.1
+            return results
+
+    monkeypatch.setattr(contrCompDeploy, 'RPCDeployer', FakeDeployer)
+    contrCompDeploy.contracts_deploy_by_rpc()
+
+    assert sorted(deploying) == ['B', 'C']  # 失败的合约重新部署
+    assert get_items('deploy', 'skipped') == ['A']
+    assert sorted(contrCompDeploy.journal.get_done('deploy')) == ['A', 'B', 'C']
+    with open(contrCompDeploy.addrmap_file_path) as fo:
+        assert sorted(line.split(',\t')[1] for line in fo.read().splitlines()) == ['B', 'C']  # 追加新部署的合约
+
+
+def constructor(*inputs):
+    return [{'type': 'constructor', 'inputs': list(inputs)}]
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_unsupported_constructor_type_skips_only_that_contract(project, pipeline):
+    abis = {
+        'Fixed': constructor({'name': 'rate', 'type': 'fixed128x18'}),
+        'Pair': constructor({'name': 'pair', 'type': 'tuple', 'components': [{'name': 'a', 'type': 'address'},
+                                                                            {'name': 'n', 'type': 'uint8'}]},
+                            {'name': 'ids', 'type': 'uint256[2]'}),
+        'Plain': [],
+    }
+    for version, names in ((4, ['Fixed']), (5, ['Pair', 'Plain']), (6, [])):
+        os.makedirs(project + f'contracts_{version}')
+        for name in names:
+            open(project + f'contracts_{version}/{name}.sol', 'w').close()
+    write_artifacts(project, {name: RUNTIME for name in abis})
+    for name, abi in abis.items():
+        with open(project + f'build/contracts/{name}.json') as fo:
+            build_info = json.load(fo)
+        build_info['abi'] = abi
+        with open(project + f'build/contracts/{name}.json', 'w') as fo:
+            json.dump(build_info, fo)
+    if pipeline:
+        contrCompDeploy.contracts_pipeline(deploy_files=True)
+    else:
+        contrCompDeploy.create_deploy_files(contrCompDeploy.get_ABIs_and_BINs())
+
+    file_names = sorted(os.listdir(contrCompDeploy.tmp_migration_dir_path + 'group_0'))
+    assert sorted(file_name.split('_', 1)[1] for file_name in file_names) == ['Pair.sol.js', 'Plain.sol.js']
+    assert sorted(file_name.split('_', 1)[0] for file_name in file_names) == ['1', '2']  # 部署序号仍连续
+    with open(contrCompDeploy.tmp_migration_dir_path + 'group_0/' + next(f for f in file_names if 'Pair' in f)) as fo:
+        assert 'deployer.deploy(Contract,["0x' in fo.read()
+    assert get_items('deploy_files', 'failed') == ['Fixed']
+    assert [name for name, _ in contrCompDeploy.journal.get_failed('deploy_file')] == ['Fixed']
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_sig_names_cover_abis_processed_after_the_caller(project, monkeypatch, pipeline):
+    monkeypatch.setattr(contrCompDeploy, 'selector_index', SelectorIndex())
+    monkeypatch.setattr(contrCompDeploy, 'bin_sig_with_names', True)
+    selector = hash_selector('transfer(address,uint256)')
+    caller = ('0x600035' '60e01c' '80' '6311111111' '14' '610015' '57' '600080fd'  # 分派到0x11111111
+              '5b' '63' + selector[2:] + '61001f' '56' '5b' 'f1' '00')  # PUSH4 selector后的代码块中有CALL
+    write_artifacts(project, {'Caller': caller, 'Token': RUNTIME})
+    with open(project + 'build/contracts/Token.json') as fo:
+        build_info = json.load(fo)
+    build_info['abi'] = [{'type': 'function', 'name': 'transfer',
+                          'inputs': [{'name': 'to', 'type': 'address'}, {'name': 'value', 'type': 'uint256'}]}]
+    with open(project + 'build/contracts/Token.json', 'w') as fo:
+        json.dump(build_info, fo)
+    if pipeline:
+        contrCompDeploy.contracts_pipeline(deploy_files=False)
+    else:
+        contracts = contrCompDeploy.get_ABIs_and_BINs()
+        contrCompDeploy.get_ABI_sigs(contracts=contracts)
+        contrCompDeploy.get_BIN_sigs(contracts=contracts)
+
+    with open(contrCompDeploy.bin_sig_dir_path + 'Caller.bin.sig') as fo:
+        assert fo.read() == f'0x11111111:{selector}/call=transfer(address,uint256)\n'
+
+
+def test_incremental_compile_rebuilds_only_changed_versions(project, monkeypatch):
+    monkeypatch.setattr(contrCompDeploy, 'tmp_sol_dir_path', project + 'sol/')
+    monkeypatch.setattr(contrCompDeploy, 'get_installed_compiler_versions', lambda: ['0.4.26', '0.5.17', '0.6.12'])
+    os.makedirs(project + 'sol')
+    for sol_name, source in (('A.sol', 'pragma solidity ^0.5.0;\n'), ('B.sol', 'pragma solidity ^0.5.0;\n'),
+                             ('C.sol', 'pragma solidity ^0.4.24;\n')):
+        with open(project + 'sol/' + sol_name, 'w') as fo:
+            fo.write(source)
+    calls = []
+
+    def compile_in_workspace(version_str, contract_dir_path, sol_names, reused_artifacts, workspace_name):
+        calls.append((version_str, sorted(sol_names), sorted(reused_artifacts)))
+        for sol_name in sol_names:
+            with open(project + 'build/contracts/' + sol_name.replace('.sol', '.json'), 'w') as fo:
+                json.dump({'contractName': sol_name[:-4], 'sourcePath': contract_dir_path + sol_name}, fo)
+        return True
+
+    monkeypatch.setattr(contrCompDeploy, 'contracts_compile_in_workspace', compile_in_workspace)
+    assert contrCompDeploy.contracts_compile()
+    assert sorted(calls) == [('0.4.26', ['C.sol'], []), ('0.5.17', ['A.sol', 'B.sol'], [])]
+    manifest = contrCompDeploy.load_compile_manifest()
+    assert {name: (entry['compiler'], entry['artifacts'], entry['ok']) for name, entry in manifest.items()} == {
+        'A.sol': ('0.5.17', ['A.json'], True), 'B.sol': ('0.5.17', ['B.json'], True),
+        'C.sol': ('0.4.26', ['C.json'], True)}
+
+    calls.clear()
+    assert contrCompDeploy.contracts_compile()  # 未修改的合约不重新编译
+    assert calls == []
+    with open(project + 'sol/A.sol', 'a') as fo:
+        fo.write('contract A {}\n')
+    os.remove(project + 'sol/C.sol')
+    assert contrCompDeploy.contracts_compile()
+    assert calls == [('0.5.17', ['A.sol', 'B.sol'], ['B.json'])]  # 同批次未修改的合约复用编译产物
+    assert sorted(contrCompDeploy.load_compile_manifest()) == ['A.sol', 'B.sol']
+    assert sorted(os.listdir(project + 'build/contracts')) == ['A.json', 'B.json']  # 删除已移除合约的编译产物
+    assert os.listdir(project + 'contracts_4') == []
+
+
+def test_compile_versions_follow_each_files_import_closure(monkeypatch):
+    monkeypatch.setattr(contrCompDeploy, 'get_installed_compiler_versions',
+                        lambda: ['0.4.24', '0.4.26', '0.5.17', '0.6.11'])
+    source_infos = {
+        'A.sol': {'pragmas': ['=0.4.24'], 'imports': ['Lib.sol']},
+        'B.sol': {'pragmas': ['^0.4.25'], 'imports': ['Lib.sol']},  # 与A导入同一合约，但不受A的约束
+        'Lib.sol': {'pragmas': ['^0.4.0'], 'imports': ['Missing.sol']},
+        'C.sol': {'pragmas': ['^0.5.0'], 'imports': ['Base.sol']},
+        'Base.sol': {'pragmas': ['>=0.4.22'], 'imports': []},
+        'Old.sol': {'pragmas': ['=0.4.11'], 'imports': []},
+        'UsesOld.sol': {'pragmas': [], 'imports': ['Old.sol']},
+    }
+    versions, errors = contrCompDeploy.resolve_compile_versions(source_infos)
+    assert versions == {'A.sol': '0.4.24', 'B.sol': '0.4.26', 'Lib.sol': '0.4.26', 'C.sol': '0.5.17',
+                        'Base.sol': '0.4.26'}
+    assert errors == {'Old.sol': 'no installed compiler satisfies =0.4.11',  # 不退回0.4的默认编译器
+                      'UsesOld.sol': 'no installed compiler satisfies =0.4.11 (including imports)'}
+
+
+def test_import_sources_come_from_other_buckets(project, monkeypatch):
+    monkeypatch.setattr(contrCompDeploy, 'tmp_sol_dir_path', project + 'sol/')
+    os.makedirs(project + 'sol')
+    os.makedirs(project + 'contracts_5')
+    for dir_path, sol_name, source in (('sol/', 'Base.sol', 'pragma solidity >=0.4.22;\n'),
+                                       ('sol/', 'C.sol', 'import "./Base.sol";\n'),
+                                       ('contracts_5/', 'C.sol', 'import "./Base.sol";\n')):
+        with open(project + dir_path + sol_name, 'w') as fo:
+            fo.write(source)
+    assert contrCompDeploy.get_import_sources(project + 'contracts_5/', ['C.sol']) == {
+        'C.sol': project + 'contracts_5/C.sol', 'Base.sol': project + 'sol/Base.sol'}
+
+
+def test_compile_shards_keep_import_groups_together(tmp_path):
+    contract_dir_path = str(tmp_path) + '/'
+    sources = {'A.sol': '', 'B.sol': 'import "./BLib.sol";\n', 'BLib.sol': '', 'C.sol': '', 'D.sol': ''}
+    for sol_name, source in sources.items():
+        with open(contract_dir_path + sol_name, 'w') as fo:
+            fo.write(source)
+    shards = contrCompDeploy.get_compile_shards(contract_dir_path, sorted(sources), 2)
+    assert [sorted(map(sorted, shard)) for shard in shards] == [[['A.sol']], [['B.sol', 'BLib.sol']],
+                                                                 [['C.sol'], ['D.sol']]]
+
+
+def test_failing_shard_is_bisected_to_the_bad_group(monkeypatch):
+    monkeypatch.setattr(contrCompDeploy, 'compiler_backend', 'truffle')
+    monkeypatch.setattr(contrCompDeploy, 'compile_shard_size', 8)
+    calls = []
+
+    def compile_in_workspace(version_str, contract_dir_path, sol_names, reused_artifacts, workspace_name):
+        calls.append((workspace_name, sorted(sol_names), reused_artifacts))
+        return 'Bad.sol' not in sol_names
+
+    monkeypatch.setattr(contrCompDeploy, 'contracts_compile_in_workspace', compile_in_workspace)
+    shard = [['A.sol'], ['B.sol', 'BLib.sol'], ['Bad.sol'], ['C.sol']]
+    manifest = {sol_name: {'ok': False, 'artifacts': []} for group in shard for sol_name in group}
+    manifest['A.sol'] = {'ok': True, 'artifacts': ['A.json']}  # 未修改的合约复用编译产物
+    ok_sol_names, bad_sol_names = contrCompDeploy.contracts_compile_shard('0.5.17', '', shard, manifest, 's0')
+
+    assert sorted(ok_sol_names) == ['A.sol', 'B.sol', 'BLib.sol', 'C.sol']
+    assert bad_sol_names == ['Bad.sol']
+    assert [(name, sol_names) for name, sol_names, _ in calls] == [
+        ('s0', ['A.sol', 'B.sol', 'BLib.sol', 'Bad.sol', 'C.sol']), ('s0a', ['A.sol', 'B.sol', 'BLib.sol']),
+        ('s0b', ['Bad.sol', 'C.sol']), ('s0ba', ['Bad.sol']), ('s0bb', ['C.sol'])]
+    assert calls[0][2] == calls[1][2] == ['A.json'] and calls[2][2] == []
+
+
+def test_compile_by_solc_writes_only_requested_contracts(project, monkeypatch):
+    monkeypatch.setattr(contrCompDeploy, 'tmp_sol_dir_path', project + 'sol/')
+    monkeypatch.setattr(contrCompDeploy, 'solc_bin_dir_path', project + 'solc/')
+    for dir_path, sol_name, source in (('sol/', 'Base.sol', 'contract Base {}\n'),
+                                       ('contracts_5/', 'A.sol', 'import "./Base.sol";\ncontract A is Base {}\n')):
+        os.makedirs(project + dir_path, exist_ok=True)
+        with open(project + dir_path + sol_name, 'w') as fo:
+            fo.write(source)
+    os.makedirs(project + 'solc')
+    open(project + 'solc/solc-0.5.17', 'w').close()
+    std_inputs = []
+    errors = []
+
+    def run(cmd, input=None, **kwargs):
+        std_inputs.append(json.loads(input))
+        contract_output = {'abi': [], 'evm': {'bytecode': {'object': '6080'}, 'deployedBytecode': {'object': '6000'}}}
+        output = {'errors': errors,
+                  'contracts': {'A.sol': {'A': contract_output}, 'Base.sol': {'Base': contract_output}}}
+        return ProcessResult(cmd, 0, 0.1, [], output=json.dumps(output))
+
+    monkeypatch.setattr(contrCompDeploy.runner, 'run', run)
+    errors.append({'severity': 'warning', 'formattedMessage': 'Warning: unused variable'})
+    assert contrCompDeploy.contracts_compile_by_solc('0.5.17', project + 'contracts_5/', ['A.sol'])
+
+    assert sorted(std_inputs[0]['sources']) == ['A.sol', 'Base.sol']  # 导入的合约取自合约暂存目录
+    assert list(std_inputs[0]['settings']['outputSelection']) == ['A.sol']
+    assert os.listdir(project + 'build/contracts') == ['A.json']  # 导入的合约由其自身的批次编译
+    with open(project + 'build/contracts/A.json') as fo:
+        assert json.load(fo) == {'contractName': 'A', 'abi': [], 'bytecode': '0x6080', 'deployedBytecode': '0x6000',
+                                 'sourcePath': project + 'contracts_5/A.sol',
+                                 'compiler': {'name': 'solc', 'version': '0.5.17'}}
+    with open(contrCompDeploy.bin_dir_path + 'A.bin') as fo:
+        assert fo.read() == '6000'
+    errors.append({'severity': 'error', 'formattedMessage': 'TypeError: ...'})
+    assert not contrCompDeploy.contracts_compile_by_solc('0.5.17', project + 'contracts_5/', ['A.sol'])
+    assert not contrCompDeploy.contracts_compile_by_solc('0.4.26', project + 'contracts_5/', ['A.sol'])  # 未安装
+    assert len(std_inputs) == 2
@@ -0,0 +1,170 @@
+import shutil
+
+import pytest
+
+from contrbin import OP_PUSH1, OP_PUSH32, ContractDisasm, assemble_code_lines, compare_disasm_backends, \
+    decode_bytecode, disasm_bytecode, strip_metadata
+
+PROLOGUE = bytes.fromhex('6080604052348015600f57600080fd5b50')  # PUSH1 0x80 PUSH1 0x40 MSTORE CALLVALUE ...
+SWARM_TAIL = bytes.fromhex('a165627a7a72305820' + '11' * 31 + '7f' + '0029')  # 哈希末字节为PUSH32，立即数被截断
+IPFS_TAIL = bytes.fromhex('a264697066735822' + '1220' + '22' * 32 + '64736f6c6343' + '000811' + '0033')
+
+BYTECODES = {
+    'prologue': PROLOGUE,
+    'truncated_push': bytes.fromhex('600161ff'),  # PUSH2仅有1字节立即数
+    'truncated_push32': bytes.fromhex('5b7f' + '00' * 31),
+    'undefined_opcodes': bytes.fromhex('0c0d0e1e1f'),
+    'jumpdest_in_push_data': bytes.fromhex('605b5b'),
+    'swarm_metadata': PROLOGUE + SWARM_TAIL,
+    'ipfs_metadata': PROLOGUE + IPFS_TAIL,
+}
+
+
+def test_disasm_stops_at_truncated_push():
+    assert disasm_bytecode(BYTECODES['truncated_push']) == [(0, 'PUSH1 0x01')]
+    assert disasm_bytecode(BYTECODES['truncated_push32']) == [(0, 'JUMPDEST')]
+
+
+def test_disasm_format_matches_evm():
+    assert disasm_bytecode(PROLOGUE)[:3] == [(0, 'PUSH1 0x80'), (2, 'PUSH1 0x40'), (4, 'MSTORE')]
+    assert disasm_bytecode(BYTECODES['undefined_opcodes'])[0] == (0, 'Missing opcode 0xc')
+    assert disasm_bytecode(BYTECODES['jumpdest_in_push_data']) == [(0, 'PUSH1 0x5b'), (2, 'JUMPDEST')]
+
+
+@pytest.mark.parametrize('name', sorted(BYTECODES))
+def test_assemble_round_trip(name):
+    code = BYTECODES[name]
+    ops, pcs = decode_bytecode(code)
+    decoded_len = 0
+    if len(ops):  # 截断的PUSH指令之前的部分
+        decoded_len = pcs[-1] + 1 + (ops[-1] - OP_PUSH1 + 1 if OP_PUSH1 <= ops[-1] <= OP_PUSH32 else 0)
+    assert assemble_code_lines(disasm_bytecode(code)) == code[:decoded_len]
+
+
+def test_strip_metadata_tails():
+    assert strip_metadata(BYTECODES['swarm_metadata']) == PROLOGUE
+    assert strip_metadata(BYTECODES['ipfs_metadata']) == PROLOGUE
+    assert strip_metadata(memoryview(BYTECODES['ipfs_metadata'])) == PROLOGUE
+    assert strip_metadata(PROLOGUE) == PROLOGUE
+
+
+@pytest.mark.skipif(shutil.which('evm') is None, reason='geth evm is not installed')
+@pytest.mark.parametrize('name', sorted(BYTECODES))
+def test_python_disasm_matches_evm(name, tmp_path):
+    file_path = tmp_path / (name + '.bin')
+    file_path.write_text(BYTECODES[name].hex())
+    assert compare_disasm_backends(str(file_path)) == []
+
+REVERT = bytes.fromhex('fd')  # 反汇编输出为Missing opcode，以原始字节插入
+
+
+def assemble(*lines):
+    """
+    汇编测试用代码：'name:'为JUMPDEST标签，'PUSHn @name'压入标签地址，bytes原样插入
+    :return: 字节码和标签-地址的映射
+    """
+    def size(line):
+        if isinstance(line, bytes):
+            return len(line)
+        name = line.split()[0]
+        return 1 + (int(name[4:]) if name.startswith('PUSH') else 0)
+
+    labels = {}
+    pc = 0
+    for line in lines:
+        if isinstance(line, str) and line.endswith(':'):
+            labels[line[:-1]] = pc
+        pc += size(line)
+    code = bytearray()
+    for line in lines:
+        if isinstance(line, bytes):
+            code.extend(line)
+            continue
+        if line.endswith(':'):
+            line = 'JUMPDEST'
+        name, *args = line.split()
+        if args and args[0].startswith('@'):
+            args = [f'0x{labels[args[0][1:]]:0{(size(line) - 1) * 2}x}']
+        code.extend(assemble_code_lines([(len(code), ' '.join([name] + args))]))
+    return bytes(code), labels
+
+
+def get_func_sigs(code):
+    cds = ContractDisasm()
+    cds.get_runtime_data_from_bytes(code)
+    return cds.get_func_sigs()
+
+
+def test_func_sigs_solc5_binary_search_dispatcher():
+    code, labels = assemble(
+        'PUSH1 0x80', 'PUSH1 0x40', 'MSTORE', 'PUSH1 0x04', 'CALLDATASIZE', 'LT', 'PUSH2 @fallback', 'JUMPI',
+        'PUSH1 0x00', 'CALLDATALOAD', 'PUSH1 0xe0', 'SHR',
+        'DUP1', 'PUSH4 0x70a08231', 'GT', 'PUSH2 @lower', 'JUMPI',  # 二分查找：选择器较小的一半
+        'DUP1', 'PUSH4 0x70a08231', 'EQ', 'PUSH2 @balance', 'JUMPI',
+        'DUP1', 'PUSH4 0xa9059cbb', 'EQ', 'PUSH2 @transfer', 'JUMPI',
+        'PUSH2 @fallback', 'JUMP',
+        'lower:', 'DUP1', 'PUSH4 0x06fdde03', 'EQ', 'PUSH2 @name', 'JUMPI',
+        'DUP1', 'PUSH4 0x18160ddd', 'EQ', 'PUSH2 @supply', 'JUMPI',
+        'fallback:', 'PUSH1 0x00', 'DUP1', REVERT,
+        'balance:', 'STOP', 'transfer:', 'STOP', 'name:', 'STOP', 'supply:', 'STOP')
+    assert get_func_sigs(code) == [['0x70a08231', labels['balance']], ['0xa9059cbb', labels['transfer']],
+                                   ['0x06fdde03', labels['name']], ['0x18160ddd', labels['supply']]]
+
+
+def test_func_sigs_solc4_dispatcher():
+    code, labels = assemble(
+        'PUSH1 0x60', 'PUSH1 0x40', 'MSTORE', 'PUSH1 0x04', 'CALLDATASIZE', 'LT', 'PUSH2 @fallback', 'JUMPI',
+        'PUSH4 0xffffffff', 'PUSH29 0x' + '01' + '00' * 28, 'PUSH1 0x00', 'CALLDATALOAD', 'DIV', 'AND',
+        'PUSH4 0x06fdde03', 'DUP2', 'EQ', 'PUSH2 @name', 'JUMPI',
+        'PUSH4 0xa9059cbb', 'DUP2', 'EQ', 'PUSH2 @transfer', 'JUMPI',
+        'fallback:', 'PUSH1 0x00', 'DUP1', REVERT,
+        'name:', 'STOP', 'transfer:', 'STOP')
+    assert get_func_sigs(code) == [['0x06fdde03', labels['name']], ['0xa9059cbb', labels['transfer']]]
+
+
+def test_func_sigs_push3_jump_target():
+    code, labels = assemble(
+        'PUSH1 0x00', 'CALLDATALOAD', 'PUSH1 0xe0', 'SHR',
+        'DUP1', 'PUSH4 0xa9059cbb', 'EQ', 'PUSH3 @transfer', 'JUMPI',
+        'PUSH1 0x00', 'DUP1', REVERT,
+        bytes.fromhex('fe') * 0x10000,  # 函数体位于64KB之后
+        'transfer:', 'STOP')
+    assert labels['transfer'] > 0xffff
+    assert get_func_sigs(code) == [['0xa9059cbb', labels['transfer']]]
+
+
+def test_func_sigs_without_stop_ignore_function_bodies():
+    # 没有STOP指令时，函数体中的PUSH4比较（如supportsInterface的接口ID）不是函数选择器
+    code, labels = assemble(
+        'PUSH1 0x00', 'CALLDATALOAD', 'PUSH1 0xe0', 'SHR',
+        'DUP1', 'PUSH4 0x01ffc9a7', 'EQ', 'PUSH2 @supports', 'JUMPI',
+        'PUSH1 0x00', 'DUP1', REVERT,
+        'supports:', 'PUSH1 0x04', 'CALLDATALOAD', 'DUP1', 'PUSH4 0x80ac58cd', 'EQ', 'PUSH2 @yes', 'JUMPI',
+        'PUSH1 0x00', 'DUP1', 'RETURN',
+        'yes:', 'PUSH1 0x20', 'PUSH1 0x00', 'RETURN')
+    assert get_func_sigs(code) == [['0x01ffc9a7', labels['supports']]]
+
+
+def test_cfg_func_blocks_follow_jumps_and_return_addresses():
+    code, labels = assemble(
+        'PUSH1 0x00', 'CALLDATALOAD', 'PUSH1 0xe0', 'SHR',
+        'DUP1', 'PUSH4 0xa9059cbb', 'EQ', 'PUSH2 @f', 'JUMPI', 'PUSH1 0x00', 'DUP1', REVERT,  # 代码块0
+        'f:', 'PUSH1 0x01', 'PUSH2 @g', 'JUMPI', 'PUSH2 @h', 'JUMP',  # 代码块1：跳转到g和h
+        'g:', 'PUSH2 @ret', 'PUSH2 @h', 'JUMP',  # 代码块2：压入返回地址ret后跳转到h
+        'h:', 'PUSH1 0x00', 'DUP1', 'DUP1', 'DUP1', 'DUP1', 'GAS', 'CALL', 'JUMP',  # 代码块3：跳转到栈上的返回地址
+        'ret:', 'STOP',  # 代码块4
+        'unused:', 'CALLER', 'SELFDESTRUCT', 'STOP')  # 代码块5：不可达
+    cds = ContractDisasm()
+    cds.get_runtime_data_from_bytes(code)
+    pcs = [pc for pc, _ in disasm_bytecode(code)]
+
+    assert cds.get_block_num() == 6
+    assert cds.get_func_blocks(labels['f']) == (1, 2, 4, 3)  # 深度优先顺序
+    assert cds.get_reachable_blocks(0) == (0, 1, 2, 4, 3)
+    assert cds.get_reachable_blocks(1) is cds.get_func_blocks(labels['f'])  # 结果已缓存
+    assert [(pcs[seg[0]], pcs[seg[-1]]) for seg in cds.get_func_codes(labels['f'])] == [
+        (labels['f'], labels['g'] - 1), (labels['g'], labels['h'] - 1), (labels['ret'], labels['ret'] + 1),
+        (labels['h'], labels['ret'] - 1)]
+    assert cds.get_block_push4_args(0) == (0xa9059cbb,)
+    assert [cds.get_block_call_types(block_id) for block_id in range(6)] == [(), (), (), ('call',), (), ()]
+    assert cds.get_func_sigs() == [['0xa9059cbb', labels['f']]]
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+
+from deployer import DeployScheduler, GroupSizer, get_migration_contract_name
+
+
+def make_project(tmp_path, contract_names):
+    project_path = str(tmp_path) + '/'
+    os.makedirs(project_path + 'build/contracts')
+    os.makedirs(project_path + 'migrations')
+    with open(project_path + 'truffle-config.js', 'w') as fo:
+        fo.write('module.exports = {};\n')
+    file_paths = []
+    for no, name in enumerate(contract_names):
+        with open(project_path + f'build/contracts/{name}.json', 'w') as fo:
+            fo.write('{}')
+        file_paths.append(project_path + f'migrations/{no + 1}_{name}.sol.js')
+        with open(file_paths[-1], 'w') as fo:
+            fo.write('')
+    return project_path, file_paths
+
+
+class FakeTruffle:
+    """模拟truffle migrate：按部署文件顺序输出部署过程，遇到出错的合约即停止并返回非0退出码"""
+
+    def __init__(self, failing_contract):
+        self.failing_contract = failing_contract
+        self.calls = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, cmd, cwd, log_file_path='', on_line=None, timeout=None):
+        with self.__lock:
+            self.calls.append((cmd, log_file_path))
+        migrations = sorted(os.listdir(cwd + 'migrations'), key=lambda file_name: int(file_name.split('_')[0]))
+        for file_name in migrations:
+            name = get_migration_contract_name(file_name)
+            assert os.path.exists(cwd + f'build/contracts/{name}.json')
+            on_line(f"   Deploying '{name}'")
+            if name == self.failing_contract:
+                on_line('Error:  *** Deployment Failed ***')
+                return 1, 'Error:  *** Deployment Failed ***'
+            address = f'0x{abs(hash(name)) % 16 ** 40:040x}'
+            with open(cwd + f'build/contracts/{name}.json', 'w') as fo:  # truffle在编译产物中记录部署地址
+                json.dump({'networks': {'5777': {'address': address}}}, fo)
+            on_line(f'   > contract address:    {address}')
+            on_line('   > gas used:            120000')
+        return 0, ''
+
+
+def test_failing_contract_is_isolated(tmp_path):
+    names = [f'C{no}' for no in range(12)]
+    project_path, file_paths = make_project(tmp_path, names)
+    fake_truffle = FakeTruffle('C5')
+    deployed = {}
+    report_threads = set()
+
+    def on_deployed(name, address):
+        report_threads.add(threading.current_thread().name)
+        deployed[name] = address
+
+    scheduler = DeployScheduler(project_path, ['a', 'b'], retries=1, runner=fake_truffle, sizer=GroupSizer(4),
+                                on_deployed=on_deployed)
+    addr_map = scheduler.deploy(file_paths)
+
+    assert scheduler.failed == [file_paths[5]]
+    assert sorted(addr_map) == sorted(name for name in names if name != 'C5')
+    assert deployed == addr_map  # deploy()返回前已完成全部回调
+    assert all(name.startswith('deploy-report') for name in report_threads)  # 不在读取输出的线程中调用
+    assert all(log_file_path.startswith(project_path + 'logs/migrate_') for _, log_file_path in fake_truffle.calls)
+    assert os.listdir(project_path + 'deploy_workspaces') == []  # 临时工作区已删除
+    for name in names:  # 部署地址写回项目的编译产物
+        with open(project_path + f'build/contracts/{name}.json') as fo:
+            networks = json.load(fo).get('networks', {})
+        assert networks == ({'5777': {'address': addr_map[name]}} if name in addr_map else {})
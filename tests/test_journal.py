@@ -0,0 +1,38 @@
+import os
+
+from journal import Journal, archive_file
+
+
+def test_records_survive_reopen(tmp_path):
+    db_path = str(tmp_path / 'journal.db')
+    journal = Journal(db_path)
+    journal.mark_done('bin_sig', 'A', 'key1')
+    journal.mark_failed('deploy', 'B', 'execution reverted')
+    journal.mark_done('deploy', 'C', '0x' + '11' * 20)
+    journal.close()
+    journal = Journal(db_path)  # 进程中断后的下次运行
+    assert journal.is_done('bin_sig', 'A') and journal.is_done('bin_sig', 'A', 'key1')
+    assert not journal.is_done('bin_sig', 'A', 'key2')  # 字节码改变后须重新分析
+    assert not journal.is_done('deploy', 'B')
+    assert journal.get_failed('deploy') == [('B', 'execution reverted')]
+    assert journal.get_done('deploy') == {'C': '0x' + '11' * 20}
+    journal.mark_done('deploy', 'B', '0x' + '22' * 20)  # 重试成功后覆盖失败记录
+    assert journal.get_failed('deploy') == []
+    assert list(journal.get_done('deploy')) == ['C', 'B']
+    journal.close()
+
+
+def test_archive_keeps_previous_run(tmp_path):
+    db_path = str(tmp_path / 'journal.db')
+    assert archive_file(db_path, 'old') == ''
+    journal = Journal(db_path)
+    journal.mark_done('deploy', 'A', '0x' + '11' * 20)
+    journal.close()
+    assert archive_file(db_path, 'old') == db_path + '.old'
+    assert not os.path.exists(db_path)
+    journal = Journal(db_path)
+    assert journal.get_done('deploy') == {}
+    journal.close()
+    journal = Journal(db_path + '.old')
+    assert journal.get_done('deploy') == {'A': '0x' + '11' * 20}
+    journal.close()
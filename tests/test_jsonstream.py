@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+from jsonstream import JSONFieldReader
+
+ARTIFACT = {
+    'contractName': 'Token',
+    'ast': {'nodes': [{'src': '0:12:0', 'text': 'say "hi" \\ {not [a] container}'}] * 3, 'empty': {}},
+    'abi': [{'name': 'transfer', 'inputs': [{'type': 'uint256'}], 'doc': 'a\\"bé\n'}],
+    'gas': 1234567890123,
+    'ratio': -1.5e-3,
+    'flags': [True, False, None],
+    'deployedBytecode': '0x' + '6080' * 40,
+}
+
+
+def read_fields(text, fields, chunk_size):
+    return JSONFieldReader(io.StringIO(text), chunk_size).read_fields(fields)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_fields_split_across_reads(chunk_size, indent):
+    text = json.dumps(ARTIFACT, indent=indent)
+    fields = ['abi', 'gas', 'ratio', 'flags', 'deployedBytecode', 'contractName']
+    assert read_fields(text, fields, chunk_size) == {field: ARTIFACT[field] for field in fields}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5])
+def test_stops_after_last_field(chunk_size):
+    text = json.dumps({'contractName': 'A', 'gas': 10}) + 'garbage'  # 读取全部字段后不再读取
+    assert read_fields(text, ['contractName'], chunk_size) == {'contractName': 'A'}
+    assert read_fields(text, ['gas'], chunk_size) == {'gas': 10}
+    assert read_fields('{}', ['gas'], chunk_size) == {}
+
+
+def test_number_at_chunk_boundary_is_not_truncated():
+    text = '{"a": 12345, "b": 6}'
+    for chunk_size in range(1, len(text) + 1):
+        assert read_fields(text, ['a', 'b'], chunk_size) == {'a': 12345, 'b': 6}
+
+
+@pytest.mark.parametrize('text', ['{"a": "abc', '{"x": [1, {"y": 2}', '{"a" 1}'])
+def test_malformed_input(text):
+    with pytest.raises(ValueError):
+        read_fields(text, ['a', 'b'], 2)
+
+
+class CountingDecoder(json.JSONDecoder):
+    """统计解析次数"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def raw_decode(self, s, idx=0):
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+
+def test_long_value_is_decoded_once():
+    value = '0x' + 'ab' * 50000
+    reader = JSONFieldReader(io.StringIO(json.dumps({'skip': [value], 'deployedBytecode': value})), 64)
+    decoder = reader._JSONFieldReader__decoder = CountingDecoder()
+    assert reader.read_fields(['deployedBytecode']) == {'deployedBytecode': value}
+    assert decoder.calls <= 6  # 2个字段名和1个字段值各至多解析两次，不随读入次数增加
@@ -0,0 +1,22 @@
+from pipeline import Stage, run_pipeline
+
+
+def analyze(item: int) -> int:
+    if item == 2:
+        raise ValueError('bad bytecode')
+    return item
+
+
+def test_failed_item_is_dropped_by_default():
+    collected = []
+    stats = run_pipeline('source', range(4), [Stage('analyze', analyze), Stage('collect', collected.append)])
+    assert sorted(collected) == [0, 1, 3]
+    assert stats[1].failed == 1 and stats[1].errors == [('2', 'ValueError: bad bytecode')]
+
+
+def test_forward_failed_passes_item_to_next_stage():
+    collected = []
+    stats = run_pipeline('source', range(4), [Stage('analyze', analyze, forward_failed=True),
+                                              Stage('collect', collected.append)])
+    assert sorted(collected) == [0, 1, 2, 3]
+    assert stats[1].processed == 3 and stats[1].failed == 1
@@ -0,0 +1,91 @@
+from rpcdeploy import RPCDeployer, RPCError
+
+ACCOUNT = '0x' + '11' * 20
+
+
+class FakeNode:
+    """模拟开发节点：按nonce顺序打包各账户的交易，nonce有空位时其后的交易留在交易池中"""
+
+    def __init__(self, failing_data=()):
+        self.failing_data = set(failing_data)  # 发送时出错（如估算gas时回滚）的部署数据
+        self.mined_nonce = {ACCOUNT: 0}  # 各账户下一个待打包的nonce
+        self.pool = {}  # (账户, nonce)-交易哈希
+        self.receipts = {}
+        self.sent = []
+        self.batches = []  # 各次批量请求的方法名列表
+
+    def call(self, method, params):
+        return self.batch([(method, params)])[0]
+
+    def batch(self, calls):
+        self.batches.append([method for method, _ in calls])
+        return [self.__handle(method, params) for method, params in calls]
+
+    def __handle(self, method, params):
+        if method == 'eth_accounts':
+            return [ACCOUNT]
+        if method == 'eth_getTransactionCount':
+            return hex(self.mined_nonce[params[0]] + sum(1 for account, _ in self.pool if account == params[0]))
+        if method == 'eth_sendTransaction':
+            tx = params[0]
+            if tx.get('data') in self.failing_data:
+                return RPCError('execution reverted')
+            key = (tx['from'], int(tx['nonce'], 16))
+            assert key not in self.pool and key[1] >= self.mined_nonce[tx['from']], 'nonce reused'
+            self.sent.append(tx)
+            tx_hash = self.pool[key] = '0x%064x' % len(self.sent)
+            self.__mine(tx)
+            return tx_hash
+        if method == 'eth_getTransactionReceipt':
+            return self.receipts.get(params[0])
+        raise AssertionError(method)
+
+    def __mine(self, tx):
+        account = tx['from']
+        while (account, self.mined_nonce[account]) in self.pool:
+            tx_hash = self.pool.pop((account, self.mined_nonce[account]))
+            self.receipts[tx_hash] = {'status': '0x1', 'contractAddress': '0x' + tx_hash[-40:]}
+            self.mined_nonce[account] += 1
+
+
+def deploy(node, contracts, batch_size):
+    deployer = RPCDeployer(node, batch_size=batch_size, poll_interval=0, receipt_timeout=0.2)
+    return deployer.deploy(contracts)
+
+
+def test_failed_send_mid_batch_does_not_stall_later_transactions():
+    node = FakeNode(failing_data={'0xbad'})
+    contracts = [('A', '0x01'), ('Bad', '0xbad'), ('C', '0x03'), ('D', '0x04'), ('E', '0x05')]
+    results = deploy(node, contracts, batch_size=3)
+    assert results[1].error == 'execution reverted'
+    assert [r.error for r in results if r.name != 'Bad'] == [''] * 4
+    assert all(r.address for r in results if r.name != 'Bad')
+    assert node.mined_nonce[ACCOUNT] == 4 and not node.pool
+
+
+def test_gap_left_at_end_is_filled():
+    node = FakeNode(failing_data={'0xbad'})
+    contracts = [('Bad', '0xbad'), ('B', '0x02'), ('C', '0x03')]
+    results = deploy(node, contracts, batch_size=3)
+    assert [r.error for r in results[1:]] == ['', '']
+    assert all(r.address for r in results[1:])
+    assert node.sent[-1]['to'] == ACCOUNT and int(node.sent[-1]['nonce'], 16) == 0
+
+
+def test_failed_last_transaction_leaves_no_gap():
+    node = FakeNode(failing_data={'0xbad'})
+    results = deploy(node, [('A', '0x01'), ('Bad', '0xbad')], batch_size=2)
+    assert results[0].address and results[1].error
+    assert len(node.sent) == 1
+
+
+def test_receipts_are_polled_with_next_send_batch():
+    node = FakeNode()
+    contracts = [(f'C{no}', f'0x{no:02x}') for no in range(6)]
+    results = deploy(node, contracts, batch_size=3)
+    assert all(r.address for r in results)
+    send_batches = [methods for methods in node.batches if 'eth_sendTransaction' in methods]
+    assert send_batches[1] == ['eth_sendTransaction'] * 3 + ['eth_getTransactionReceipt'] * 3
+    # 发送期间没有单独查询收据的请求
+    first, last = node.batches.index(send_batches[0]), node.batches.index(send_batches[-1])
+    assert all('eth_sendTransaction' in methods for methods in node.batches[first:last + 1])
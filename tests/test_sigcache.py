@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip('_pysha3')
+
+from sigcache import SigCache  # noqa: E402
+
+
+def test_puts_are_committed_without_close(tmp_path):
+    db_path = str(tmp_path / 'sig_cache.db')
+    cache = SigCache(db_path, commit_interval=2)
+    cache.put_BIN_sigs('a', {'0x12345678': {'0x23b872dd/call'}})
+    cache.put_ABI_sigs('b', [['0x12345678', 'f(uint256)']])
+    reader = SigCache(db_path)  # 另一连接只能读到已提交的写入，如进程中途退出后的下次运行
+    assert reader.get_BIN_sigs('a') == {'0x12345678': {'0x23b872dd/call'}}
+    assert reader.get_ABI_sigs('b') == [['0x12345678', 'f(uint256)']]
+    reader.close()
+    cache.close()
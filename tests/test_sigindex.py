@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip('_pysha3')
+
+import sigindex  # noqa: E402
+from sigindex import SelectorIndex  # noqa: E402
+
+
+def test_get_selectors_hashes_each_new_signature_once(monkeypatch, tmp_path):
+    hashed = []
+    hash_selector = sigindex.hash_selector
+    monkeypatch.setattr(sigindex, 'hash_selector', lambda sig: hashed.append(sig) or hash_selector(sig))
+    index = SelectorIndex(str(tmp_path / 'index.json'))
+    index.get_selector('name()')
+    sigs = ['transfer(address,uint256)', 'name()', 'transfer(address,uint256)', 'totalSupply()']
+    assert index.get_selectors(sigs) == [hash_selector(sig) for sig in sigs]
+    assert hashed == ['name()', 'transfer(address,uint256)', 'totalSupply()']  # 去重，已索引的签名不再计算
+    assert index.lookup(hash_selector('transfer(address,uint256)')) == ['transfer(address,uint256)']
+
+    index.save()
+    assert SelectorIndex(str(tmp_path / 'index.json')).lookup(hash_selector('totalSupply()')) == ['totalSupply()']
@@ -0,0 +1,14 @@
+from solversion import select_version
+
+INSTALLED = ['0.4.24', '0.4.26', '0.5.17', '0.6.11']
+
+
+def test_open_range_uses_lower_bound_series():
+    assert select_version(['>=0.4.22'], INSTALLED) == '0.4.26'
+    assert select_version(['>=0.4.22 <0.6.0'], INSTALLED) == '0.4.26'
+
+
+def test_constraints_pick_highest_in_lowest_satisfying_series():
+    assert select_version(['^0.5.0'], INSTALLED) == '0.5.17'
+    assert select_version(['>=0.4.22', '>0.4.26'], INSTALLED) == '0.5.17'
+    assert select_version(['^0.7.0'], INSTALLED) is None